@@ -0,0 +1,107 @@
+"""Compare the strategies of `Solver.solve` to find the values of answer keys common to all
+solutions, on the z3 backend.
+
+- native: `Z3Backend.solve_irrefutably`, which runs the chunked algorithm on the persistent solver
+  without an incremental session.
+- chunked: the generic chunked backbone algorithm (`cspuz.solver._solve_backbone`), used for
+  backends supporting incremental sessions but not `solve_irrefutably`.
+- legacy: the enumerate-and-block loop, used for backends supporting neither of them.
+
+The problems include the ones in `tests/puzzle` as well as larger ones.
+
+usage: python bench/backbone.py [repeat]
+"""
+
+import sys
+import time
+
+from cspuz.backend.backend import Backend
+from cspuz.backend.z3 import Z3Backend
+from cspuz.configuration import config
+from cspuz.puzzle import compass, masyu, nurikabe, slitherlink, star_battle
+
+STAR_BATTLE_BLOCKS = [
+    [0, 0, 0, 0, 1, 1],
+    [0, 2, 3, 0, 1, 1],
+    [2, 2, 3, 3, 3, 1],
+    [2, 1, 1, 1, 1, 1],
+    [2, 4, 4, 1, 4, 5],
+    [2, 2, 4, 4, 4, 5],
+]
+COMPASS_PROBLEM = [(1, 1, 1, 2, -1, 3), (2, 3, -1, 6, -1, -1), (3, 1, 4, -1, -1, 5)]
+MASYU_PROBLEM = [
+    [0, 0, 0, 0, 2, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 1],
+    [0, 2, 0, 0, 0, 0, 0, 0, 2, 0],
+    [1, 0, 2, 0, 0, 1, 0, 1, 0, 0],
+    [0, 0, 0, 0, 0, 0, 2, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 1, 0, 1, 0, 1, 0, 0],
+    [0, 0, 0, 2, 0, 0, 0, 0, 0, 0],
+    [0, 2, 0, 0, 0, 0, 0, 1, 0, 0],
+    [0, 0, 0, 0, 1, 0, 0, 1, 0, 0],
+]
+SLITHERLINK_PROBLEM = [
+    [3, -1, -1, -1, -1, 0],
+    [-1, -1, 2, 2, -1, -1],
+    [-1, 1, -1, -1, 3, -1],
+    [-1, 2, -1, -1, 1, -1],
+    [-1, -1, 1, 1, -1, -1],
+    [3, -1, -1, -1, -1, 2],
+]
+NURIKABE_PROBLEM = [
+    [0, 0, 0, 0, 0, 0, 0],
+    [0, 3, 0, 0, 0, 2, 0],
+    [0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 4, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0],
+    [0, 2, 0, 0, 0, 3, 0],
+    [0, 0, 0, 0, 0, 0, 0],
+]
+
+PROBLEMS = [
+    ("star_battle 6x6", lambda: star_battle.solve_star_battle(6, STAR_BATTLE_BLOCKS, 1)),
+    ("compass 5x4", lambda: compass.solve_compass(5, 4, COMPASS_PROBLEM)),
+    ("masyu 10x10", lambda: masyu.solve_masyu(10, 10, MASYU_PROBLEM)),
+    ("slitherlink 6x6", lambda: slitherlink.solve_slitherlink(6, 6, SLITHERLINK_PROBLEM)),
+    ("nurikabe 7x7", lambda: nurikabe.solve_nurikabe(7, 7, NURIKABE_PROBLEM)),
+]
+
+
+def set_strategy(strategy):
+    if strategy == "native":
+        Z3Backend.solve_irrefutably = NATIVE
+        Z3Backend.supports_incremental = True
+    elif strategy == "chunked":
+        Z3Backend.solve_irrefutably = Backend.solve_irrefutably
+        Z3Backend.supports_incremental = True
+    else:
+        Z3Backend.solve_irrefutably = Backend.solve_irrefutably
+        Z3Backend.supports_incremental = False
+
+
+NATIVE = Z3Backend.solve_irrefutably
+STRATEGIES = ["native", "chunked", "legacy"]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) >= 2 else 3
+    config.default_backend = "z3"
+    for name, solve in PROBLEMS:
+        results = {}
+        line = name
+        for strategy in STRATEGIES:
+            set_strategy(strategy)
+            start = time.perf_counter()
+            for _ in range(repeat):
+                is_sat, answer = solve()
+            elapsed = (time.perf_counter() - start) / repeat
+            results[strategy] = (is_sat, [v.sol for v in answer])
+            line += f", {strategy}: {elapsed:.3f}s"
+        set_strategy("native")
+        print(line)
+        assert all(res == results["native"] for res in results.values())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measure building elementwise array constraints, as in the path-direction helper of the puzzle
+scripts (`util.get_direction_order`), which splits the edges of a path into two directed grid
+frames with grid-wide expressions such as `grid.horizontal[:, :] & ~grid_rd.horizontal[:, :]`.
+
+usage: python bench/elementwise.py [size ...]
+"""
+
+import sys
+import time
+
+from cspuz import Solver
+from cspuz.constraints import count_true
+from cspuz.grid_frame import BoolGridFrame
+
+
+def direction_constraints(solver, grid, grid_rd, grid_lu):
+    # the grid-wide part of `util.get_direction_order`
+    for a, rd, lu in [
+        (grid.horizontal, grid_rd.horizontal, grid_lu.horizontal),
+        (grid.vertical, grid_rd.vertical, grid_lu.vertical),
+    ]:
+        a, rd, lu = a[:, :], rd[:, :], lu[:, :]
+        solver.ensure((~a & ~rd & ~lu) | (a & rd & ~lu) | (a & ~rd & lu))
+
+
+def per_cell_constraints(solver, grid_rd, grid_lu, is_passed, height, width):
+    # the per-cell part of `util.get_direction_order`, which builds scalar expressions
+    for y in range(height):
+        for x in range(width):
+            neighbors = []
+            if y > 0:
+                neighbors.append(grid_lu.vertical[y - 1, x])
+            if y < height - 1:
+                neighbors.append(grid_rd.vertical[y, x])
+            if x > 0:
+                neighbors.append(grid_lu.horizontal[y, x - 1])
+            if x < width - 1:
+                neighbors.append(grid_rd.horizontal[y, x])
+            solver.ensure(is_passed[y, x].then(count_true(neighbors) == 1))
+
+
+def run(size):
+    solver = Solver()
+    grid = BoolGridFrame(solver, size - 1, size - 1)
+    grid_rd = BoolGridFrame(solver, size - 1, size - 1)
+    grid_lu = BoolGridFrame(solver, size - 1, size - 1)
+    is_passed = solver.bool_array((size, size))
+
+    start = time.perf_counter()
+    direction_constraints(solver, grid, grid_rd, grid_lu)
+    elapsed_elementwise = time.perf_counter() - start
+
+    start = time.perf_counter()
+    per_cell_constraints(solver, grid_rd, grid_lu, is_passed, size, size)
+    elapsed_per_cell = time.perf_counter() - start
+
+    print(
+        f"{size}x{size}: elementwise {elapsed_elementwise:.3f}s, "
+        f"per-cell {elapsed_per_cell:.3f}s"
+    )
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [30, 100, 300]
+    for size in sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Compare the iterative expression converters of the backends with the former recursive ones.
+
+usage: python bench/expr_walker.py [size ...]
+"""
+
+import io
+import sys
+import time
+
+from cspuz import Solver
+from cspuz.expr import BoolVar, Expr, IntVar, Op
+from cspuz.grid_frame import BoolGridFrame
+from cspuz.backend import z3 as z3_backend
+from cspuz.backend.sugar_like import OP_TO_OPNAME, _CspWriter, _convert_variable
+
+
+def legacy_convert_sugar(e):
+    if e is None:
+        return "*"
+    if isinstance(e, bool):
+        return "true" if e else "false"
+    if isinstance(e, int):
+        return str(e)
+    if not isinstance(e, Expr):
+        raise TypeError()
+
+    if isinstance(e, BoolVar):
+        return "b{}".format(e.id)
+    elif isinstance(e, IntVar):
+        return "i{}".format(e.id)
+    elif e.op == Op.BOOL_CONSTANT:
+        return "true" if e.operands[0] else "false"
+    elif e.op == Op.INT_CONSTANT:
+        return str(e.operands[0])
+    else:
+        return "({} {})".format(
+            OP_TO_OPNAME[e.op], " ".join(map(legacy_convert_sugar, e.operands))
+        )
+
+
+def legacy_convert_z3(e, variables_dict):
+    z3 = z3_backend.z3
+    if isinstance(e, (bool, int)):
+        return e
+    if not isinstance(e, Expr):
+        raise TypeError()
+    if isinstance(e, (BoolVar, IntVar)):
+        return variables_dict[e.id]
+    else:
+        operands = list(map(lambda x: legacy_convert_z3(x, variables_dict), e.operands))
+        if e.op == Op.NEG:
+            return -operands[0]
+        elif e.op == Op.ADD:
+            ret = operands[0]
+            for i in range(1, len(operands)):
+                ret = ret + operands[i]
+            return ret
+        elif e.op == Op.SUB:
+            ret = operands[0]
+            for i in range(1, len(operands)):
+                ret = ret - operands[i]
+            return ret
+        elif e.op == Op.EQ:
+            return operands[0] == operands[1]
+        elif e.op == Op.NE:
+            return operands[0] != operands[1]
+        elif e.op == Op.LE:
+            return operands[0] <= operands[1]
+        elif e.op == Op.LT:
+            return operands[0] < operands[1]
+        elif e.op == Op.GE:
+            return operands[0] >= operands[1]
+        elif e.op == Op.GT:
+            return operands[0] > operands[1]
+        elif e.op == Op.NOT:
+            return z3.Not(operands[0])
+        elif e.op == Op.AND:
+            return z3.And(operands)
+        elif e.op == Op.OR:
+            return z3.Or(operands)
+        elif e.op == Op.XOR:
+            return z3.Xor(operands[0], operands[1])
+        elif e.op == Op.IFF:
+            return operands[0] == operands[1]
+        elif e.op == Op.IMP:
+            return z3.Or(z3.Not(operands[0]), operands[1])
+        elif e.op == Op.IF:
+            return z3.If(operands[0], operands[1], operands[2])
+        elif e.op == Op.ALLDIFF:
+            return z3.Distinct(operands)
+
+
+def build_problem(size, chains):
+    """Build slitherlink-like constraints on a `size` x `size` grid. If `chains` is `True`, a
+    pathlength-like chain (`util.get_pathlength`) and a long sum over `cond` terms are added."""
+    solver = Solver()
+    grid = BoolGridFrame(solver, size, size)
+    for y in range(size):
+        for x in range(size):
+            solver.ensure(grid.cell_neighbors(y, x).count_true() <= 3)
+    for y in range(size + 1):
+        for x in range(size + 1):
+            solver.ensure(grid.vertex_neighbors(y, x).count_true() != 1)
+            solver.ensure(grid.vertex_neighbors(y, x).count_true() <= 2)
+
+    if not chains:
+        return solver
+
+    length = solver.int_array((size, size + 1), 0, size)
+    for y in range(size):
+        for x in range(size + 1):
+            if y == 0:
+                solver.ensure(length[y, x] == 0)
+            else:
+                prev = length[y - 1, x]
+                solver.ensure(length[y, x] == grid.vertical[y - 1, x].cond(prev + 1, 0))
+
+    total = 0
+    for e in grid:
+        total = total + e.cond(1, 0)
+    solver.ensure(total >= 4)
+    return solver
+
+
+def measure(f):
+    start = time.perf_counter()
+    try:
+        f()
+    except RecursionError:
+        return None
+    return time.perf_counter() - start
+
+
+def format_time(t):
+    return "RecursionError" if t is None else f"{t:.3f}s"
+
+
+def bench(size, chains):
+    solver = build_problem(size, chains)
+    variables = solver.variables
+    constraints = solver.constraints
+
+    def sugar_legacy():
+        text = list(map(_convert_variable, variables))
+        text += map(legacy_convert_sugar, constraints)
+        "\n".join(text)
+
+    def sugar_walker():
+        writer = _CspWriter(io.StringIO())
+        for c in constraints:
+            writer.write(c)
+            writer.out.write("\n")
+        writer.out.getvalue()
+
+    results = [("sugar", measure(sugar_legacy), measure(sugar_walker))]
+
+    try:
+        backend = z3_backend.Z3Backend(variables)
+    except ImportError:
+        backend = None
+    if backend is not None:
+
+        def z3_legacy():
+            for c in constraints:
+                legacy_convert_z3(c, backend.variables_dict)
+
+        def z3_walker():
+            converter = z3_backend._Z3Converter(backend.variables_dict)
+            for c in constraints:
+                converter.transform(c)
+
+        results.append(("z3", measure(z3_legacy), measure(z3_walker)))
+
+    problem = f"{size}x{size}" + (" with chains" if chains else "")
+    for name, legacy, walker in results:
+        print(
+            f"{problem} {name}: recursive {format_time(legacy)}, "
+            f"iterative {format_time(walker)}"
+        )
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [10, 30, 100]
+    for size in sizes:
+        for chains in [False, True]:
+            bench(size, chains)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
 import sys
 import time
+from cspuz.generator import ArrayBuilder2D, build_neighbor_generator
 from cspuz.generator.srandom import use_deterministic_prng
+import cspuz.puzzle.nurikabe as nurikabe
 import cspuz.puzzle.masyu as masyu
 import cspuz.puzzle.nurimisaki as nurimisaki
 import cspuz.puzzle.slitherlink as slitherlink
 import cspuz.puzzle.sudoku as sudoku
 
 
-def run_generator_bench(bench_name, generator, serializer, num_problems, expected):
+def run_generator(generator, serializer, num_problems, expected, n_workers):
     use_deterministic_prng(True, seed=0)
     start = time.time()
     for i in range(num_problems):
         while True:
-            generated = generator()
+            generated = generator(n_workers)
             if generated is not None:
                 break
         serialized = serializer(generated)
@@ -20,10 +22,20 @@ def run_generator_bench(bench_name, generator, serializer, num_problems, expecte
             assert expected[i] == serialized
         else:
             print(serialized)
-    elapsed = time.time() - start
+    return time.time() - start
 
+
+def run_generator_bench(bench_name, generator, serializer, num_problems, expected):
+    elapsed = run_generator(generator, serializer, num_problems, expected, 0)
     print(f"{bench_name}: {elapsed}")
 
+    if N_WORKERS >= 2:
+        elapsed_parallel = run_generator(generator, serializer, num_problems, expected, N_WORKERS)
+        print(
+            f"{bench_name} (n_workers={N_WORKERS}): {elapsed_parallel} "
+            f"(speedup: {elapsed / elapsed_parallel:.2f}x)"
+        )
+
 
 def bench_masyu():
     expected = [
@@ -40,7 +52,9 @@ def bench_masyu():
     ]
     run_generator_bench(
         "masyu",
-        lambda: masyu.generate_masyu(height=10, width=10, symmetry=False, verbose=False),
+        lambda n_workers: masyu.generate_masyu(
+            height=10, width=10, symmetry=False, verbose=False, n_workers=n_workers
+        ),
         masyu.serialize_masyu,
         10,
         expected,
@@ -74,8 +88,8 @@ def bench_slitherlink():
 
     run_generator_bench(
         "slitherlink",
-        lambda: slitherlink.generate_slitherlink(
-            height=10, width=10, symmetry=False, verbose=False
+        lambda n_workers: slitherlink.generate_slitherlink(
+            height=10, width=10, symmetry=False, verbose=False, n_workers=n_workers
         ),
         serializer,
         10,
@@ -98,7 +112,9 @@ def bench_nurimisaki():
     ]
     run_generator_bench(
         "nurimisaki",
-        lambda: nurimisaki.generate_nurimisaki(10, 10, verbose=False),
+        lambda n_workers: nurimisaki.generate_nurimisaki(
+            10, 10, verbose=False, n_workers=n_workers
+        ),
         nurimisaki.serialize_nurimisaki,
         10,
         expected,
@@ -120,25 +136,82 @@ def bench_sudoku():
     ]
     run_generator_bench(
         "sudoku",
-        lambda: sudoku.generate_sudoku(3, symmetry=True, max_clue=24, verbose=False),
+        lambda n_workers: sudoku.generate_sudoku(
+            3, symmetry=True, max_clue=24, verbose=False, n_workers=n_workers
+        ),
         sudoku.serialize_sudoku,
         10,
         expected,
     )
 
 
+def run_template_bench(bench_name, pattern, solve, solve_with_template, num_problems=200):
+    """Compare solving problems from scratch with solving them with a template, on a random walk
+    of problems as visited by the generator."""
+    use_deterministic_prng(True, seed=0)
+    problem, neighbor_generator = build_neighbor_generator(pattern)
+    problems = []
+    for _ in range(num_problems):
+        problem = next(neighbor_generator(problem))
+        problems.append(problem)
+
+    start = time.time()
+    expected = [solve(problem)[0] for problem in problems]
+    elapsed = time.time() - start
+
+    start = time.time()
+    actual = [solve_with_template(problem)[0] for problem in problems]
+    elapsed_template = time.time() - start
+
+    assert expected == actual
+    print(
+        f"{bench_name}: {elapsed} (template: {elapsed_template}, "
+        f"speedup: {elapsed / elapsed_template:.2f}x)"
+    )
+
+
+def bench_template():
+    run_template_bench(
+        "masyu_template",
+        ArrayBuilder2D(10, 10, [0, 1, 2], default=0),
+        lambda problem: masyu.solve_masyu(10, 10, problem),
+        lambda problem: masyu._solve_masyu_with_template(10, 10, problem),
+    )
+    run_template_bench(
+        "slitherlink_template",
+        ArrayBuilder2D(10, 10, range(-1, 4), default=-1),
+        lambda problem: slitherlink.solve_slitherlink(10, 10, problem),
+        lambda problem: slitherlink._solve_slitherlink_with_template(10, 10, problem),
+    )
+    run_template_bench(
+        "nurikabe_template",
+        ArrayBuilder2D(10, 10, range(-1, 10), default=0),
+        lambda problem: nurikabe.solve_nurikabe(10, 10, problem),
+        lambda problem: nurikabe._solve_nurikabe_with_template(10, 10, problem),
+    )
+
+
 ALL_BENCHES = [
     (bench_masyu, "masyu"),
     (bench_slitherlink, "slitherlink"),
     (bench_nurimisaki, "nurimisaki"),
     (bench_sudoku, "sudoku"),
+    (bench_template, "template"),
 ]
 
 
+# usage: python bench/generator.py [BENCH[,BENCH...]|all] [N_WORKERS]
+# If N_WORKERS is 2 or more, each bench is also run with `n_workers=N_WORKERS`.
+N_WORKERS = 0
+
+
 def main():
+    global N_WORKERS
     flt = None
-    if len(sys.argv) >= 2:
+    if len(sys.argv) >= 2 and sys.argv[1] != "all":
         flt = sys.argv[1].split(",")
+    if len(sys.argv) >= 3:
+        N_WORKERS = int(sys.argv[2])
     for bench, name in ALL_BENCHES:
         if flt is None or name in flt:
             bench()
@@ -0,0 +1,112 @@
+"""Compare the encodings of the connectivity of cycles (`config.cycle_connectivity_encoding`) on
+slitherlink and masyu.
+
+For each puzzle and size, the size of the CSP description and the time to build and solve
+problems visited by a random walk (as the generator does) are reported. Solving is skipped if
+`cspuz_core` is not available.
+
+usage: python bench/graph_encoding.py [size ...]
+"""
+
+import sys
+import time
+
+from cspuz import Solver
+from cspuz.backend.sugar_like import CspuzCoreBackend, SugarLikeBackend
+from cspuz.configuration import config
+from cspuz.generator import ArrayBuilder2D, build_neighbor_generator
+from cspuz.generator.srandom import use_deterministic_prng
+from cspuz.simplify import Simplifier
+import cspuz.puzzle.masyu as masyu
+import cspuz.puzzle.slitherlink as slitherlink
+
+ENCODINGS = ["line_graph", "incidence"]
+
+
+def build_masyu(size, problem):
+    solver = Solver()
+    grid_frame = masyu._build_masyu(solver, size, size)
+    masyu._add_masyu_clues(solver, grid_frame, size, size, problem)
+    return solver
+
+
+def build_slitherlink(size, problem):
+    solver = Solver()
+    grid_frame = slitherlink._build_slitherlink(solver, size, size)
+    slitherlink._add_slitherlink_clues(solver, grid_frame, size, size, problem)
+    return solver
+
+
+PUZZLES = [
+    ("masyu", build_masyu, lambda size: ArrayBuilder2D(size, size, [0, 1, 2], default=0)),
+    (
+        "slitherlink",
+        build_slitherlink,
+        lambda size: ArrayBuilder2D(size, size, range(-1, 4), default=-1),
+    ),
+]
+
+
+def random_problems(pattern, num_problems):
+    use_deterministic_prng(True, seed=0)
+    problem, neighbor_generator = build_neighbor_generator(pattern)
+    ret = []
+    for _ in range(num_problems):
+        # take several steps at once so that problems have a reasonable number of clues
+        for _ in range(5):
+            problem = next(neighbor_generator(problem))
+        ret.append(problem)
+    use_deterministic_prng(False)
+    return ret
+
+
+def description_size(solver):
+    backend = SugarLikeBackend(solver.variables)
+    backend.add_constraint(Simplifier().simplify_constraints(solver.constraints))
+    return len(backend._buffer.getvalue())
+
+
+def has_cspuz_core():
+    try:
+        import cspuz_core  # type: ignore  # noqa
+
+        return True
+    except ImportError:
+        return False
+
+
+def bench(name, build, pattern, size, solve):
+    num_problems = 20 if size <= 20 else 5
+    problems = random_problems(pattern(size), num_problems)
+    results = {}
+    for encoding in ENCODINGS:
+        config.cycle_connectivity_encoding = encoding
+        start = time.perf_counter()
+        solvers = [build(size, problem) for problem in problems]
+        elapsed_build = time.perf_counter() - start
+        text_size = description_size(solvers[0])
+
+        line = f"{name} {size}x{size} {encoding}: {text_size} bytes, build {elapsed_build:.3f}s"
+        if solve:
+            start = time.perf_counter()
+            results[encoding] = [s.solve(backend=CspuzCoreBackend) for s in solvers]
+            elapsed_solve = time.perf_counter() - start
+            line += f", solve {elapsed_solve:.3f}s"
+        print(line)
+    if solve:
+        assert results["line_graph"] == results["incidence"]
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [10, 20, 50]
+    solve = has_cspuz_core()
+    if not solve:
+        print("cspuz_core is not available; solving is skipped", file=sys.stderr)
+    config.use_graph_primitive = True
+    for name, build, pattern in PUZZLES:
+        for size in sizes:
+            bench(name, build, pattern, size, solve)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Measure the time to add graph constraints encoded by graph primitives.
+
+For each size, `active_vertices_connected`, `division_connected` and `active_edges_single_cycle`
+are added on a size x size grid (twice, to see the effect of the per-graph caches), along with
+the time the former `sum([[x, y] for x, y in graph.edges], [])` flattening of the edge list would
+take on the same graph.
+
+usage: python bench/graph_primitives.py [size ...]
+"""
+
+import sys
+import time
+
+from cspuz import BoolGridFrame, Solver, graph
+from cspuz.configuration import config
+
+NUM_REGIONS = 4
+
+
+def measure(f):
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def legacy_flatten(g):
+    return sum([[x, y] for x, y in g.edges], [])
+
+
+def bench(size):
+    def vertices_connected():
+        solver = Solver()
+        graph.active_vertices_connected(solver, solver.bool_array((size, size)))
+
+    def division():
+        solver = Solver()
+        graph.division_connected(
+            solver, solver.int_array((size, size), 0, NUM_REGIONS - 1), NUM_REGIONS
+        )
+
+    def single_cycle():
+        solver = Solver()
+        graph.active_edges_single_cycle(solver, BoolGridFrame(solver, size, size))
+
+    cases = [
+        ("active_vertices_connected", vertices_connected, lambda: graph._grid_graph(size, size)),
+        ("division_connected", division, lambda: graph._grid_graph(size, size)),
+        (
+            "active_edges_single_cycle",
+            single_cycle,
+            lambda: graph._grid_frame_graph(size, size)._line_graph(),
+        ),
+    ]
+    for name, f, get_graph in cases:
+        first = measure(f)
+        second = measure(f)
+        g = get_graph()
+        legacy = measure(lambda: legacy_flatten(g))
+        print(
+            f"{size}x{size} {name}: {first:.3f}s (cached: {second:.3f}s), "
+            f"legacy edge flattening: {legacy:.3f}s"
+        )
+
+
+def main():
+    sizes = [int(x) for x in sys.argv[1:]] or [10, 30, 50, 100]
+    config.use_graph_primitive = True
+    for size in sizes:
+        bench(size)
+
+
+if __name__ == "__main__":
+    main()
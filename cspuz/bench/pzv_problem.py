@@ -1,139 +1,136 @@
+"""Solve puzzles given as puzz.link URLs (one per line on stdin) and report the time for each.
+
+With `--dialects`, problems are not solved; instead, the size of the problem text and the time to
+write it are reported for the standard and the compact dialect (`config.sugar_compact_dialect`)
+of sugar-like backends. The time to solve problems in each dialect can be compared by running
+without `--dialects` on `sugar_extended` backend with `CSPUZ_SUGAR_COMPACT_DIALECT` set or unset.
+
+usage: python bench/pzv_problem.py [--hmax H] [--wmax W] [--jobs N] [--timeout T] [--dialects]
+"""
+
 import argparse
 import sys
 import time
 
-from cspuz import problem_serializer
-from cspuz.puzzle import heyawake, lits, masyu, nurikabe, nurimisaki, slitherlink, yajilin
-from cspuz.generator import default_uniqueness_checker
-
-
-def solve_nurikabe(url):
-    problem = nurikabe.deserialize_nurikabe(url)
-    height = len(problem)
-    width = len(problem[0])
-    is_sat, ans = nurikabe.solve_nurikabe(height, width, problem)
-    return is_sat and default_uniqueness_checker(ans)
-
-
-def solve_masyu(url):
-    problem = masyu.deserialize_masyu(url)
-    height = len(problem)
-    width = len(problem[0])
-    is_sat, ans = masyu.solve_masyu(height, width, problem)
-    return is_sat and default_uniqueness_checker(ans)
-
-
-def solve_slitherlink(url):
-    problem = slitherlink.deserialize_slitherlink(url)
-    if problem is None:
-        return None
-    height = len(problem)
-    width = len(problem[0])
-    is_sat, ans = slitherlink.solve_slitherlink(height, width, problem)
-    return is_sat and default_uniqueness_checker(ans)
-
-
-def solve_heyawake(url):
-    problem = heyawake.deserialize_heyawake(url)
-    if problem is None:
-        return None
-    height, width, (rooms, clues) = problem
-    for clue in clues:
-        if clue > 15:
-            # TODO: problem with large clue numbers are too difficult to solve
-            return None
-    is_sat, ans = heyawake.solve_heyawake(height, width, rooms, clues)
-    return is_sat and default_uniqueness_checker(ans)
-
-
-def solve_lits(url):
-    problem = lits.deserialize_lits(url)
-    if problem is None:
-        return None
-    height, width, rooms = problem
-    is_sat, ans = lits.solve_lits(height, width, rooms)
-    return is_sat and default_uniqueness_checker(ans)
-
-
-def solve_nurimisaki(url):
-    problem = nurimisaki.deserialize_nurimisaki(url)
-    height = len(problem)
-    width = len(problem[0])
-    is_sat, ans = nurimisaki.solve_nurimisaki(height, width, problem)
-    return is_sat and default_uniqueness_checker(ans)
-
-
-def solve_yajilin(url):
-    problem = yajilin.deserialize_yajilin(url)
-    height = len(problem)
-    width = len(problem[0])
-    is_sat, grid_frame, is_black = yajilin.solve_yajilin(height, width, problem)
-    return is_sat and default_uniqueness_checker(grid_frame, is_black)
-
-
-PUZZLE_KIND_ALIAS = {
-    "mashu": "masyu",
-}
-
-
-def solve_problem(url, height_lim=None, width_lim=None):
-    info = problem_serializer.get_puzzle_info_from_url(url)
-    if info is None:
-        return None
-    kind, height, width = info
-
-    if height_lim is not None and height > height_lim:
-        return None
-    if width_lim is not None and width > width_lim:
-        return None
-
-    if kind in PUZZLE_KIND_ALIAS:
-        kind = PUZZLE_KIND_ALIAS[kind]
-
-    if kind == "nurikabe":
-        return solve_nurikabe(url)
-    elif kind == "masyu":
-        return solve_masyu(url)
-    elif kind == "slither":
-        return solve_slitherlink(url)
-    elif kind == "heyawake":
-        return solve_heyawake(url)
-    elif kind == "lits":
-        return solve_lits(url)
-    elif kind == "nurimisaki":
-        return solve_nurimisaki(url)
-    elif kind == "yajilin":
-        return solve_yajilin(url)
-    else:
-        return None
+import cspuz.solver
+from cspuz.backend.sugar_like import SugarLikeBackend
+from cspuz.batch import solve_many, solve_problem
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--hmax", type=int)
-    parser.add_argument("--wmax", type=int)
-    args = parser.parse_args()
-
-    hmax = args.hmax
-    wmax = args.wmax
-
-    idx = 0
+def read_urls():
     while True:
-        idx += 1
         url = sys.stdin.readline().strip()
         if url == "":
             break
+        yield url
+
+
+class _Captured(Exception):
+    pass
+
 
-        start = time.time()
-        res = solve_problem(url, height_lim=hmax, width_lim=wmax)
-        elapsed = time.time() - start
+class _CapturingBackend(SugarLikeBackend):
+    """Backend which records the variables and the (simplified) constraints of the first problem
+    passed to it without solving."""
+
+    captured = None
+
+    def __init__(self, variables):
+        self._variables = list(variables)
+        self._constraints = []
+
+    def add_constraint(self, constraint):
+        if isinstance(constraint, list):
+            self._constraints += constraint
+        else:
+            self._constraints.append(constraint)
+
+    def solve(self):
+        _CapturingBackend.captured = (self._variables, self._constraints)
+        raise _Captured()
+
+    def solve_irrefutably(self, is_answer_key, assumptions=None):
+        return self.solve()
+
+
+class _CompactBackend(SugarLikeBackend):
+    _compact_dialect = True
+
+
+def capture_problem(url, height_lim, width_lim):
+    _CapturingBackend.captured = None
+    original = cspuz.solver._get_default_backend
+    cspuz.solver._get_default_backend = lambda: _CapturingBackend
+    try:
+        solve_problem(url, height_lim=height_lim, width_lim=width_lim)
+    except _Captured:
+        pass
+    finally:
+        cspuz.solver._get_default_backend = original
+    return _CapturingBackend.captured
+
+
+def compare_dialects(urls, height_lim, width_lim):
+    total = {"standard": [0, 0.0], "compact": [0, 0.0]}
+    for idx, url in enumerate(urls):
+        captured = capture_problem(url, height_lim, width_lim)
+        if captured is None:
+            continue
+        variables, constraints = captured
+        line = f"{idx + 1}"
+        for name, backend_type in [("standard", SugarLikeBackend), ("compact", _CompactBackend)]:
+            start = time.perf_counter()
+            backend = backend_type(variables)
+            backend.add_constraint(constraints)
+            size = len(backend._buffer.getvalue())
+            elapsed = time.perf_counter() - start
+            total[name][0] += size
+            total[name][1] += elapsed
+            line += f"\t{name}: {size} bytes, {elapsed:.4f}s"
+        print(line, flush=True)
+    summary = [f"{name}: {size} bytes, {elapsed:.4f}s" for name, (size, elapsed) in total.items()]
+    print("total\t" + "\t".join(summary), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--hmax", type=int)
+    parser.add_argument("--wmax", type=int)
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="number of worker processes (results are unordered)"
+    )
+    parser.add_argument("--timeout", type=float, help="timeout (in seconds) for each problem")
+    parser.add_argument(
+        "--dialects",
+        action="store_true",
+        help="compare the problem text in the standard and the compact dialects without solving",
+    )
+    args = parser.parse_args()
 
-        if res is None:
+    if args.dialects:
+        compare_dialects(read_urls(), args.hmax, args.wmax)
+        return
+
+    results = solve_many(
+        read_urls(),
+        n_workers=args.jobs,
+        timeout=args.timeout,
+        height_lim=args.hmax,
+        width_lim=args.wmax,
+    )
+    start = time.time()
+    for res in results:
+        idx = res.index + 1
+        if res.error is not None:
+            print(f"{idx}\t{res.error}", flush=True)
+        elif res.result is None:
             continue
-        elif res is False:
+        elif res.result is False:
             print(f"{idx}\tnot solved", flush=True)
         else:
-            print(f"{idx}\t{elapsed}", flush=True)
+            print(f"{idx}\t{res.elapsed}", flush=True)
+    if args.jobs > 1:
+        print(f"total\t{time.time() - start}", file=sys.stderr)
 
 
 if __name__ == "__main__":
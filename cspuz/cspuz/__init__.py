@@ -1,10 +1,11 @@
-from .solver import Solver
+from .solver import Solver, SolverTemplate
 from .constraints import alldifferent, count_true, cond, fold_and, fold_or
 from .configuration import config
 from .grid_frame import BoolGridFrame
 
 __all__ = [
     "Solver",
+    "SolverTemplate",
     "alldifferent",
     "count_true",
     "cond",
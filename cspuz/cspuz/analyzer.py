@@ -1,5 +1,5 @@
 from multiprocessing import Pool
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, Callable, List, Optional, Tuple, Union
 
 from .solver import Solver, _get_backend
 from .array import BoolArray2D, IntArray2D
@@ -7,6 +7,10 @@ from .expr import BoolExpr, BoolVar, IntVar
 from .constraints import flatten_iterator
 
 
+# (learnt facts as (name, value), names of optional constraints, names of learnt facts used)
+AnalyzerStep = Tuple[List[Tuple[Optional[str], Union[bool, int]]], List[str], List[Optional[str]]]
+
+
 class Analyzer(Solver):
     answer_key_name: List[Optional[str]]
     axiom_constraints: List[int]
@@ -74,25 +78,183 @@ class Analyzer(Solver):
             self.optional_constraints.append((name, new_ids))
         self.constraints += flat_constraints
 
-    def _test_unlearnt_fact(self, i, unlearnt_facts, learnt_facts, backend):
+    def analyze(
+        self,
+        n_workers: int = 0,
+        backend: Union[None, str, type] = None,
+        progress: Optional[Callable[[AnalyzerStep], None]] = None,
+    ) -> Optional[List[AnalyzerStep]]:
+        """Find a sequence of deductions leading to the answer.
+
+        Returns the list of steps, each of which consists of the facts learnt in the step, the
+        names of the optional constraints used and the names of the previously learnt facts used,
+        or `None` if the problem has no solution. `progress` is called with each step as soon as
+        it is found.
+
+        If `n_workers` is nonnegative, candidate steps are examined in parallel by a pool of
+        `n_workers` processes (`os.cpu_count()` if 0), otherwise in this process.
+        """
         backend_type = _get_backend(backend)
-        is_active_constraint = [True for _ in range(len(self.optional_constraints))]
-        is_active_fact = [True for _ in range(len(learnt_facts))]
-
-        def check():
-            csp_solver = backend_type(self.variables)
-            csp_solver.add_constraint([self.constraints[j] for j in self.axiom_constraints])
-            for k in range(len(self.optional_constraints)):
-                if is_active_constraint[k]:
+        csp_solver = backend_type(self.variables)
+        csp_solver.add_constraint(self.constraints)
+
+        if not csp_solver.solve_irrefutably(self.is_answer_key):
+            return None
+
+        facts: List[Tuple[int, Union[bool, int]]] = []
+        for i, v in enumerate(self.variables):
+            if self.is_answer_key[i] and self.variables[i].sol is not None:
+                facts.append((i, self.variables[i].sol))
+        unlearnt_fact_ids = list(range(len(facts)))
+        learnt_fact_ids: List[int] = []
+
+        pool = None
+        checker = None
+        if n_workers >= 0:
+            pool = Pool(
+                None if n_workers == 0 else n_workers,
+                initializer=_init_worker,
+                initargs=(self, facts, backend),
+            )
+        else:
+            checker = _FactChecker(self, facts, backend)
+
+        res = []
+        try:
+            while len(unlearnt_fact_ids) > 0:
+                args = [(f, learnt_fact_ids) for f in unlearnt_fact_ids]
+                if pool is not None:
+                    cand_all = pool.starmap(_test_unlearnt_fact_in_worker, args)
+                else:
+                    assert checker is not None
+                    cand_all = [checker.test_unlearnt_fact(*a) for a in args]
+
+                best_cand = min(cand_all)
+
+                _, active_constraint_ids, active_fact_ids = best_cand
+                csp_solver = backend_type(self.variables)
+                csp_solver.add_constraint([self.constraints[i] for i in self.axiom_constraints])
+                for k in active_constraint_ids:
                     _, cs = self.optional_constraints[k]
                     csp_solver.add_constraint([self.constraints[j] for j in cs])
-            for k in range(len(learnt_facts)):
-                if is_active_fact[k]:
-                    vi, val = learnt_facts[k]
+                for k in active_fact_ids:
+                    vi, val = facts[learnt_fact_ids[k]]
                     csp_solver.add_constraint(self.variables[vi] == val)
-            vi, val = unlearnt_facts[i]
-            csp_solver.add_constraint(self.variables[vi] != val)
-            return not csp_solver.solve()
+
+                assert csp_solver.solve_irrefutably(self.is_answer_key)
+
+                new_learnt_fact_ids = []
+                new_unlearnt_fact_ids = []
+                for f in unlearnt_fact_ids:
+                    vi, val = facts[f]
+                    if self.variables[vi].sol is not None:
+                        assert self.variables[vi].sol == val
+                        new_learnt_fact_ids.append(f)
+                    else:
+                        new_unlearnt_fact_ids.append(f)
+
+                step = (
+                    [
+                        (self.answer_key_name[facts[f][0]], facts[f][1])
+                        for f in new_learnt_fact_ids
+                    ],
+                    [self.optional_constraints[i][0] for i in active_constraint_ids],
+                    [self.answer_key_name[facts[learnt_fact_ids[i]][0]] for i in active_fact_ids],
+                )
+                res.append(step)
+                if progress is not None:
+                    progress(step)
+                learnt_fact_ids = learnt_fact_ids + new_learnt_fact_ids
+                unlearnt_fact_ids = new_unlearnt_fact_ids
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+        return res
+
+
+class _FactChecker:
+    """Tests whether facts can be derived from the constraints of an `Analyzer`, the subset of
+    the optional constraints and the learnt facts being selected by assumptions.
+
+    Every optional constraint and, for every fact `x == v`, both `x == v` (used once the fact is
+    learnt) and `x != v` (used to test whether the fact follows) are guarded by selector variables
+    and encoded only once. Backends without incremental solving encode the problem for each check.
+    """
+
+    def __init__(
+        self,
+        analyzer: Analyzer,
+        facts: List[Tuple[int, Union[bool, int]]],
+        backend: Union[None, str, type],
+    ) -> None:
+        self.analyzer = analyzer
+        self.facts = facts
+        self.backend_type = _get_backend(backend)
+        self.csp_solver = None
+
+        if not self.backend_type.supports_incremental:
+            return
+
+        variables = list(analyzer.variables)
+
+        def new_selector() -> BoolVar:
+            v = BoolVar(len(variables))
+            variables.append(v)
+            return v
+
+        self.constraint_selectors = [new_selector() for _ in analyzer.optional_constraints]
+        self.learnt_selectors = [new_selector() for _ in facts]
+        self.negation_selectors = [new_selector() for _ in facts]
+
+        csp_solver = self.backend_type(variables)
+        csp_solver.add_constraint([analyzer.constraints[j] for j in analyzer.axiom_constraints])
+        for (_, cs), sel in zip(analyzer.optional_constraints, self.constraint_selectors):
+            csp_solver.add_constraint([sel.then(analyzer.constraints[j]) for j in cs])
+        for (vi, val), learnt, negation in zip(
+            facts, self.learnt_selectors, self.negation_selectors
+        ):
+            csp_solver.add_constraint(learnt.then(analyzer.variables[vi] == val))
+            csp_solver.add_constraint(negation.then(analyzer.variables[vi] != val))
+        csp_solver.push()
+        self.csp_solver = csp_solver
+
+    def _follows(
+        self, fact_id: int, active_constraints: List[int], active_facts: List[int]
+    ) -> bool:
+        """Return whether the fact `fact_id` follows from the axioms, the optional constraints
+        `active_constraints` and the facts `active_facts`."""
+        analyzer = self.analyzer
+        if self.csp_solver is not None:
+            assumptions = [self.constraint_selectors[k] for k in active_constraints]
+            assumptions += [self.learnt_selectors[f] for f in active_facts]
+            assumptions.append(self.negation_selectors[fact_id])
+            return not self.csp_solver.solve_incremental(assumptions)
+
+        csp_solver = self.backend_type(analyzer.variables)
+        csp_solver.add_constraint([analyzer.constraints[j] for j in analyzer.axiom_constraints])
+        for k in active_constraints:
+            _, cs = analyzer.optional_constraints[k]
+            csp_solver.add_constraint([analyzer.constraints[j] for j in cs])
+        for f in active_facts:
+            vi, val = self.facts[f]
+            csp_solver.add_constraint(analyzer.variables[vi] == val)
+        vi, val = self.facts[fact_id]
+        csp_solver.add_constraint(analyzer.variables[vi] != val)
+        return not csp_solver.solve()
+
+    def test_unlearnt_fact(
+        self, fact_id: int, learnt_fact_ids: List[int]
+    ) -> Tuple[int, List[int], List[int]]:
+        is_active_constraint = [True for _ in range(len(self.analyzer.optional_constraints))]
+        is_active_fact = [True for _ in range(len(learnt_fact_ids))]
+
+        def check() -> bool:
+            return self._follows(
+                fact_id,
+                [k for k in range(len(is_active_constraint)) if is_active_constraint[k]],
+                [learnt_fact_ids[k] for k in range(len(is_active_fact)) if is_active_fact[k]],
+            )
 
         for j in range(len(is_active_constraint)):
             is_active_constraint[j] = False
@@ -111,73 +273,20 @@ class Analyzer(Solver):
         score = len(active_constraint_ids) + len(active_fact_ids)
         return score, active_constraint_ids, active_fact_ids
 
-    def analyze(self, n_workers: int = 0, backend: Union[None, str, type] = None):
-        backend_type = _get_backend(backend)
-        csp_solver = backend_type(self.variables)
-        csp_solver.add_constraint(self.constraints)
 
-        if not csp_solver.solve_irrefutably(self.is_answer_key):
-            return None
+# The checker of a worker process of `Analyzer.analyze`, set up once by `_init_worker`.
+_worker_checker: Optional[_FactChecker] = None
 
-        unlearnt_facts = []
-        for i, v in enumerate(self.variables):
-            if self.is_answer_key[i] and self.variables[i].sol is not None:
-                unlearnt_facts.append((i, self.variables[i].sol))
-        learnt_facts: List[Tuple[int, Union[bool, int]]] = []
 
-        res = []
-        while len(unlearnt_facts) > 0:
-            if n_workers >= 0:
-                with Pool(None if n_workers == 0 else n_workers) as pool:
-                    args = [
-                        (i, unlearnt_facts, learnt_facts, backend)
-                        for i in range(len(unlearnt_facts))
-                    ]
-                    cand_all = pool.starmap(self._test_unlearnt_fact, args)
-            else:
-                cand_all = [
-                    self._test_unlearnt_fact(i, unlearnt_facts, learnt_facts, backend)
-                    for i in range(len(unlearnt_facts))
-                ]
-
-            best_cand = min(cand_all)
-
-            _, active_constraint_ids, active_fact_ids = best_cand
-            csp_solver = backend_type(self.variables)
-            csp_solver.add_constraint([self.constraints[i] for i in self.axiom_constraints])
-            for k in active_constraint_ids:
-                _, cs = self.optional_constraints[k]
-                csp_solver.add_constraint([self.constraints[j] for j in cs])
-            for k in active_fact_ids:
-                vi, val = learnt_facts[k]
-                csp_solver.add_constraint(self.variables[vi] == val)
-
-            assert csp_solver.solve_irrefutably(self.is_answer_key)
-
-            new_learnt_facts = []
-            new_unlearnt_facts = []
-            for vi, val in unlearnt_facts:
-                if self.variables[vi].sol is not None:
-                    assert self.variables[vi].sol is val
-                    new_learnt_facts.append((vi, val))
-                else:
-                    new_unlearnt_facts.append((vi, val))
+def _init_worker(
+    analyzer: Analyzer, facts: List[Tuple[int, Union[bool, int]]], backend: Union[None, str, type]
+) -> None:
+    global _worker_checker
+    _worker_checker = _FactChecker(analyzer, facts, backend)
 
-            res.append(
-                (
-                    [(self.answer_key_name[i], val) for i, val in new_learnt_facts],
-                    [self.optional_constraints[i][0] for i in best_cand[1]],
-                    [self.answer_key_name[learnt_facts[i][0]] for i in best_cand[2]],
-                )
-            )
-            print(
-                (
-                    [(self.answer_key_name[i], val) for i, val in new_learnt_facts],
-                    [self.optional_constraints[i][0] for i in best_cand[1]],
-                    [self.answer_key_name[learnt_facts[i][0]] for i in best_cand[2]],
-                )
-            )
-            learnt_facts += new_learnt_facts  # type: ignore
-            unlearnt_facts = new_unlearnt_facts
 
-        return res
+def _test_unlearnt_fact_in_worker(
+    fact_id: int, learnt_fact_ids: List[int]
+) -> Tuple[int, List[int], List[int]]:
+    assert _worker_checker is not None
+    return _worker_checker.test_unlearnt_fact(fact_id, learnt_fact_ids)
@@ -1,5 +1,7 @@
 import collections.abc
 import functools
+import gc
+import itertools
 from typing import (
     Any,
     Generic,
@@ -10,6 +12,7 @@ from typing import (
     Optional,
     Sequence,
     Tuple,
+    Type,
     TypeVar,
     Union,
     cast,
@@ -20,12 +23,17 @@ from .expr import (
     BoolExpr,
     BoolExprLike,
     BoolOp,
+    BoolVar,
     Expr,
     ExprLike,
     IntExpr,
     IntExprLike,
     IntOp,
+    IntVar,
     Op,
+    _expr_factory,
+    _get_solutions,
+    _SolutionStore,
     is_bool_op,
 )
 
@@ -37,6 +45,9 @@ BoolArray1DLike = Union["BoolArray1D", Iterable[BoolExprLike]]
 class Array1D(Generic[T]):
     shape: Tuple[int]
     data: List[T]
+    # Set for arrays of variables created by `Solver.bool_array` and `Solver.int_array`: the
+    # solution store of the variables and the id of the first one (ids are consecutive).
+    _solution_range: Optional[Tuple[_SolutionStore, int]] = None
 
     def __init__(self, data: Iterable[T]):
         self.data = list(data)
@@ -126,6 +137,8 @@ def _range_size(start: int, stop: int, step: int) -> int:
 class Array2D(Generic[T]):
     shape: Tuple[int, int]
     data: List[T]
+    # see `Array1D._solution_range`
+    _solution_range: Optional[Tuple[_SolutionStore, int]] = None
 
     def __init__(
         self,
@@ -194,11 +207,12 @@ class Array2D(Generic[T]):
         if y_fixed and x_fixed:
             return self.data[y_start * self.shape[1] + x_start]
 
+        width = self.shape[1]
+        xs = range(x_start, x_start + x_step * x_size, x_step)
         data = []
-        for i in range(y_size * x_size):
-            y = y_start + y_step * (i // x_size)
-            x = x_start + x_step * (i % x_size)
-            data.append(self.data[y * self.shape[1] + x])
+        for i in range(y_size):
+            row = (y_start + y_step * i) * width
+            data.extend([self.data[row + x] for x in xs])
 
         if not (y_fixed or x_fixed):
             return Array2D(data, (y_size, x_size))
@@ -227,6 +241,10 @@ def _is_int_like(value: Any) -> bool:
     return isinstance(value, (IntExpr, int, IntArray1D, IntArray2D))
 
 
+_COMPARISON_OPS = frozenset([Op.EQ, Op.NE, Op.LE, Op.LT, Op.GE, Op.GT])
+_LOGICAL_OPS = frozenset([Op.AND, Op.OR, Op.IFF, Op.XOR, Op.IMP])
+_ARITHMETIC_OPS = frozenset([Op.ADD, Op.SUB])
+
 ElementwiseOperands = List[
     Union[BoolExprLike, "BoolArray1D", "BoolArray2D", IntExprLike, "IntArray1D", "IntArray2D"]
 ]
@@ -258,10 +276,10 @@ def _elementwise(
     op: Op, shape: Union[Tuple[int], Tuple[int, int]], operands: ElementwiseOperands
 ) -> Union["BoolArray1D", "IntArray1D", "BoolArray2D", "IntArray2D"]:
     # type check
-    if op in [Op.EQ, Op.NE, Op.LE, Op.LT, Op.GE, Op.GT]:
+    if op in _COMPARISON_OPS:
         if len(operands) != 2 or not all(map(_is_int_like, operands)):
             return NotImplemented
-    elif op in [Op.AND, Op.OR, Op.IFF, Op.XOR, Op.IMP]:
+    elif op in _LOGICAL_OPS:
         if len(operands) != 2 or not all(map(_is_bool_like, operands)):
             return NotImplemented
     elif op == Op.NOT:
@@ -270,7 +288,7 @@ def _elementwise(
     elif op == Op.ALLDIFF:
         if not all(map(_is_int_like, operands)):
             return NotImplemented
-    elif op in [Op.ADD, Op.SUB]:
+    elif op in _ARITHMETIC_OPS:
         if len(operands) != 2 or not all(map(_is_int_like, operands)):
             return NotImplemented
     elif op == Op.NEG:
@@ -300,30 +318,120 @@ def _elementwise(
 
     bool_op = is_bool_op(op)
 
-    res: List[Union[BoolExpr, IntExpr]] = []
-    for i in range(size):
-        expr_operands: List[ExprLike] = []
-        for j in range(len(operands)):
-            operand = operands[j]
-            if isinstance(operand, (Array1D, Array2D)):
-                expr_operands.append(operand.data[i])
-            else:
-                expr_operands.append(operand)
-        if bool_op:
-            res.append(BoolExpr(op, expr_operands))
-        else:
-            res.append(IntExpr(op, expr_operands))
+    # Operands have been validated above, so the tuples of operands of the elements are built by
+    # zipping the arrays (with scalars repeated) and passed to the factory as they are.
+    columns = [
+        (
+            operand.data
+            if isinstance(operand, (Array1D, Array2D))
+            else itertools.repeat(operand, size)
+        )
+        for operand in operands
+    ]
+    make = _expr_factory(BoolExpr if bool_op else IntExpr, op)
+    # Building many expressions at once triggers the cyclic garbage collector repeatedly, which
+    # would take most of the time though expressions never form reference cycles.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        res = list(map(make, zip(*columns)))
+    finally:
+        if gc_enabled:
+            gc.enable()
 
     if len(shape) == 1:
         if bool_op:
-            return BoolArray1D(cast(List[BoolExpr], res))
+            return _new_array(BoolArray1D, res, shape)
         else:
-            return IntArray1D(cast(List[IntExpr], res))
+            return _new_array(IntArray1D, res, shape)
     else:
         if bool_op:
-            return BoolArray2D(cast(List[BoolExpr], res), cast(Tuple[int, int], shape))
+            return _new_array(BoolArray2D, res, shape)
         else:
-            return IntArray2D(cast(List[IntExpr], res), cast(Tuple[int, int], shape))
+            return _new_array(IntArray2D, res, shape)
+
+
+A = TypeVar("A", bound=Union[Array1D[Any], Array2D[Any]])
+
+
+def _new_array(cls: Type[A], data: List[Any], shape: Union[Tuple[int], Tuple[int, int]]) -> A:
+    """Return an array of `cls` holding `data` (without copying it), whose consistency with
+    `shape` is ensured by the caller."""
+    ret = cls.__new__(cls)
+    ret.data = data
+    ret.shape = shape  # type: ignore
+    return ret
+
+
+def _array_solutions(
+    array: Union["BoolArray1D", "IntArray1D", "BoolArray2D", "IntArray2D"],
+) -> List[Union[None, bool, int]]:
+    """Return the solutions of the variables in `array` in the order of `data`, reading them
+    from the solution store in bulk where possible."""
+    solution_range = array._solution_range
+    if solution_range is None:
+        return _get_solutions(array.data)
+    store, start = solution_range
+    stop = start + len(array.data)
+    state = store.state[start:stop]
+    if isinstance(array, (BoolArray1D, BoolArray2D)):
+        return [None if s < 0 else s == 1 for s in state]
+    return [None if s < 0 else v for s, v in zip(state, store.ints[start:stop])]
+
+
+def _snapshot(array: Any) -> Any:
+    """Return an array of the same type and shape as `array`, which must consist of variables,
+    of new variables not belonging to any solver whose `sol` are the current solutions of those in
+    `array`. Unlike `array`, it is not affected by solving the problem again."""
+    ret = []
+    for v, sol in zip(array.data, _array_solutions(array)):
+        if isinstance(v, BoolVar):
+            w: Union[BoolVar, IntVar] = BoolVar(v.id)
+        else:
+            w = IntVar(v.id, v.lo, v.hi)
+        w._sol = sol
+        ret.append(w)
+    if isinstance(array, Array2D):
+        return array.__class__(ret, array.shape)
+    return array.__class__(ret)
+
+
+def _count_undecided(array: Union[Array1D[Any], Array2D[Any]]) -> int:
+    """Return the number of variables in `array` whose solutions are not decided."""
+    solution_range = array._solution_range
+    if solution_range is None:
+        return _get_solutions(array.data).count(None)
+    store, start = solution_range
+    return store.state[start : start + len(array.data)].count(-1)
+
+
+def _sol_array(array: Union["BoolArray1D", "IntArray1D", "BoolArray2D", "IntArray2D"]) -> Any:
+    """Return the solutions of the variables in `array` as a NumPy masked array of the same shape
+    (of `bool` or `int64`), in which undecided values are masked.
+
+    For arrays created by `Solver.bool_array` and `Solver.int_array`, the arrays are built from
+    the slices of the solution store without going through the variables. NumPy is required."""
+    import numpy as np  # type: ignore
+
+    is_bool = isinstance(array, (BoolArray1D, BoolArray2D))
+    solution_range = array._solution_range
+    if solution_range is not None:
+        store, start = solution_range
+        stop = start + len(array.data)
+        state = np.frombuffer(store.state[start:stop], dtype=np.int8)
+        mask = state < 0
+        if is_bool:
+            data = state == 1
+        else:
+            data = np.frombuffer(store.ints[start:stop], dtype=np.int64)
+    else:
+        sols = _get_solutions(array.data)
+        mask = np.array([s is None for s in sols], dtype=bool)
+        data = np.array(
+            [(False if is_bool else 0) if s is None else s for s in sols],
+            dtype=bool if is_bool else np.int64,
+        )
+    return np.ma.MaskedArray(data.reshape(array.shape), mask=mask.reshape(array.shape))
 
 
 BoolOperand1D = Union[BoolExprLike, "BoolArray1D"]
@@ -405,6 +513,11 @@ class BoolArray1D(Array1D[BoolExpr]):
 
         return cspuz.constraints.count_true(self.data)
 
+    def sol_array(self) -> Any:
+        """Return the solutions of the variables in this array as a NumPy masked array (see
+        `_sol_array`)."""
+        return _sol_array(self)
+
 
 class IntArray1D(Array1D[IntExpr]):
     def __init__(self, data: Iterable[IntExpr]):
@@ -461,6 +574,11 @@ class IntArray1D(Array1D[IntExpr]):
     def alldifferent(self) -> "BoolExpr":
         return BoolExpr(Op.ALLDIFF, self.data)
 
+    def sol_array(self) -> Any:
+        """Return the solutions of the variables in this array as a NumPy masked array (see
+        `_sol_array`)."""
+        return _sol_array(self)
+
 
 BoolOperand2D = Union[BoolExprLike, "BoolArray2D"]
 IntOperand2D = Union[IntExprLike, "IntArray2D"]
@@ -605,6 +723,11 @@ class BoolArray2D(Array2D[BoolExpr]):
 
         return cspuz.constraints.count_true(self.data)
 
+    def sol_array(self) -> Any:
+        """Return the solutions of the variables in this array as a NumPy masked array (see
+        `_sol_array`)."""
+        return _sol_array(self)
+
 
 class IntArray2D(Array2D[IntExpr]):
     @overload
@@ -715,6 +838,11 @@ class IntArray2D(Array2D[IntExpr]):
     def alldifferent(self) -> "BoolExpr":
         return BoolExpr(Op.ALLDIFF, self.data)
 
+    def sol_array(self) -> Any:
+        """Return the solutions of the variables in this array as a NumPy masked array (see
+        `_sol_array`)."""
+        return _sol_array(self)
+
 
 @overload
 def _reshape(array: Union[BoolArray1D, BoolArray2D], shape: Tuple[int, int]) -> BoolArray2D: ...
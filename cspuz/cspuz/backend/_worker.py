@@ -0,0 +1,336 @@
+"""
+Long-lived worker processes for the sugar-ext backend.
+
+Each worker is a `CspuzSugarInterface` process started in server mode
+(`sugar_ext.sh --server`). Requests and responses are framed as follows:
+
+- request: "<command> <session> <length>\\n" followed by <length> bytes of payload
+- response: "<length>\\n" followed by <length> bytes of payload
+
+See `sugar_extension/CspuzSugarInterface.java` for the list of commands.
+"""
+
+import atexit
+import itertools
+import os
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import psutil  # type: ignore
+
+    _PSUTIL_AVAILABLE = True
+except ImportError:
+    _PSUTIL_AVAILABLE = False
+
+# Idle workers are pinged before reuse if they have not served a request for this many seconds.
+_HEALTH_CHECK_INTERVAL = 30.0
+_HEALTH_CHECK_TIMEOUT = 10.0
+
+_session_counter = itertools.count()
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+class SugarWorker:
+    def __init__(self, args: List[str]) -> None:
+        self.args = args
+        self.sessions: set = set()
+        # sessions dropped while the worker was busy, sent to it once it is released
+        self.pending_drops: List[str] = []
+        self.last_used = time.monotonic()
+        self._buffer = bytearray()
+        self.proc = subprocess.Popen(
+            args + ["--server"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def is_alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def kill(self) -> None:
+        if not self.is_alive():
+            return
+        if _PSUTIL_AVAILABLE:
+            try:
+                parent = psutil.Process(self.proc.pid)
+                children = parent.children(recursive=True)
+                children.append(parent)
+                for p in children:
+                    p.send_signal(signal.SIGTERM)
+            except psutil.NoSuchProcess:
+                pass
+        else:
+            self.proc.kill()
+        self.proc.wait()
+
+    def request(
+        self, command: str, session: str, payload: str, timeout: Optional[float] = None
+    ) -> str:
+        data = payload.encode("ascii")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            assert self.proc.stdin is not None
+            self.proc.stdin.write(f"{command} {session} {len(data)}\n".encode("ascii") + data)
+            self.proc.stdin.flush()
+            length = int(self._read_line(deadline))
+            out = self._read_exact(length, deadline).decode("utf-8")
+        except subprocess.TimeoutExpired:
+            self.kill()
+            raise subprocess.TimeoutExpired(self.args, timeout)  # type: ignore
+        except (BrokenPipeError, ValueError) as e:
+            self.kill()
+            raise WorkerCrashed(f"sugar worker crashed: {e}")
+        self.last_used = time.monotonic()
+        if out.startswith("error"):
+            raise RuntimeError(f"sugar worker failed: {out}")
+        return out
+
+    def ping(self, timeout: float = _HEALTH_CHECK_TIMEOUT) -> bool:
+        try:
+            return self.request("ping", "-", "", timeout=timeout) == "pong"
+        except (subprocess.TimeoutExpired, WorkerCrashed, RuntimeError):
+            return False
+
+    def _fill(self, deadline: Optional[float]) -> None:
+        assert self.proc.stdout is not None
+        fd = self.proc.stdout.fileno()
+        with selectors.DefaultSelector() as sel:
+            sel.register(fd, selectors.EVENT_READ)
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not sel.select(remaining):
+                raise subprocess.TimeoutExpired(self.args, remaining)  # type: ignore
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            raise BrokenPipeError("unexpected EOF")
+        self._buffer += chunk
+
+    def _read_line(self, deadline: Optional[float]) -> bytes:
+        while True:
+            pos = self._buffer.find(b"\n")
+            if pos >= 0:
+                line = bytes(self._buffer[:pos])
+                del self._buffer[: pos + 1]
+                return line
+            self._fill(deadline)
+
+    def _read_exact(self, length: int, deadline: Optional[float]) -> bytes:
+        while len(self._buffer) < length:
+            self._fill(deadline)
+        data = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        return data
+
+
+class SugarWorkerPool:
+    """A pool of at most `size` workers running `args` in server mode."""
+
+    def __init__(self, args: List[str], size: int) -> None:
+        self.args = args
+        self.size = size
+        self.pid = os.getpid()
+        self._idle: List[SugarWorker] = []
+        self._num_workers = 0
+        self._cond = threading.Condition()
+        self._session_owner: Dict[str, SugarWorker] = {}
+        self._features: Optional[Set[str]] = None
+
+    def _acquire(self, preferred: Optional[SugarWorker] = None) -> SugarWorker:
+        with self._cond:
+            while True:
+                if preferred is not None and preferred in self._idle:
+                    self._idle.remove(preferred)
+                    worker = preferred
+                    break
+                if preferred is None and self._idle:
+                    worker = self._idle.pop()
+                    break
+                if preferred is not None and not preferred.is_alive():
+                    preferred = None
+                    continue
+                if preferred is None and self._num_workers < self.size:
+                    self._num_workers += 1
+                    try:
+                        return SugarWorker(self.args)
+                    except BaseException:
+                        self._num_workers -= 1
+                        raise
+                self._cond.wait()
+
+        if not worker.is_alive() or (
+            time.monotonic() - worker.last_used > _HEALTH_CHECK_INTERVAL and not worker.ping()
+        ):
+            worker = self._respawn(worker)
+        return worker
+
+    def _release(self, worker: SugarWorker) -> None:
+        while worker.is_alive():
+            with self._cond:
+                drops, worker.pending_drops = worker.pending_drops, []
+            if not drops:
+                break
+            for session in drops:
+                self._request_drop(worker, session)
+        with self._cond:
+            if worker.is_alive():
+                self._idle.append(worker)
+            else:
+                self._num_workers -= 1
+                self._forget_sessions(worker)
+            self._cond.notify_all()
+
+    def _respawn(self, worker: SugarWorker) -> SugarWorker:
+        worker.kill()
+        with self._cond:
+            self._forget_sessions(worker)
+        return SugarWorker(self.args)
+
+    def _forget_sessions(self, worker: SugarWorker) -> None:
+        for session in worker.sessions:
+            if self._session_owner.get(session) is worker:
+                del self._session_owner[session]
+        worker.sessions.clear()
+        worker.pending_drops.clear()
+
+    def features(self) -> Set[str]:
+        """Return the set of optional features (e.g. `compact` for the compact dialect) supported
+        by the workers, which is queried once per pool."""
+        if self._features is None:
+            worker = self._acquire()
+            try:
+                out = worker.request("features", "-", "", timeout=_HEALTH_CHECK_TIMEOUT)
+            except WorkerCrashed:
+                raise
+            except RuntimeError:
+                # workers predating the `features` command
+                out = ""
+            finally:
+                self._release(worker)
+            self._features = set(out.split())
+        return self._features
+
+    def solve(self, csp_description: str, timeout: Optional[float] = None) -> str:
+        worker = self._acquire()
+        try:
+            try:
+                return worker.request("solve", "-", csp_description, timeout=timeout)
+            except WorkerCrashed:
+                # retry once on a fresh worker
+                worker = self._respawn(worker)
+                return worker.request("solve", "-", csp_description, timeout=timeout)
+        finally:
+            self._release(worker)
+
+    def solve_session(
+        self,
+        session: str,
+        base_description: Callable[[], str],
+        constraints: List[str],
+        num_shipped: int,
+        timeout: Optional[float] = None,
+    ) -> Tuple[str, int]:
+        """Solve an incremental session.
+
+        `constraints[:num_shipped]` must have been shipped to the worker owning `session` by a
+        previous call. Only `constraints[num_shipped:]` are sent unless the session has been
+        lost (e.g. the worker crashed or evicted it), in which case it is loaded again together
+        with `base_description()`, which is called only then.
+
+        Returns the solver output and the number of constraints shipped to the worker.
+        """
+        with self._cond:
+            owner = self._session_owner.get(session)
+        worker = self._acquire(owner)
+        try:
+            for _ in range(2):
+                try:
+                    if session not in worker.sessions:
+                        shipped_desc = "\n".join([base_description()] + constraints[:num_shipped])
+                        worker.request("load", session, shipped_desc, timeout=timeout)
+                        worker.sessions.add(session)
+                        with self._cond:
+                            self._session_owner[session] = worker
+                    out = worker.request(
+                        "add", session, "\n".join(constraints[num_shipped:]), timeout=timeout
+                    )
+                except WorkerCrashed:
+                    worker = self._respawn(worker)
+                    continue
+                if out == "nosession":
+                    worker.sessions.discard(session)
+                    continue
+                return out, len(constraints)
+            raise WorkerCrashed("sugar worker repeatedly failed to serve the session")
+        finally:
+            self._release(worker)
+
+    def drop_session(self, session: str) -> None:
+        with self._cond:
+            worker = self._session_owner.pop(session, None)
+            if worker is None:
+                return
+            worker.sessions.discard(session)
+            if worker not in self._idle:
+                # the worker is busy; the session is dropped when the worker is released
+                worker.pending_drops.append(session)
+                return
+            self._idle.remove(worker)
+        self._request_drop(worker, session)
+        self._release(worker)
+
+    def _request_drop(self, worker: SugarWorker, session: str) -> None:
+        try:
+            worker.request("drop", session, "", timeout=_HEALTH_CHECK_TIMEOUT)
+        except (subprocess.TimeoutExpired, WorkerCrashed, RuntimeError):
+            pass
+
+    def shutdown(self) -> None:
+        with self._cond:
+            workers = self._idle
+            self._idle = []
+            self._num_workers -= len(workers)
+            self._session_owner.clear()
+        for worker in workers:
+            worker.kill()
+
+
+_pools: Dict[Tuple[str, ...], SugarWorkerPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(args: List[str], size: int) -> SugarWorkerPool:
+    """Return the worker pool for `args`, creating it if necessary.
+
+    Pools are shared by all backends in the process. Pools inherited through `fork` are not
+    reused, since their pipes are shared with the parent process.
+    """
+    key = tuple(args)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = SugarWorkerPool(args, size)
+            _pools[key] = pool
+        else:
+            pool.size = size
+        return pool
+
+
+def new_session_id() -> str:
+    return f"s{os.getpid()}_{next(_session_counter)}"
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            if pool.pid == os.getpid():
+                pool.shutdown()
+        _pools.clear()
@@ -2,10 +2,59 @@ from typing import Optional
 
 
 class Backend:
+    #: Whether this backend implements the incremental solving session API
+    #: (`push`, `add` and `solve_incremental`). Only `Z3Backend` and `SugarExtendedBackend` (in
+    #: the worker server mode) keep the solver state across calls; the other sugar-like backends
+    #: re-ship the whole problem text on each `solve_incremental` and implement the API for
+    #: assumption-based solving only.
+    supports_incremental: bool = False
+    #: Whether this backend implements `copy` and `add_variables`.
+    supports_copy: bool = False
+
     def solve(self):
         raise NotImplementedError
 
-    def solve_irrefutably(self, is_answer_key):
+    def solve_irrefutably(self, is_answer_key, assumptions: Optional[list] = None):
+        """Find the values of the answer keys which are common to all solutions, storing them to
+        `sol` of the variables (`None` if not unique). `assumptions` is a list of Boolean literals
+        assumed to hold for this call only, as in `solve_incremental`."""
+        raise NotImplementedError
+
+    def push(self) -> None:
+        """Start an incremental solving session.
+
+        The constraints added so far are encoded once and kept alive in the
+        backend. Constraints passed to `add` afterwards are shipped on top of
+        them, so that repeated calls to `solve_incremental` do not re-encode
+        the whole problem.
+        """
+        raise NotImplementedError
+
+    def add(self, constraint) -> None:
+        """Add `constraint` (or a list of constraints) to the current
+        incremental session."""
+        raise NotImplementedError
+
+    def solve_incremental(self, assumptions: Optional[list] = None) -> bool:
+        """Solve the problem consisting of the constraints in the current
+        incremental session. Solutions are stored to `sol` of the variables
+        as in `solve`.
+
+        `assumptions` is a list of Boolean literals (`BoolVar`s or their
+        negations), or more generally Boolean expressions, which are assumed
+        to hold for this call only. Guarding
+        constraints with selector variables (`s.then(c)`) and assuming the
+        selectors enables and disables them without re-encoding."""
+        raise NotImplementedError
+
+    def copy(self) -> "Backend":
+        """Return a new backend with the variables and constraints added so
+        far. Constraints added to either of them afterwards do not affect the
+        other one."""
+        raise NotImplementedError
+
+    def add_variables(self, variables) -> None:
+        """Add variables created after this backend was constructed."""
         raise NotImplementedError
 
     def perf_stats(self) -> Optional[dict]:
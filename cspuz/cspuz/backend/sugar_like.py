@@ -2,12 +2,18 @@
 CSP backend using the Sugar CSP solver (http://bach.istc.kobe-u.ac.jp/sugar/).
 """
 
-from typing import Optional
+import copy
+import io
+import itertools
+import re
+import weakref
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 from ..configuration import config
-from ..expr import Op, Expr, BoolVar, IntVar
+from ..expr import Op, Expr, ExprVisitor, BoolVar, IntVar, _set_solutions, walk
 
 from .backend import Backend
+from . import _worker
 from ._subproc import run_subprocess
 
 OP_TO_OPNAME = {
@@ -32,6 +38,91 @@ OP_TO_OPNAME = {
     Op.GRAPH_DIVISION: "graph-division",
 }
 
+# Operator names in the compact dialect understood by `CspuzSugarInterface`. In this dialect,
+# - the text starts with the line `#!compact`,
+# - `int` and `bool` declarations are written as `I` and `B`, and `true` and `false` as `t` and
+#   `f`,
+# - `(Bs b0 n)` and `(Is i0 n lo hi)` declare `n` variables of consecutive ids starting from `b0`
+#   and `i0` at once,
+# - the ids in variable names are in base 36 (e.g. `b1z` instead of `b71`), and
+# - `($N e)` defines `$N` as a shorthand of `e` (where `N` is a base-36 number) and stands for `e`
+#   itself; `$N` is used in place of `e` from then on.
+COMPACT_OP_TO_OPNAME = {
+    **OP_TO_OPNAME,
+    Op.AND: "&",
+    Op.OR: "|",
+    Op.IFF: "==",
+    Op.XOR: "^",
+    Op.IF: "?",
+    Op.ALLDIFF: "ad",
+    Op.GRAPH_ACTIVE_VERTICES_CONNECTED: "gc",
+    Op.GRAPH_DIVISION: "gd",
+}
+COMPACT_HEADER = "#!compact\n"
+
+_BASE36_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+_base36_cache: Dict[int, str] = {}
+
+
+def _base36(n: int) -> str:
+    ret = _base36_cache.get(n)
+    if ret is None:
+        digits = []
+        m = n
+        while True:
+            m, d = divmod(m, 36)
+            digits.append(_BASE36_DIGITS[d])
+            if m == 0:
+                break
+        ret = _base36_cache[n] = "".join(reversed(digits))
+    return ret
+
+
+def _variable_name(v, compact: bool = False) -> str:
+    if isinstance(v, BoolVar):
+        prefix = "b"
+    elif isinstance(v, IntVar):
+        prefix = "i"
+    else:
+        raise TypeError()
+    return prefix + (_base36(v.id) if compact else str(v.id))
+
+
+def _convert_variables_compact(variables) -> List[str]:
+    """Return the declarations of `variables` in the compact dialect, where each run of variables
+    of consecutive ids (and the same domain) is declared at once."""
+    ret = []
+    n = len(variables)
+    i = 0
+    while i < n:
+        v = variables[i]
+        cls = v.__class__
+        j = i + 1
+        if cls is BoolVar:
+            while j < n and variables[j].__class__ is BoolVar and variables[j].id == v.id + j - i:
+                j += 1
+            if j == i + 1:
+                ret.append("(B b" + _base36(v.id) + ")")
+            else:
+                ret.append("(Bs b{} {})".format(_base36(v.id), j - i))
+        elif cls is IntVar:
+            while (
+                j < n
+                and variables[j].__class__ is IntVar
+                and variables[j].id == v.id + j - i
+                and variables[j].lo == v.lo
+                and variables[j].hi == v.hi
+            ):
+                j += 1
+            if j == i + 1:
+                ret.append("(I i{} {} {})".format(_base36(v.id), v.lo, v.hi))
+            else:
+                ret.append("(Is i{} {} {} {})".format(_base36(v.id), j - i, v.lo, v.hi))
+        else:
+            raise TypeError()
+        i = j
+    return ret
+
 
 def _convert_variable(v):
     if isinstance(v, BoolVar):
@@ -42,7 +133,14 @@ def _convert_variable(v):
         raise TypeError()
 
 
-def _convert_expr(e):
+def _convert_atom(e):
+    cls = e.__class__
+    if cls is BoolVar:
+        return "b" + str(e.id)
+    if cls is IntVar:
+        return "i" + str(e.id)
+    if cls is int:
+        return str(e)
     if e is None:
         return "*"
     if isinstance(e, bool):
@@ -51,97 +149,306 @@ def _convert_expr(e):
         return str(e)
     if not isinstance(e, Expr):
         raise TypeError()
-
-    if isinstance(e, BoolVar):
-        return "b{}".format(e.id)
-    elif isinstance(e, IntVar):
-        return "i{}".format(e.id)
-    elif e.op == Op.BOOL_CONSTANT:
+    if e.op == Op.BOOL_CONSTANT:
         return "true" if e.operands[0] else "false"
-    elif e.op == Op.INT_CONSTANT:
+    if e.op == Op.INT_CONSTANT:
         return str(e.operands[0])
-    else:
-        return "({} {})".format(OP_TO_OPNAME[e.op], " ".join(map(_convert_expr, e.operands)))
+    raise TypeError()
+
+
+def _convert_atom_compact(e):
+    cls = e.__class__
+    if cls is BoolVar:
+        return "b" + _base36(e.id)
+    if cls is IntVar:
+        return "i" + _base36(e.id)
+    if cls is int:
+        return str(e)
+    ret = _convert_atom(e)
+    if ret == "true":
+        return "t"
+    if ret == "false":
+        return "f"
+    return ret
+
+
+class _CspWriter(ExprVisitor):
+    """Serializer of expressions into Sugar CSP text.
+
+    Expressions are written token by token into `out` by `walk`, so that deep expressions (e.g.
+    long `ADD` chains) do not hit the recursion limit.
+
+    The text of compound subexpressions which are written more than once is memoized per
+    expression object: the first occurrence is streamed, the second one is rendered to a string
+    which is reused from then on. If `compact` is set, the text is written in the compact dialect
+    (see `COMPACT_OP_TO_OPNAME`), where the second occurrence defines a shorthand instead, which
+    is written from then on.
+    """
+
+    def __init__(self, out: io.StringIO, memoize: bool = True, compact: bool = False) -> None:
+        self.out = out
+        self._memoize = memoize
+        self._compact = compact
+        self._opnames = COMPACT_OP_TO_OPNAME if compact else OP_TO_OPNAME
+        self._convert_atom = _convert_atom_compact if compact else _convert_atom
+        # ids of compound expressions written so far. A stale id (of an expression which has been
+        # garbage-collected) only makes us memoize a subexpression needlessly, since `_memo`
+        # keeps the expressions it refers to alive.
+        self._seen: Set[int] = set()
+        self._memo: Dict[int, Tuple[Expr, str]] = {}
+        # whether the next token is the first one of the expression being written
+        self._first = True
+
+    def write(self, e) -> None:
+        self._first = True
+        walk(e, self)
+
+    def render(self, e) -> str:
+        out = io.StringIO()
+        self._sibling(out, True).write(e)
+        return out.getvalue()
+
+    def _sibling(self, out: io.StringIO, memoize: bool) -> "_CspWriter":
+        ret = _CspWriter(out, memoize, self._compact)
+        ret._seen = self._seen
+        ret._memo = self._memo
+        return ret
+
+    def enter(self, e: Expr) -> bool:
+        if self._first:
+            self._first = False
+        else:
+            self.out.write(" ")
+        key = id(e)
+        m = self._memo.get(key)
+        if m is not None:
+            self.out.write(m[1])
+            return False
+        if self._memoize:
+            if key in self._seen:
+                # the sibling reads the memo but never extends it, so this does not recurse further
+                out = io.StringIO()
+                self._sibling(out, False).write(e)
+                text = out.getvalue()
+                if self._compact:
+                    # `_memo` only grows, so its size gives a fresh shorthand
+                    name = "$" + _base36(len(self._memo))
+                    self._memo[key] = (e, name)
+                    self.out.write("(" + name + " " + text + ")")
+                else:
+                    self._memo[key] = (e, text)
+                    self.out.write(text)
+                return False
+            self._seen.add(key)
+        self.out.write("(" + self._opnames[e.op])
+        return True
+
+    def leave(self, e: Expr) -> None:
+        self.out.write(")")
+
+    def leaf(self, x) -> None:
+        if self._first:
+            self._first = False
+            self.out.write(self._convert_atom(x))
+        else:
+            self.out.write(" " + self._convert_atom(x))
+
+
+# Lines of values in the answer finder mode (`a b0\ttrue`) and the deduction mode (`b0 true`) of
+# the textual output of Sugar-like solvers. The answer finder mode ends with a line `a`, which
+# does not match.
+_ASSIGNMENT_RE = re.compile(r"^(?:a )?[bi](\d+)[\t ](\S+)$", re.MULTILINE)
+_BOOL_VALUES = {"true": True, "false": False}
+_COMPACT_BOOL_VALUES = {"1": True, "0": False, "*": None}
+
+
+def _parse_assignment(body: str, size: int) -> List[Union[None, bool, int]]:
+    """Return the list of values indexed by variable ids, given in the textual output `body`."""
+    assignment: List[Union[None, bool, int]] = [None] * size
+    bool_values = _BOOL_VALUES
+    for var_id, val in _ASSIGNMENT_RE.findall(body):
+        converted_val = bool_values.get(val)
+        assignment[int(var_id)] = int(val) if converted_val is None else converted_val
+    return assignment
+
+
+def _parse_compact(body: str) -> Tuple[List[Optional[int]], List[Optional[bool]]]:
+    """Return the values of integer and Boolean variables given in the compact output `body`.
+
+    The compact output (produced by `CspuzSugarInterface`) consists of the line `vi` followed by
+    the values of integer variables separated by spaces, and the line `vb ` followed by a
+    character `1` or `0` for each Boolean variable, in the order of declarations (of only the
+    answer keys in the deduction mode, where `*` stands for a value which is not unique)."""
+    int_line, _, rest = body.partition("\n")
+    bool_line = rest.partition("\n")[0]
+    if not bool_line.startswith("vb"):
+        raise ValueError("malformed compact answer")
+    int_values = [None if t == "*" else int(t) for t in int_line[2:].split()]
+    bool_values = list(map(_COMPACT_BOOL_VALUES.__getitem__, bool_line[3:]))
+    return int_values, bool_values
 
 
 class SugarLikeBackend(Backend):
+    supports_incremental = True
+    supports_copy = True
+    # whether the problem is written in the compact dialect (see `COMPACT_OP_TO_OPNAME`)
+    _compact_dialect = False
+
     def __init__(self, variables):
-        self.variables = variables
-        max_var_id = -1
-        for v in self.variables:
-            if isinstance(v, (BoolVar, IntVar)):
-                max_var_id = max(max_var_id, v.id)
-            else:
+        self.variables = []
+        self.max_var_id = -1
+        self._buffer = io.StringIO()
+        self._writer = _CspWriter(self._buffer, compact=self._compact_dialect)
+        if self._compact_dialect:
+            self._buffer.write(COMPACT_HEADER)
+        self._session_start: Optional[int] = None
+        self._session_constraints: List[str] = []
+        self.add_variables(variables)
+
+    def add_variables(self, variables):
+        variables = list(variables)
+        for v in variables:
+            if not isinstance(v, (BoolVar, IntVar)):
                 raise TypeError()
-        self.max_var_id = max_var_id
-        self.converted_variables = list(map(_convert_variable, self.variables))
-        self.converted_constraints = []
+            self.max_var_id = max(self.max_var_id, v.id)
+        self.variables += variables
+        if self._compact_dialect:
+            declarations = _convert_variables_compact(variables)
+        else:
+            declarations = list(map(_convert_variable, variables))
+        for text in declarations:
+            if self._session_start is not None:
+                self._session_constraints.append(text)
+            self._buffer.write(text)
+            self._buffer.write("\n")
+
+    def copy(self):
+        if self._session_start is not None:
+            raise ValueError("a backend in an incremental session cannot be copied")
+        ret = copy.copy(self)
+        ret.variables = list(self.variables)
+        ret._buffer = io.StringIO()
+        ret._buffer.write(self._buffer.getvalue())
+        ret._writer = _CspWriter(ret._buffer, compact=self._compact_dialect)
+        ret._session_constraints = []
+        return ret
 
     def add_constraint(self, constraint):
         if isinstance(constraint, list):
-            self.converted_constraints += map(_convert_expr, constraint)
+            for c in constraint:
+                self._write_constraint(c)
         else:
-            self.converted_constraints.append(_convert_expr(constraint))
+            self._write_constraint(constraint)
+
+    def _write_constraint(self, constraint) -> None:
+        self._writer.write(constraint)
+        self._buffer.write("\n")
+
+    def _write_temporary_constraint(self, constraint) -> None:
+        # Constraints which are removed from the buffer later must not memoize subexpressions, as
+        # shorthands defined in them would be referred to after they are gone.
+        self._writer._sibling(self._buffer, False).write(constraint)
+        self._buffer.write("\n")
 
     def solve(self):
-        csp_description = "\n".join(self.converted_variables + self.converted_constraints)
-        out = self._call_solver(csp_description).split("\n")
-        if "UNSATISFIABLE" in out[0]:
-            for v in self.variables:
-                v.sol = None
+        return self._parse_answer(self._call_solver(self._buffer.getvalue()))
+
+    def push(self):
+        self._session_start = self._buffer.tell()
+        self._session_constraints = []
+
+    def add(self, constraint):
+        # Session constraints are appended to the problem text as well as kept separately, so that
+        # backends with a persistent solver can ship only the new ones.
+        if not isinstance(constraint, list):
+            constraint = [constraint]
+        for c in constraint:
+            text = self._writer.render(c)
+            self._session_constraints.append(text)
+            self._buffer.write(text)
+            self._buffer.write("\n")
+
+    def solve_incremental(self, assumptions=None):
+        if self._session_start is None:
+            raise ValueError("no incremental session is active; call push() first")
+        return self._solve_with_assumptions(assumptions)
+
+    def _solve_with_assumptions(self, assumptions) -> bool:
+        if not assumptions:
+            return self._parse_answer(self._call_solver(self._buffer.getvalue()))
+
+        # assumptions are appended as constraints for this call only
+        buf = self._buffer
+        end = buf.tell()
+        for a in assumptions:
+            self._write_temporary_constraint(a)
+        csp_description = buf.getvalue()
+        buf.truncate(end)
+        buf.seek(end)
+        return self._parse_answer(self._call_solver(csp_description))
+
+    def _session_description(self) -> str:
+        """Return the problem text at the time `push` was called."""
+        assert self._session_start is not None
+        buf = self._buffer
+        buf.seek(0)
+        ret = buf.read(self._session_start)
+        buf.seek(0, io.SEEK_END)
+        return ret
+
+    def _parse_answer(self, answer: str) -> bool:
+        status, _, body = answer.partition("\n")
+        if "UNSATISFIABLE" in status:
+            _set_solutions(self.variables, itertools.repeat(None))
             return False
-
-        assignment = [None] * (self.max_var_id + 1)
-        for line in out[1:]:
-            if len(line) <= 2:
-                break
-            var, val = line[2:].strip().split("\t")
-            if val == "true":
-                converted_val = True
-            elif val == "false":
-                converted_val = False
-            else:
-                converted_val = int(val)
-            assignment[int(var[1:])] = converted_val
-        for v in self.variables:
-            v.sol = assignment[v.id]
+        self._load_answer(body, None)
         return True
 
-    def solve_irrefutably(self, is_answer_key):
+    def _load_answer(self, body: str, is_answer_key: Optional[List[bool]]) -> None:
+        """Store the values given in `body`, the output of a solver following its status line, to
+        the variables (only the answer keys in the deduction mode, for which `is_answer_key` is
+        given)."""
+        if not body.startswith("vi"):
+            assignment = _parse_assignment(body, self.max_var_id + 1)
+            _set_solutions(self.variables, [assignment[v.id] for v in self.variables])
+            return
+
+        # compact format (see `_parse_compact`)
+        int_vars = []
+        bool_vars = []
+        for i, v in enumerate(self.variables):
+            if is_answer_key is None or is_answer_key[i]:
+                if isinstance(v, IntVar):
+                    int_vars.append(v)
+                else:
+                    bool_vars.append(v)
+        int_values, bool_values = _parse_compact(body)
+        if len(int_values) != len(int_vars) or len(bool_values) != len(bool_vars):
+            raise ValueError("the number of values in the answer does not match the variables")
+        if is_answer_key is not None:
+            _set_solutions(self.variables, itertools.repeat(None))
+        _set_solutions(int_vars, int_values)
+        _set_solutions(bool_vars, bool_values)
+
+    def solve_irrefutably(self, is_answer_key, assumptions=None):
         answer_keys = []
         for i in range(len(self.variables)):
             if is_answer_key[i]:
-                if isinstance(self.variables[i], BoolVar):
-                    answer_keys.append("b{}".format(self.variables[i].id))
-                elif isinstance(self.variables[i], IntVar):
-                    answer_keys.append("i{}".format(self.variables[i].id))
-                else:
-                    raise TypeError()
+                answer_keys.append(_variable_name(self.variables[i], self._compact_dialect))
         answer_keys_desc = "#" + " ".join(answer_keys)
-        csp_description = "\n".join(
-            self.converted_variables + self.converted_constraints + [answer_keys_desc]
-        )
-        out = self._call_solver(csp_description).split("\n")
-        for v in self.variables:
-            v.sol = None
-
-        if "unsat" in out[0]:
+        buf = self._buffer
+        end = buf.tell()
+        for a in assumptions or []:
+            self._write_temporary_constraint(a)
+        buf.write(answer_keys_desc)
+        csp_description = buf.getvalue()
+        buf.truncate(end)
+        buf.seek(end)
+        status, _, body = self._call_solver(csp_description).partition("\n")
+        if "unsat" in status:
+            _set_solutions(self.variables, itertools.repeat(None))
             return False
-
-        assignment = [None] * (self.max_var_id + 1)
-        for line in out[1:]:
-            if len(line) <= 2:
-                break
-            var, val = line.split(" ")
-            if val == "true":
-                converted_val = True
-            elif val == "false":
-                converted_val = False
-            else:
-                converted_val = int(val)
-            assignment[int(var[1:])] = converted_val
-        for v in self.variables:
-            v.sol = assignment[v.id]
+        self._load_answer(body, is_answer_key)
         return True
 
     def _call_solver(self, csp_description: str) -> str:
@@ -149,8 +456,25 @@ class SugarLikeBackend(Backend):
 
 
 class SugarBackend(SugarLikeBackend):
-    def solve_irrefutably(self, is_answer_key):
-        raise NotImplementedError
+    # Each call spawns a new solver process, so `Solver.solve` enumerating solutions in a session
+    # would re-encode the whole problem for every round.
+    supports_incremental = False
+
+    def solve_irrefutably(self, is_answer_key, assumptions=None):
+        # imported here as `cspuz.solver` depends on this module
+        from ..solver import _solve_backbone
+
+        # Sugar has no deduction mode, but the chunked backbone algorithm needs far fewer solver
+        # processes than enumerating solutions.
+        if not _solve_backbone(
+            self._solve_with_assumptions, self.variables, is_answer_key, assumptions
+        ):
+            return False
+        _set_solutions(
+            itertools.compress(self.variables, [not k for k in is_answer_key]),
+            itertools.repeat(None),
+        )
+        return True
 
     def _call_solver(self, csp_description: str) -> str:
         sugar_path = config.backend_path or "sugar"
@@ -161,7 +485,58 @@ class SugarBackend(SugarLikeBackend):
 
 
 class SugarExtendedBackend(SugarLikeBackend):
+    def __init__(self, variables):
+        if config.sugar_compact_dialect:
+            pool = self._worker_pool()
+            self._compact_dialect = pool is None or "compact" in pool.features()
+        super().__init__(variables)
+        self._session_id: Optional[str] = None
+        self._num_shipped = 0
+        self._drop_session: Optional[weakref.finalize] = None
+
+    def _worker_pool(self) -> Optional[_worker.SugarWorkerPool]:
+        if config.sugar_worker_pool_size <= 0:
+            return None
+        sugar_path = config.backend_path or "sugar"
+        return _worker.get_pool([sugar_path], config.sugar_worker_pool_size)
+
+    def push(self):
+        super().push()
+        if self._drop_session is not None:
+            # the previous session is no longer reachable
+            self._drop_session()
+            self._drop_session = None
+            self._session_id = None
+        pool = self._worker_pool()
+        if pool is not None:
+            self._session_id = _worker.new_session_id()
+            self._num_shipped = 0
+            self._drop_session = weakref.finalize(self, pool.drop_session, self._session_id)
+
+    def solve_incremental(self, assumptions=None):
+        pool = self._worker_pool()
+        if (
+            pool is None
+            or self._session_id is None
+            or self._session_start is None
+            or assumptions
+        ):
+            # the worker sessions have no notion of temporary constraints, so problems with
+            # assumptions are solved from scratch
+            return super().solve_incremental(assumptions)
+        out, self._num_shipped = pool.solve_session(
+            self._session_id,
+            self._session_description,
+            self._session_constraints,
+            self._num_shipped,
+            timeout=config.solver_timeout,
+        )
+        return self._parse_answer(out)
+
     def _call_solver(self, csp_description: str) -> str:
+        pool = self._worker_pool()
+        if pool is not None:
+            return pool.solve(csp_description, timeout=config.solver_timeout)
         sugar_path = config.backend_path or "sugar"
         out = run_subprocess(
             [sugar_path, "/dev/stdin"], csp_description, timeout=config.solver_timeout
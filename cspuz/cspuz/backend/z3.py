@@ -1,20 +1,128 @@
 import importlib
+import itertools
+from typing import Any
 
 from .backend import Backend
-from ..expr import Op, Expr, BoolVar, IntVar
+from ..expr import Op, Expr, ExprTransformer, BoolVar, IntVar, _set_solutions
 
 z3 = None
 
 
-def _convert_expr(e, variables_dict):
-    if isinstance(e, (bool, int)):
-        return e
-    if not isinstance(e, Expr):
-        raise TypeError()
-    if isinstance(e, (BoolVar, IntVar)):
-        return variables_dict[e.id]
-    else:
-        operands = list(map(lambda x: _convert_expr(x, variables_dict), e.operands))
+# Graph primitives are lowered to constraints with auxiliary variables, which are meant to be
+# existentially quantified. This is valid only for top-level constraints, so `_Z3Converter`
+# rejects graph primitives elsewhere (e.g. under a negation, `then` or `|`).
+
+_GRAPH_OPS = (Op.GRAPH_ACTIVE_VERTICES_CONNECTED, Op.GRAPH_DIVISION)
+
+
+def _active_vertices_connected(operands):
+    n, m = operands[0], operands[1]
+    is_active = operands[2 : 2 + n]
+    edges = operands[2 + n : 2 + n + 2 * m]
+    adjacent = [[] for _ in range(n)]
+    for i in range(m):
+        u = edges[i * 2]
+        v = edges[i * 2 + 1]
+        adjacent[u].append(v)
+        adjacent[v].append(u)
+
+    # Each active vertex except the (unique) root has an active neighbor of smaller rank, so that
+    # following them leads to the root.
+    rank = [z3.FreshInt("rank") for _ in range(n)]
+    is_root = [z3.FreshBool("root") for _ in range(n)]
+    ret = []
+    for v in range(n):
+        if is_active[v] is False:
+            ret.append(z3.Not(is_root[v]))
+            continue
+        parent_cand = [
+            z3.And(is_active[u], rank[u] < rank[v])
+            for u in adjacent[v]
+            if is_active[u] is not False
+        ]
+        ret.append(z3.Implies(is_root[v], is_active[v]))
+        ret.append(z3.Implies(is_active[v], z3.Or(is_root[v], *parent_cand)))
+    if n > 0:
+        ret.append(z3.AtMost(*is_root, 1))
+    return z3.And(ret)
+
+
+def _graph_division(operands):
+    n, m = operands[0], operands[1]
+    group_size = operands[2 : 2 + n]
+    edges = operands[2 + n : 2 + n + 2 * m]
+    is_border = operands[2 + n + 2 * m : 2 + n + 3 * m]
+    has_size = any(s is not None for s in group_size)
+
+    # Every vertex is labeled with the index of the root of its group, and each vertex except the
+    # roots chooses its parent among the neighbors in the same group with smaller rank. The parent
+    # relation forms a spanning tree of each group, over which the group sizes are counted.
+    group_id = [z3.FreshInt("group") for _ in range(n)]
+    rank = [z3.FreshInt("rank") for _ in range(n)]
+    if has_size:
+        subtree_size = [z3.FreshInt("subtree_size") for _ in range(n)]
+        total_size = [z3.FreshInt("total_size") for _ in range(n)]
+    parents = [[] for _ in range(n)]
+    children = [[] for _ in range(n)]
+    ret = []
+    for i in range(m):
+        u = edges[i * 2]
+        v = edges[i * 2 + 1]
+        border = is_border[i]
+        ret.append(z3.If(border, group_id[u] != group_id[v], group_id[u] == group_id[v]))
+        if has_size:
+            ret.append(z3.Implies(z3.Not(border), total_size[u] == total_size[v]))
+        for p, c in [(u, v), (v, u)]:
+            is_parent = z3.FreshBool("parent")
+            ret.append(z3.Implies(is_parent, z3.And(z3.Not(border), rank[p] < rank[c])))
+            parents[c].append(is_parent)
+            children[p].append((is_parent, c))
+
+    for v in range(n):
+        ret.append(z3.And(0 <= group_id[v], group_id[v] < n, 0 <= rank[v], rank[v] < n))
+        is_root = group_id[v] == v
+        if parents[v]:
+            ret.append(z3.Implies(is_root, z3.Not(z3.Or(parents[v]))))
+            ret.append(z3.Implies(z3.Not(is_root), z3.PbEq([(p, 1) for p in parents[v]], 1)))
+        else:
+            ret.append(is_root)
+        if has_size:
+            ret.append(z3.And(1 <= subtree_size[v], subtree_size[v] <= n))
+            children_size = [z3.If(p, subtree_size[c], 0) for p, c in children[v]]
+            ret.append(subtree_size[v] == z3.Sum(children_size + [1]))
+            ret.append(z3.Implies(is_root, total_size[v] == subtree_size[v]))
+            if group_size[v] is not None:
+                ret.append(total_size[v] == group_size[v])
+    return z3.And(ret)
+
+
+class _Z3Converter(ExprTransformer[Any]):
+    def __init__(self, variables_dict):
+        super().__init__()
+        self.variables_dict = variables_dict
+        self._top_level = None
+
+    def convert_constraint(self, e):
+        self._top_level = e
+        try:
+            return self.transform(e)
+        finally:
+            self._top_level = None
+
+    def cacheable(self, e):
+        # each occurrence of a graph primitive is checked to be top-level
+        return e.op not in _GRAPH_OPS
+
+    def leaf(self, x):
+        if x is None or isinstance(x, (bool, int)):
+            return x
+        if not isinstance(x, Expr):
+            raise TypeError()
+        if isinstance(x, (BoolVar, IntVar)):
+            return self.variables_dict[x.id]
+        return x.operands[0]
+
+    def node(self, e, operands):
         if e.op == Op.NEG:
             return -operands[0]
         elif e.op == Op.ADD:
@@ -55,49 +163,127 @@ def _convert_expr(e, variables_dict):
             return z3.If(operands[0], operands[1], operands[2])
         elif e.op == Op.ALLDIFF:
             return z3.Distinct(operands)
+        elif e.op in _GRAPH_OPS and e is not self._top_level:
+            raise ValueError("graph primitives are supported only as top-level constraints in z3")
+        elif e.op == Op.GRAPH_ACTIVE_VERTICES_CONNECTED:
+            return _active_vertices_connected(operands)
+        elif e.op == Op.GRAPH_DIVISION:
+            return _graph_division(operands)
+        raise ValueError(f"unsupported operator: {e.op}")
 
 
 class Z3Backend(Backend):
+    supports_incremental = True
+    supports_copy = True
+
     def __init__(self, variables):
         global z3
         if z3 is None:
             z3 = importlib.import_module("z3")
 
-        self.variables = variables
+        self.variables = []
         self.variables_dict = dict()
-        id_last = 0
+        self.add_variables(variables)
+        self._converter = _Z3Converter(self.variables_dict)
+        self.converted_constraints = []
+        self._in_session = False
+        # A single z3 solver is kept across `solve` calls, and the bounds of the variables and the
+        # constraints added since the last call are fed to it lazily (see `_synced_solver`), so
+        # that z3 can reuse what it has learnt.
+        self._solver = None
+        self._num_synced_variables = 0
+        self._num_synced_constraints = 0
+
+    def add_variables(self, variables):
         for v in variables:
+            id_last = len(self.variables)
             if isinstance(v, BoolVar):
                 self.variables_dict[v.id] = z3.Bool("b" + str(id_last))
             elif isinstance(v, IntVar):
                 self.variables_dict[v.id] = z3.Int("i" + str(id_last))
-            id_last += 1
-        self.converted_constraints = []
+            self.variables.append(v)
+
+    def copy(self):
+        if self._in_session:
+            raise ValueError("a backend in an incremental session cannot be copied")
+        ret = Z3Backend([])
+        ret.variables = list(self.variables)
+        ret.variables_dict = dict(self.variables_dict)
+        ret._converter = _Z3Converter(ret.variables_dict)
+        ret.converted_constraints = list(self.converted_constraints)
+        return ret
 
     def add_constraint(self, constraint):
         if isinstance(constraint, list):
-            self.converted_constraints += map(
-                lambda e: _convert_expr(e, self.variables_dict), constraint
-            )
+            self.converted_constraints += map(self._converter.convert_constraint, constraint)
         else:
-            self.converted_constraints.append(_convert_expr(constraint, self.variables_dict))
+            self.converted_constraints.append(self._converter.convert_constraint(constraint))
 
     def solve(self):
-        solver = z3.Solver()
-        for var in self.variables:
+        return self._check([])
+
+    def push(self):
+        self._in_session = True
+
+    def add(self, constraint):
+        if not self._in_session:
+            raise ValueError("no incremental session is active; call push() first")
+        self.add_constraint(constraint)
+
+    def solve_incremental(self, assumptions=None):
+        if not self._in_session:
+            raise ValueError("no incremental session is active; call push() first")
+        return self._check(self._convert_assumptions(assumptions))
+
+    def solve_irrefutably(self, is_answer_key, assumptions=None):
+        # imported here as `cspuz.solver` depends on this module
+        from ..solver import _solve_backbone
+
+        # The candidates are tested under assumptions on the persistent solver, so that no
+        # constraint is left in it.
+        if not _solve_backbone(
+            lambda a: self._check(self._convert_assumptions(a)),
+            self.variables,
+            is_answer_key,
+            assumptions,
+        ):
+            return False
+        _set_solutions(
+            itertools.compress(self.variables, [not k for k in is_answer_key]),
+            itertools.repeat(None),
+        )
+        return True
+
+    def _convert_assumptions(self, assumptions):
+        return [self._converter.transform(a) for a in assumptions or []]
+
+    def _check(self, converted_assumptions):
+        solver = self._synced_solver()
+        if solver.check(*converted_assumptions) == z3.unsat:
+            return False
+
+        self._load_model(solver.model())
+        return True
+
+    def _synced_solver(self):
+        if self._solver is None:
+            self._solver = z3.Solver()
+        solver = self._solver
+        for var in self.variables[self._num_synced_variables :]:
             if isinstance(var, IntVar):
                 var_z3 = self.variables_dict[var.id]
                 solver.add(var.lo <= var_z3, var_z3 <= var.hi)
-        solver.add(self.converted_constraints)
+        self._num_synced_variables = len(self.variables)
+        solver.add(self.converted_constraints[self._num_synced_constraints :])
+        self._num_synced_constraints = len(self.converted_constraints)
+        return solver
 
-        if solver.check() == z3.unsat:
-            return False
+    def _model_value(self, model, var):
+        var_z3 = self.variables_dict[var.id]
+        if isinstance(var, BoolVar):
+            return z3.is_true(model.eval(var_z3, model_completion=True))
+        else:
+            return model.eval(var_z3, model_completion=True).as_long()
 
-        model = solver.model()
-        for var in self.variables:
-            var_z3 = self.variables_dict[var.id]
-            if isinstance(var, BoolVar):
-                var.sol = z3.is_true(model[var_z3])
-            elif isinstance(var, IntVar):
-                var.sol = model[var_z3].as_long()
-        return True
+    def _load_model(self, model):
+        _set_solutions(self.variables, [self._model_value(model, var) for var in self.variables])
@@ -0,0 +1,241 @@
+"""
+Solving many independent puzzles given as URLs in parallel.
+
+`solve_many` dispatches each URL (deserialization and solving) to a pool of worker processes and
+yields the results in the order they complete.
+"""
+
+import concurrent.futures
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+from . import problem_serializer
+from .configuration import config
+from .generator import default_uniqueness_checker
+from .puzzle import heyawake, lits, masyu, nurikabe, nurimisaki, slitherlink, yajilin
+
+
+def solve_nurikabe(url: str) -> Optional[bool]:
+    problem = nurikabe.deserialize_nurikabe(url)
+    height = len(problem)
+    width = len(problem[0])
+    is_sat, ans = nurikabe.solve_nurikabe(height, width, problem)
+    return is_sat and default_uniqueness_checker(ans)
+
+
+def solve_masyu(url: str) -> Optional[bool]:
+    problem = masyu.deserialize_masyu(url)
+    height = len(problem)
+    width = len(problem[0])
+    is_sat, ans = masyu.solve_masyu(height, width, problem)
+    return is_sat and default_uniqueness_checker(ans)
+
+
+def solve_slitherlink(url: str) -> Optional[bool]:
+    problem = slitherlink.deserialize_slitherlink(url)
+    if problem is None:
+        return None
+    height = len(problem)
+    width = len(problem[0])
+    is_sat, ans = slitherlink.solve_slitherlink(height, width, problem)
+    return is_sat and default_uniqueness_checker(ans)
+
+
+def solve_heyawake(url: str) -> Optional[bool]:
+    problem = heyawake.deserialize_heyawake(url)
+    if problem is None:
+        return None
+    height, width, (rooms, clues) = problem
+    for clue in clues:
+        if clue > 15:
+            # TODO: problem with large clue numbers are too difficult to solve
+            return None
+    is_sat, ans = heyawake.solve_heyawake(height, width, rooms, clues)
+    return is_sat and default_uniqueness_checker(ans)
+
+
+def solve_lits(url: str) -> Optional[bool]:
+    problem = lits.deserialize_lits(url)
+    if problem is None:
+        return None
+    height, width, rooms = problem
+    is_sat, ans = lits.solve_lits(height, width, rooms)
+    return is_sat and default_uniqueness_checker(ans)
+
+
+def solve_nurimisaki(url: str) -> Optional[bool]:
+    problem = nurimisaki.deserialize_nurimisaki(url)
+    height = len(problem)
+    width = len(problem[0])
+    is_sat, ans = nurimisaki.solve_nurimisaki(height, width, problem)
+    return is_sat and default_uniqueness_checker(ans)
+
+
+def solve_yajilin(url: str) -> Optional[bool]:
+    problem = yajilin.deserialize_yajilin(url)
+    height = len(problem)
+    width = len(problem[0])
+    is_sat, grid_frame, is_black = yajilin.solve_yajilin(height, width, problem)
+    return is_sat and default_uniqueness_checker(grid_frame, is_black)
+
+
+PUZZLE_KIND_ALIAS = {
+    "mashu": "masyu",
+}
+
+SOLVERS: Dict[str, Callable[[str], Optional[bool]]] = {
+    "nurikabe": solve_nurikabe,
+    "masyu": solve_masyu,
+    "slither": solve_slitherlink,
+    "heyawake": solve_heyawake,
+    "lits": solve_lits,
+    "nurimisaki": solve_nurimisaki,
+    "yajilin": solve_yajilin,
+}
+
+
+def solve_problem(
+    url: str, height_lim: Optional[int] = None, width_lim: Optional[int] = None
+) -> Optional[bool]:
+    """Solve the problem given by `url`.
+
+    Returns whether the problem has a unique solution, or `None` if the problem is not supported
+    (unknown puzzle kind, malformed URL or larger than `height_lim` x `width_lim`).
+    """
+    info = problem_serializer.get_puzzle_info_from_url(url)
+    if info is None:
+        return None
+    kind, height, width = info
+
+    if height_lim is not None and height > height_lim:
+        return None
+    if width_lim is not None and width > width_lim:
+        return None
+
+    if kind in PUZZLE_KIND_ALIAS:
+        kind = PUZZLE_KIND_ALIAS[kind]
+
+    solver = SOLVERS.get(kind)
+    if solver is None:
+        return None
+    return solver(url)
+
+
+class BatchResult(NamedTuple):
+    #: The position of the URL in the input.
+    index: int
+    url: str
+    #: The return value of `solve_problem`. `None` if the job failed as well.
+    result: Optional[bool]
+    #: Wall-clock time (in seconds) spent on this job in the worker.
+    elapsed: float
+    #: `"timeout"` if the job hit the timeout, the description of the exception if it raised one,
+    #: and `None` otherwise.
+    error: Optional[str]
+
+
+class _JobTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise _JobTimeout()
+
+
+def _solve_job(
+    index: int,
+    url: str,
+    timeout: Optional[float],
+    height_lim: Optional[int],
+    width_lim: Optional[int],
+) -> BatchResult:
+    # Subprocess-based backends enforce `solver_timeout` themselves. The alarm also interrupts
+    # deserialization and in-process backends, though the latter only notice it once they return
+    # control to Python.
+    use_alarm = timeout is not None and threading.current_thread() is threading.main_thread()
+    prev_solver_timeout = config.solver_timeout
+    prev_handler = None
+    if timeout is not None:
+        config.solver_timeout = timeout
+    if use_alarm:
+        prev_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+
+    start = time.perf_counter()
+    result = None
+    error = None
+    try:
+        result = solve_problem(url, height_lim=height_lim, width_lim=width_lim)
+    except (_JobTimeout, subprocess.TimeoutExpired):
+        error = "timeout"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, prev_handler)
+        config.solver_timeout = prev_solver_timeout
+    elapsed = time.perf_counter() - start
+
+    return BatchResult(index, url, result, elapsed, error)
+
+
+def solve_many(
+    urls: Iterable[str],
+    n_workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    height_lim: Optional[int] = None,
+    width_lim: Optional[int] = None,
+) -> Iterator[BatchResult]:
+    """Solve the problems given by `urls` in parallel.
+
+    Each URL is deserialized and solved by `solve_problem` in one of `n_workers` worker processes
+    (`os.cpu_count()` if `None`; if `n_workers` is 1 or less, URLs are solved one by one in this
+    process). Results are yielded as `BatchResult` in the order the jobs complete; use `index` to
+    associate them with the input.
+
+    `urls` is consumed lazily, so it can be a stream such as `sys.stdin`. If `timeout` is given,
+    each job is aborted after `timeout` seconds and reported with `error == "timeout"`.
+
+    Closing the returned iterator (e.g. breaking out of a `for` loop over it) cancels the jobs
+    which have not started yet; running jobs are left to finish in the background.
+    """
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if n_workers <= 1:
+        for index, url in enumerate(urls):
+            yield _solve_job(index, url, timeout, height_lim, width_lim)
+        return
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=n_workers)
+    # Limit the number of jobs submitted ahead so that huge (or endless) inputs are not read at
+    # once.
+    max_pending = n_workers * 2
+    pending = set()
+    url_iter = enumerate(urls)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                item = next(url_iter, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, url = item
+                pending.add(
+                    executor.submit(_solve_job, index, url, timeout, height_lim, width_lim)
+                )
+            if not pending:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -97,6 +97,12 @@ class Config(object):
     `use_graph_primitive` controls whether native graph constraints are used.
     This feature is supported by csugar and cspuz_core CSP solver and is
     enabled by default for `csugar` and `cspuz_core` backends.
+    The `z3` backend also supports it (as well as
+    `use_graph_division_primitive`) by lowering native graph constraints into
+    an auxiliary encoding of its own, which is more compact than the generic
+    fallback. This is opt-in, since the encoding is valid only for top-level
+    constraints: the `z3` backend raises `ValueError` for native graph
+    constraints under a negation, `then`, `|` and the like.
     You can use this for `sugar` and `sugar_extended` backends to work with
     csugar or cspuz_core CLI, but cspuz does not check whether the backend
     actually supports native graph constraints.
@@ -105,6 +111,40 @@ class Config(object):
     `active_vertices_connected`). Therefore, it is strongly recommended to set
     `default_backend` correctly, rather than specifying the backend on calling
     `Solver.solve` or `Solver.solve_irrefutably`.
+
+    `cycle_connectivity_encoding` selects how the connectivity of a cycle or a
+    path is encoded with native graph constraints (`use_graph_primitive`) in
+    `graph.active_edges_single_cycle` and `graph.active_edges_single_path`:
+    `line_graph` (connectivity of the active edges in the line graph, whose
+    size is quadratic in the vertex degrees) or `incidence` (connectivity of
+    the passed vertices and the active edges in the vertex-edge incidence
+    graph, whose size is linear in the number of edges).
+
+    `solver_timeout` is the timeout (in seconds) of each invocation of the
+    backend executable for `sugar` and `sugar_extended` backends.
+
+    `sugar_worker_pool_size` enables the worker mode of `sugar_extended`
+    backend if it is positive. In this mode, at most this number of
+    long-lived `CspuzSugarInterface` processes (`sugar_ext.sh --server`) are
+    kept alive and reused across solver calls, instead of launching a JVM on
+    every call. This requires `sugar_ext.sh` built from this repository; other
+    Sugar-compatible executables (e.g. csugar) do not support this mode.
+
+    `sugar_compact_dialect` makes `sugar_extended` backend write problems in a
+    compact dialect (short operator names, base-36 variable ids and
+    shorthands of shared subexpressions), which is faster to write and parse.
+    This requires `sugar_ext.sh` built from this repository as well. In the
+    worker mode, the dialect is used only if the workers support it.
+
+    `simplify_constraints` controls whether constraints are simplified (e.g.
+    constant folding) by :py:class:`~cspuz.simplify.Simplifier` before being
+    passed to the backend. It is enabled by default.
+
+    `tighten_domains` narrows the domains of integer variables by bound
+    propagation (see :py:class:`~cspuz.propagate.DomainTightener`) before
+    they are passed to the backend. It is disabled by default, since it costs
+    time in Python and smaller domains have not been shown to speed up the
+    backends.
     """
 
     default_backend: str
@@ -112,7 +152,12 @@ class Config(object):
     csugar_binding: Optional[str]
     use_graph_primitive: bool
     use_graph_division_primitive: bool
+    cycle_connectivity_encoding: str
     solver_timeout: Optional[float]
+    sugar_worker_pool_size: int
+    sugar_compact_dialect: bool
+    simplify_constraints: bool
+    tighten_domains: bool
 
     def __init__(self, infer_from_env: bool = True) -> None:
         default_backend = _get_default(infer_from_env, "CSPUZ_DEFAULT_BACKEND", "auto")
@@ -141,7 +186,22 @@ class Config(object):
                 graph_division_primitive_default,
             )
         )
+        self.cycle_connectivity_encoding = _get_default(
+            infer_from_env, "CSPUZ_CYCLE_CONNECTIVITY_ENCODING", "line_graph"
+        )
         self.solver_timeout = None
+        self.sugar_worker_pool_size = int(
+            _get_default(infer_from_env, "CSPUZ_SUGAR_WORKER_POOL_SIZE", "0")
+        )
+        self.sugar_compact_dialect = _strtobool(
+            _get_default(infer_from_env, "CSPUZ_SUGAR_COMPACT_DIALECT", "False")
+        )
+        self.simplify_constraints = _strtobool(
+            _get_default(infer_from_env, "CSPUZ_SIMPLIFY_CONSTRAINTS", "True")
+        )
+        self.tighten_domains = _strtobool(
+            _get_default(infer_from_env, "CSPUZ_TIGHTEN_DOMAINS", "False")
+        )
 
 
 config = Config()
@@ -1,12 +1,23 @@
 from typing import Any, List, Union, overload
 
-from .array import BoolArray1D, BoolArray2D, IntArray1D, IntArray2D, _elementwise
-from .expr import BoolExpr, BoolExprLike, IntExpr, IntExprLike, Op
+from .array import (
+    Array1D,
+    Array2D,
+    BoolArray1D,
+    BoolArray2D,
+    IntArray1D,
+    IntArray2D,
+    _elementwise,
+)
+from .expr import BoolExpr, BoolExprLike, IntExpr, IntExprLike, Op, _new_expr
 
 
 def flatten_iterator(*args: Any) -> Any:
     for arg in args:
-        if hasattr(arg, "__iter__"):
+        if isinstance(arg, (Array1D, Array2D)):
+            # elements of arrays are never iterable
+            yield from arg.data
+        elif hasattr(arg, "__iter__"):
             for xs in arg:
                 for x in flatten_iterator(xs):
                     yield x
@@ -127,7 +138,7 @@ def cond(
     elif isinstance(f, (IntArray1D, IntArray2D)):
         shape = f.shape
     else:
-        return IntExpr(Op.IF, [c, t, f])
+        return _new_expr(IntExpr, Op.IF, [c, t, f])
 
     return _elementwise(Op.IF, shape, [c, t, f])  # type: ignore
 
@@ -161,6 +172,6 @@ def then(
     elif isinstance(y, (BoolArray1D, BoolArray2D)):
         shape = y.shape
     else:
-        return BoolExpr(Op.IMP, [x, y])
+        return _new_expr(BoolExpr, Op.IMP, [x, y])
 
     return _elementwise(Op.IMP, shape, [x, y])  # type: ignore
@@ -1,11 +1,20 @@
+import contextlib
+from array import array
 from enum import Enum, auto
 from typing import (
     Any,
+    Callable,
+    Dict,
+    Generic,
     Iterable,
+    Iterator,
     List,
     Literal,
     Optional,
+    Tuple,
     TYPE_CHECKING,
+    Type,
+    TypeVar,
     Union,
     cast,
     overload,
@@ -94,6 +103,72 @@ def _is_int_expr_like(value: Any) -> bool:
     return isinstance(value, (IntExpr, int)) and not isinstance(value, bool)
 
 
+E = TypeVar("E", bound="Expr")
+
+# Table for hash-consing expressions (see `hash_consing`). `None` if hash-consing is disabled.
+_hash_cons_table: Optional[Dict[Tuple[Any, ...], "Expr"]] = None
+
+
+@contextlib.contextmanager
+def hash_consing() -> Iterator[None]:
+    """Share structurally identical expressions constructed in this context.
+
+    While this context is active, building an expression whose operator and operands (compared
+    by identity for expressions and by value for constants) are the same as those of an already
+    built one returns the existing object. For example, `count_true` over the same edges of a
+    grid frame yields a single `cond(1, 0)` node for each edge. Nested contexts share the table of
+    the outermost one, which is discarded when it exits.
+
+    The table itself costs memory per constructed node, so this pays off only when identical
+    subterms are built repeatedly.
+    """
+    global _hash_cons_table
+    if _hash_cons_table is not None:
+        yield
+        return
+    _hash_cons_table = {}
+    try:
+        yield
+    finally:
+        _hash_cons_table = None
+
+
+def _new_expr(cls: Type[E], op: Op, operands: Iterable[ExprLike]) -> E:
+    table = _hash_cons_table
+    if table is None:
+        return cls(op, operands)
+    operands = tuple(operands)
+    # Expressions are identified by `id`, which is stable since the table keeps the expression
+    # (and thus its operands) alive. Constants are keyed by their type as well so that `True` and
+    # `1` are distinguished.
+    key = (op,) + tuple(id(x) if isinstance(x, Expr) else (x.__class__, x) for x in operands)
+    ret = table.get(key)
+    if ret is None:
+        ret = cls(op, operands)
+        table[key] = ret
+    return cast(E, ret)
+
+
+def _expr_factory(cls: Type[E], op: Op) -> Callable[[Tuple[ExprLike, ...]], E]:
+    """Return a function building an expression of `cls` with operator `op` from a tuple of
+    operands, for constructing many expressions of the same kind at once.
+
+    Operands are not checked, and the constructor of `cls` is bypassed unless hash-consing is
+    enabled, so the caller is responsible for validating them beforehand."""
+    if _hash_cons_table is not None:
+        return lambda operands: _new_expr(cls, op, operands)
+
+    new = object.__new__
+
+    def make(operands: Tuple[ExprLike, ...]) -> E:
+        ret = new(cls)
+        ret.op = op
+        ret.operands = operands
+        return ret
+
+    return make
+
+
 def _make_bool_expr(op: BoolOp, operands: List[ExprLike]) -> "BoolExpr":
     # type checking
     if op in [Op.EQ, Op.NE, Op.LE, Op.LT, Op.GE, Op.GT]:
@@ -114,7 +189,7 @@ def _make_bool_expr(op: BoolOp, operands: List[ExprLike]) -> "BoolExpr":
     else:
         raise ValueError(f"Operator {op} does not return a bool value")
 
-    return BoolExpr(op, operands)
+    return _new_expr(BoolExpr, op, operands)
 
 
 def _make_int_expr(op: IntOp, operands: List[ExprLike]) -> "IntExpr":
@@ -138,13 +213,18 @@ def _make_int_expr(op: IntOp, operands: List[ExprLike]) -> "IntExpr":
     else:
         raise ValueError(f"operator {op} does not return an int value")
 
-    return IntExpr(op, operands)
+    return _new_expr(IntExpr, op, operands)
 
 
 class Expr:
+    __slots__ = ("op", "operands")
+
+    op: Op
+    operands: Tuple[ExprLike, ...]
+
     def __init__(self, op: Op, operands: Iterable[ExprLike]):
-        self.op: Op = op
-        self.operands: List[ExprLike] = list(operands)
+        self.op = op
+        self.operands = tuple(operands)
 
     def is_variable(self) -> bool:
         return False
@@ -158,6 +238,8 @@ class Expr:
 
 
 class BoolExpr(Expr):
+    __slots__ = ()
+
     def __init__(self, op: Op, operands: Iterable[ExprLike]):
         super().__init__(op, operands)
 
@@ -271,6 +353,8 @@ class BoolExpr(Expr):
 
 
 class IntExpr(Expr):
+    __slots__ = ()
+
     def __init__(self, op: Op, operands: Iterable[ExprLike]):
         super().__init__(op, operands)
 
@@ -316,39 +400,285 @@ class IntExpr(Expr):
         raise ValueError("sol property is available only for variables")
 
 
+class _SolutionStore:
+    """Solutions of the variables of a `Solver`, indexed by variable id.
+
+    `state[i]` is -1 if the value of variable #i is not decided. Otherwise, it is the value (0 or
+    1) of a Boolean variable, or 1 for an integer variable whose value is `ints[i]`. Variables
+    created by a `Solver` read and write their `sol` here, so that solutions can be stored and
+    retrieved in bulk without going through each variable object.
+    """
+
+    __slots__ = ("state", "ints")
+
+    state: array
+    ints: array
+
+    def __init__(self) -> None:
+        self.state = array("b")
+        self.ints = array("q")
+
+    def _reserve(self, var_id: int) -> None:
+        n = var_id + 1 - len(self.state)
+        if n > 0:
+            self.state.extend(array("b", [-1]) * n)
+            self.ints.extend(array("q", [0]) * n)
+
+    def get_bool(self, var_id: int) -> Optional[bool]:
+        s = self.state[var_id]
+        return None if s < 0 else s == 1
+
+    def get_int(self, var_id: int) -> Optional[int]:
+        return None if self.state[var_id] < 0 else self.ints[var_id]
+
+    def set(self, var_id: int, value: Union[None, bool, int]) -> None:
+        if value is None:
+            self.state[var_id] = -1
+        elif isinstance(value, bool):
+            self.state[var_id] = value
+        else:
+            self.state[var_id] = 1
+            self.ints[var_id] = value
+
+
+def _set_solutions(
+    variables: Iterable[Union["BoolVar", "IntVar"]], values: Iterable[Union[None, bool, int]]
+) -> None:
+    """Set `sol` of each of `variables` to the corresponding element of `values`.
+
+    This is equivalent to assigning them one by one, but writes the solution store directly."""
+    for v, value in zip(variables, values):
+        store = v._store
+        if store is None:
+            v._sol = value
+            continue
+        var_id = v.id
+        if value is None:
+            store.state[var_id] = -1
+        elif value is True or value is False:
+            store.state[var_id] = value
+        else:
+            store.state[var_id] = 1
+            store.ints[var_id] = value
+
+
+def _get_solutions(
+    variables: Iterable[Union["BoolVar", "IntVar"]],
+) -> List[Union[None, bool, int]]:
+    """Return `sol` of each of `variables`, reading the solution store directly."""
+    ret: List[Union[None, bool, int]] = []
+    append = ret.append
+    for v in variables:
+        store = v._store
+        if store is None:
+            append(v._sol)
+            continue
+        s = store.state[v.id]
+        if s < 0:
+            append(None)
+        elif v.__class__ is BoolVar:
+            append(s == 1)
+        else:
+            append(store.ints[v.id])
+    return ret
+
+
 class BoolVar(BoolExpr):
-    def __init__(self, var_id: int):
-        super().__init__(Op.VAR, [])
-        self.id: int = var_id
-        self.__sol: Optional[bool] = None
+    __slots__ = ("id", "_sol", "_store")
+
+    id: int
+    _sol: Optional[bool]
+    _store: Optional[_SolutionStore]
+
+    def __init__(self, var_id: int, store: Optional[_SolutionStore] = None):
+        super().__init__(Op.VAR, ())
+        self.id = var_id
+        self._sol = None
+        self._store = store
+        if store is not None:
+            store._reserve(var_id)
+            store.state[var_id] = -1
 
     def is_variable(self) -> bool:
         return True
 
     @property
     def sol(self) -> Optional[bool]:
-        return self.__sol
+        store = self._store
+        if store is None:
+            return self._sol
+        return store.get_bool(self.id)
 
     @sol.setter
     def sol(self, value: Optional[bool]) -> None:
-        self.__sol = value
+        store = self._store
+        if store is None:
+            self._sol = value
+        else:
+            store.set(self.id, value)
 
 
 class IntVar(IntExpr):
-    def __init__(self, var_id: int, lo: int, hi: int):
-        super().__init__(Op.VAR, [])
-        self.id: int = var_id
-        self.lo: int = lo
-        self.hi: int = hi
-        self.__sol: Optional[int] = None
+    __slots__ = ("id", "lo", "hi", "_sol", "_store")
+
+    id: int
+    lo: int
+    hi: int
+    _sol: Optional[int]
+    _store: Optional[_SolutionStore]
+
+    def __init__(self, var_id: int, lo: int, hi: int, store: Optional[_SolutionStore] = None):
+        super().__init__(Op.VAR, ())
+        self.id = var_id
+        self.lo = lo
+        self.hi = hi
+        self._sol = None
+        self._store = store
+        if store is not None:
+            store._reserve(var_id)
+            store.state[var_id] = -1
 
     def is_variable(self) -> bool:
         return True
 
     @property
     def sol(self) -> Optional[int]:
-        return self.__sol
+        store = self._store
+        if store is None:
+            return self._sol
+        return store.get_int(self.id)
 
     @sol.setter
     def sol(self, value: Optional[int]) -> None:
-        self.__sol = value
+        store = self._store
+        if store is None:
+            self._sol = value
+        else:
+            store.set(self.id, value)
+
+
+_OP_VAR = Op.VAR
+_OP_BOOL_CONSTANT = Op.BOOL_CONSTANT
+_OP_INT_CONSTANT = Op.INT_CONSTANT
+
+
+def is_compound(x: Any) -> bool:
+    """Return whether `x` is an expression with operands (i.e. not a variable or constant)."""
+    if not isinstance(x, Expr):
+        return False
+    op = x.op
+    return op is not _OP_VAR and op is not _OP_BOOL_CONSTANT and op is not _OP_INT_CONSTANT
+
+
+class ExprVisitor:
+    """Callbacks invoked by `walk`.
+
+    Compound expressions are reported by `enter` and `leave`. Variables, constants and
+    non-expression operands (`int`, `bool` and `None`) are reported by `leaf`.
+    """
+
+    def enter(self, e: Expr) -> bool:
+        """Called when the traversal reaches `e`. Return `False` to skip its operands (`leave` is
+        not called then either)."""
+        return True
+
+    def leave(self, e: Expr) -> None:
+        pass
+
+    def leaf(self, x: Any) -> None:
+        pass
+
+
+# Marker on the traversal stacks of `walk` and `ExprTransformer.transform`: the expression
+# below it is left (or evaluated) when it is popped.
+_LEAVE = object()
+
+
+def walk(e: Any, visitor: ExprVisitor) -> None:
+    """Traverse `e` in depth-first order, calling the methods of `visitor`.
+
+    The traversal uses an explicit stack, so arbitrarily deep expressions can be walked. Shared
+    subexpressions are visited once per occurrence.
+    """
+    enter = visitor.enter
+    leave = visitor.leave
+    leaf = visitor.leaf
+    stack = [e]
+    pop = stack.pop
+    push = stack.append
+    extend = stack.extend
+    while stack:
+        x = pop()
+        if x is _LEAVE:
+            leave(pop())
+        elif not isinstance(x, Expr):
+            leaf(x)
+        else:
+            op = x.op
+            if op is _OP_VAR or op is _OP_BOOL_CONSTANT or op is _OP_INT_CONSTANT:
+                leaf(x)
+            elif enter(x):
+                push(x)
+                push(_LEAVE)
+                extend(x.operands[::-1])
+
+
+T = TypeVar("T")
+
+
+class ExprTransformer(Generic[T]):
+    """Bottom-up transformation of expressions into values of type `T`.
+
+    Subclasses implement `leaf` for variables, constants and non-expression operands, and `node`
+    which receives a compound expression together with the transformed values of its operands.
+    `transform` evaluates them in post-order with an explicit stack, so arbitrarily deep
+    expressions can be transformed.
+
+    The values of compound expressions are memoized per expression object for the lifetime of the
+    transformer, so subexpressions shared within or among expressions are transformed only once.
+    Override `cacheable` to restrict which expressions are memoized.
+    """
+
+    def __init__(self) -> None:
+        self._memo: Dict[int, Tuple[Expr, T]] = {}
+
+    def leaf(self, x: Any) -> T:
+        raise NotImplementedError
+
+    def node(self, e: Expr, operands: List[T]) -> T:
+        raise NotImplementedError
+
+    def cacheable(self, e: Expr) -> bool:
+        return True
+
+    def transform(self, e: Any) -> T:
+        memo = self._memo
+        leaf = self.leaf
+        node = self.node
+        cacheable = self.cacheable
+        values: List[T] = []
+        stack = [e]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            x = pop()
+            if x is _LEAVE:
+                x = pop()
+                start = len(values) - len(x.operands)
+                value = node(x, values[start:])
+                del values[start:]
+                if cacheable(x):
+                    # the memo keeps `x` alive so that its id is not reused
+                    memo[id(x)] = (x, value)
+                values.append(value)
+            elif not is_compound(x):
+                values.append(leaf(x))
+            else:
+                m = memo.get(id(x))
+                if m is not None:
+                    values.append(m[1])
+                    continue
+                push(x)
+                push(_LEAVE)
+                stack.extend(x.operands[::-1])
+        return values[0]
@@ -4,6 +4,7 @@ from cspuz.generator.core import (
     count_non_default_values,
     generate_problem,
 )
+from cspuz.generator.incremental import IncrementalPuzzleSolver, grid_clues
 from cspuz.generator.builder import Builder, Choice, ArrayBuilder2D, build_neighbor_generator
 from cspuz.generator.segmentation import SegmentationBuilder2D
 
@@ -12,6 +13,8 @@ __all__ = [
     "default_uniqueness_checker",
     "count_non_default_values",
     "generate_problem",
+    "IncrementalPuzzleSolver",
+    "grid_clues",
     "Builder",
     "Choice",
     "ArrayBuilder2D",
@@ -1,28 +1,50 @@
+import itertools
 import math
+import multiprocessing
 import sys
-from typing import Any, Callable, Optional, TypeVar
+from collections import OrderedDict
+from typing import Any, Callable, Optional, TypeVar, Union
 from collections.abc import Iterator
 
-from ..array import Array1D, Array2D
+from ..array import Array1D, Array2D, _count_undecided
 from cspuz.expr import BoolExpr, IntExpr
 from cspuz.grid_frame import BoolGridFrame
 from cspuz.generator.builder import build_neighbor_generator
+from cspuz.generator.incremental import IncrementalPuzzleSolver
 import cspuz.generator.srandom as srandom
 
 
+def _count_decided(arg: Any) -> Optional[tuple[int, int]]:
+    """Return the numbers of variables and those with decided solutions in `arg` if it is an
+    array, a grid frame or a NumPy masked array of solutions (as returned by `sol_array`), or
+    `None` otherwise."""
+    if isinstance(arg, (Array1D, Array2D)):
+        arrays = [arg]
+    elif isinstance(arg, BoolGridFrame):
+        arrays = [arg.horizontal, arg.vertical]
+    else:
+        # masked arrays exist only if NumPy has been imported
+        numpy = sys.modules.get("numpy")
+        if numpy is not None and isinstance(arg, numpy.ma.MaskedArray):
+            return arg.size, int(arg.count())
+        return None
+    num_variables = sum(len(a.data) for a in arrays)
+    return num_variables, num_variables - sum(map(_count_undecided, arrays))
+
+
 def default_score_calculator(*args: Any) -> float:
     score = 0.0
     for arg in args:
         if isinstance(arg, (BoolExpr, IntExpr)) and arg.is_variable():
             if arg.sol is not None:
                 score += 1
-        elif isinstance(arg, (Array1D, Array2D, BoolGridFrame)):
-            for a in arg:
-                if a.sol is not None:
-                    score += 1
         elif isinstance(arg, list):
             for a in arg:
                 score += default_score_calculator(a)
+        else:
+            counts = _count_decided(arg)
+            if counts is not None:
+                score += counts[1]
     return score
 
 
@@ -31,14 +53,14 @@ def default_uniqueness_checker(*args: Any) -> bool:
         if isinstance(arg, (BoolExpr, IntExpr)) and arg.is_variable():
             if arg.sol is None:
                 return False
-        elif isinstance(arg, (Array1D, Array2D, BoolGridFrame)):
-            for a in arg:
-                if a.sol is None:
-                    return False
         elif isinstance(arg, list):
             for a in arg:
                 if not default_uniqueness_checker(a):
                     return False
+        else:
+            counts = _count_decided(arg)
+            if counts is not None and counts[0] != counts[1]:
+                return False
     return True
 
 
@@ -57,9 +79,97 @@ def count_non_default_values(problem: Any, default: Any, weight: float = 1.0) ->
 
 Problem = TypeVar("Problem")
 
+# (is_sat, is_unique, score_base, score_penalty) of a candidate problem
+Evaluation = tuple[bool, bool, float, float]
 
-def generate_problem(
+
+def _evaluate_candidate(
     solver: Callable[[Problem], tuple[Any, ...]],
+    score: Callable[..., float],
+    clue_penalty: Optional[Callable[[Problem], float]],
+    uniqueness: Callable[..., bool],
+    problem: Problem,
+) -> Evaluation:
+    is_sat, *answer = solver(problem)
+    if not is_sat:
+        return (False, False, 0.0, 0.0)
+    if uniqueness(*answer):
+        return (True, True, 0.0, 0.0)
+    score_base = score(*answer)
+    if clue_penalty is None:
+        score_penalty = 0.0
+    else:
+        score_penalty = clue_penalty(problem)
+    return (True, False, score_base, score_penalty)
+
+
+def _problem_key(problem: Any) -> Any:
+    """Return a hashable representation of `problem`, or `None` if there is none."""
+    if isinstance(problem, (list, tuple)):
+        ret = []
+        for p in problem:
+            k = _problem_key(p)
+            if k is None:
+                return None
+            ret.append(k)
+        return (problem.__class__ is tuple, tuple(ret))
+    try:
+        hash(problem)
+    except TypeError:
+        return None
+    return problem
+
+
+class _EvaluationCache:
+    """LRU cache of evaluations of candidate problems."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Any, Evaluation] = OrderedDict()
+
+    def get(self, key: Any) -> Optional[Evaluation]:
+        if key is None:
+            self.misses += 1
+            return None
+        ret = self._data.get(key)
+        if ret is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return ret
+
+    def put(self, key: Any, evaluation: Evaluation) -> None:
+        if key is None or self.size <= 0:
+            return
+        self._data[key] = evaluation
+        self._data.move_to_end(key)
+        if len(self._data) > self.size:
+            self._data.popitem(last=False)
+
+
+# Arguments of `_evaluate_candidate` except `problem`, inherited by worker processes through `fork`
+# so that they need not be picklable.
+# (solver, score, clue_penalty, uniqueness) in a worker process, set by `_init_worker`
+_worker_context: Optional[tuple[Any, ...]] = None
+
+
+def _init_worker(context: tuple[Any, ...]) -> None:
+    # Workers are forked, so `context` is inherited rather than pickled. This also runs in
+    # workers started later to replace exited ones.
+    global _worker_context
+    _worker_context = context
+
+
+def _evaluate_candidate_in_worker(problem: Any) -> Evaluation:
+    assert _worker_context is not None
+    return _evaluate_candidate(*_worker_context, problem)
+
+
+def generate_problem(
+    solver: Union[Callable[[Problem], tuple[Any, ...]], IncrementalPuzzleSolver],
     initial_problem: Optional[Problem] = None,
     neighbor_generator: Optional[Callable[[Problem], Iterator[Problem]]] = None,
     builder_pattern: Any = None,
@@ -72,9 +182,39 @@ def generate_problem(
     max_steps: Optional[int] = None,
     solve_initial_problem: bool = False,
     verbose: bool = False,
+    n_workers: int = 0,
+    cache_size: int = 0,
 ) -> Optional[Problem]:
+    """Generate a problem with a unique solution by simulated annealing.
+
+    If `n_workers` is 2 or more, candidates are evaluated by `n_workers` processes, a window of
+    `n_workers` candidates at a time. The candidates of a window are examined in the order of
+    `neighbor_generator`, so the result is the same as the sequential one as long as
+    `neighbor_generator` draws its random numbers before yielding the first candidate (as the
+    generators built from `builder_pattern` do). Otherwise, e.g. if it draws a random move for
+    each candidate, prefetching a window changes the order of random draws, so the result is
+    reproducible for a fixed seed and `n_workers` but may differ from the sequential one. Worker
+    processes are started with `fork`, so `solver`, `score` and the like need not be picklable,
+    but this is not available on Windows.
+
+    If `cache_size` is positive, evaluations of the last `cache_size` distinct candidates are
+    cached, as annealing often revisits a problem (e.g. by a move undoing the previous one). This
+    is sound only if `solver`, `score` and the like are pure functions of the problem, so it is
+    disabled by default (the generators in `cspuz.puzzle` enable it). Problems are identified by
+    their contents, so they must consist of (possibly nested) lists and tuples of hashable values
+    to be cached.
+
+    `solver` may be an `IncrementalPuzzleSolver`, which solves the candidates with a single
+    backend under assumptions selecting their clues. It cannot be shared among worker processes,
+    so `n_workers` must be at most 1 in this case.
+    """
     global _use_deterministic_prng
 
+    if isinstance(solver, IncrementalPuzzleSolver):
+        if n_workers >= 2:
+            raise ValueError("n_workers must be at most 1 for IncrementalPuzzleSolver")
+        solver = solver.solve
+
     if builder_pattern is not None:
         if initial_problem is not None or neighbor_generator is not None:
             raise ValueError(
@@ -111,44 +251,83 @@ def generate_problem(
             score_penalty = clue_penalty(problem)
         current_score = score_base - score_penalty
 
-    for _step in range(max_steps):
-        for next_problem in neighbor_generator(problem):
-            if pretest is not None and not pretest(next_problem):
-                continue
-
-            is_sat, *answer = solver(next_problem)
-            if not is_sat:
-                continue
-
-            if uniqueness(*answer):
-                if verbose:
-                    print("generated", file=sys.stderr)
-                return next_problem
-
-            next_score_base = score(*answer)
-            if clue_penalty is None:
-                next_score_penalty = 0.0
-            else:
-                next_score_penalty = clue_penalty(next_problem)
-            next_score = next_score_base - next_score_penalty
-
-            update = (
-                current_score is None
-                or current_score <= next_score
-                or srandom.random() < math.exp((next_score - current_score) / temperature)
-            )
-            if update:
-                if verbose:
-                    print(
-                        "score: {} -> {} (base: {}, penalty: {})".format(
-                            current_score, next_score, next_score_base, next_score_penalty
-                        ),
-                        file=sys.stderr,
-                    )
-                problem = next_problem
-                current_score = next_score
-                break
-        temperature *= temperature_decay
+    pool = None
+    if n_workers >= 2:
+        pool = multiprocessing.get_context("fork").Pool(
+            n_workers,
+            initializer=_init_worker,
+            initargs=((solver, score, clue_penalty, uniqueness),),
+        )
+
+    cache = _EvaluationCache(cache_size)
+
+    def evaluated_neighbors(problem: Problem) -> Iterator[tuple[Problem, Evaluation]]:
+        candidates = (
+            p for p in neighbor_generator(problem) if pretest is None or pretest(p)  # type: ignore
+        )
+        if pool is None:
+            for p in candidates:
+                key = _problem_key(p) if cache_size > 0 else None
+                evaluation = cache.get(key)
+                if evaluation is None:
+                    evaluation = _evaluate_candidate(solver, score, clue_penalty, uniqueness, p)
+                    cache.put(key, evaluation)
+                yield p, evaluation
+        else:
+            while True:
+                window = list(itertools.islice(candidates, n_workers))
+                if not window:
+                    break
+                keys = [_problem_key(p) if cache_size > 0 else None for p in window]
+                evaluations = [cache.get(key) for key in keys]
+                missing = [i for i in range(len(window)) if evaluations[i] is None]
+                if missing:
+                    results = pool.map(_evaluate_candidate_in_worker, [window[i] for i in missing])
+                    for i, evaluation in zip(missing, results):
+                        evaluations[i] = evaluation
+                        cache.put(keys[i], evaluation)
+                yield from zip(window, evaluations)  # type: ignore
+
+    def print_cache_stats() -> None:
+        if cache_size > 0:
+            print(f"cache: {cache.hits} hits, {cache.misses} misses", file=sys.stderr)
+
+    try:
+        for _step in range(max_steps):
+            for next_problem, evaluation in evaluated_neighbors(problem):
+                is_sat, is_unique, next_score_base, next_score_penalty = evaluation
+                if not is_sat:
+                    continue
+
+                if is_unique:
+                    if verbose:
+                        print("generated", file=sys.stderr)
+                        print_cache_stats()
+                    return next_problem
+
+                next_score = next_score_base - next_score_penalty
+
+                update = (
+                    current_score is None
+                    or current_score <= next_score
+                    or srandom.random() < math.exp((next_score - current_score) / temperature)
+                )
+                if update:
+                    if verbose:
+                        print(
+                            "score: {} -> {} (base: {}, penalty: {})".format(
+                                current_score, next_score, next_score_base, next_score_penalty
+                            ),
+                            file=sys.stderr,
+                        )
+                    problem = next_problem
+                    current_score = next_score
+                    break
+            temperature *= temperature_decay
+    finally:
+        if pool is not None:
+            pool.terminate()
     if verbose:
         print("failed", file=sys.stderr)
+        print_cache_stats()
     return None
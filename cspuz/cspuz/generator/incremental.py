@@ -0,0 +1,120 @@
+from typing import Any, Callable, Dict, Generic, Hashable, Iterable, List, Optional, TypeVar, Union
+
+from cspuz.configuration import config
+from cspuz.constraints import flatten_iterator
+from cspuz.expr import BoolVar
+from cspuz.simplify import Simplifier
+from cspuz.solver import Solver, _get_backend, _solve_backbone
+
+Problem = TypeVar("Problem")
+T = TypeVar("T")
+
+
+def grid_clues(problem: Any) -> Iterable[tuple[Hashable, Any]]:
+    """Enumerate the clues of `problem` given as (possibly nested) lists and tuples, such as the
+    ones built by `ArrayBuilder2D`. The key of each clue is the tuple of its indices."""
+    stack: List[tuple[tuple[int, ...], Any]] = [((), problem)]
+    while stack:
+        pos, p = stack.pop()
+        if isinstance(p, (list, tuple)):
+            for i in reversed(range(len(p))):
+                stack.append((pos + (i,), p[i]))
+        else:
+            yield pos, p
+
+
+class IncrementalPuzzleSolver(Generic[Problem, T]):
+    """Solver of many problems of a puzzle which share the structure and differ only in clues,
+    keeping a single backend alive across them.
+
+    `build` is called once with a `Solver` to add the variables and constraints which do not
+    depend on clues (including answer keys), and its return value is stored as `context`.
+    `clues(problem)` enumerates the clues of a problem as `(key, value)` pairs (`grid_clues` by
+    default) and `clue(context, key, value)` returns the constraint(s) representing the clue
+    `value` at `key` (nothing, e.g. `None` or `[]`, if `value` represents an empty cell).
+
+    The constraints of each distinct `(key, value)` pair are encoded only once, guarded by a
+    selector variable, and a problem is solved by assuming the selectors of its clues. This is
+    suited for `generate_problem`, where consecutive candidates differ only in a few clues: the
+    backend needs to support incremental sessions, and those with a persistent solver keep what
+    they have learnt across problems.
+
+    `solve(problem)` returns `(is_sat, context)`, with the solutions of the answer keys (or `None`
+    if they are not unique) stored in the variables as in `Solver.solve`. Instances can be passed
+    to `generate_problem` in place of a solver function.
+    """
+
+    context: T
+
+    def __init__(
+        self,
+        build: Callable[[Solver], T],
+        clue: Callable[[T, Any, Any], Any],
+        clues: Optional[Callable[[Problem], Iterable[tuple[Hashable, Any]]]] = None,
+        backend: Union[None, str, type] = None,
+    ) -> None:
+        self._solver = Solver()
+        self.context = build(self._solver)
+        self._clue = clue
+        self._clues = clues or grid_clues
+        self._backend_type = _get_backend(backend)
+        if not self._backend_type.supports_incremental:
+            raise ValueError(
+                f"{self._backend_type.__name__} does not support incremental solving"
+            )
+        self._csp_solver: Any = None
+        self._simplifier = Simplifier()
+        # selector of each (key, value) pair, or `None` if the pair yields no constraint
+        self._selectors: Dict[tuple[Hashable, Any], Optional[BoolVar]] = {}
+
+    def _backend(self) -> Any:
+        if self._csp_solver is None:
+            self._csp_solver = self._backend_type(list(self._solver.variables))
+            self._csp_solver.add_constraint(self._simplify(self._solver.constraints))
+            self._csp_solver.push()
+        return self._csp_solver
+
+    def _simplify(self, constraints: List[Any]) -> List[Any]:
+        if not config.simplify_constraints:
+            return list(constraints)
+        return self._simplifier.simplify_constraints(constraints)
+
+    def _new_variable(self) -> BoolVar:
+        # the backend must be set up before creating `v`, as it would be declared twice otherwise
+        csp_solver = self._backend()
+        v = self._solver.bool_var()
+        csp_solver.add_variables([v])
+        return v
+
+    def _selector(self, key: Hashable, value: Any) -> Optional[BoolVar]:
+        pair = (key, value)
+        if pair in self._selectors:
+            return self._selectors[pair]
+        constraints = list(flatten_iterator(self._clue(self.context, key, value)))
+        if any(c is not None for c in constraints):
+            selector: Optional[BoolVar] = self._new_variable()
+            guarded = [selector.then(c) for c in constraints if c is not None]  # type: ignore
+            self._backend().add(self._simplify(guarded))
+        else:
+            selector = None
+        self._selectors[pair] = selector
+        return selector
+
+    def solve(self, problem: Problem) -> tuple[bool, T]:
+        assumptions = []
+        for key, value in self._clues(problem):
+            selector = self._selector(key, value)
+            if selector is not None:
+                assumptions.append(selector)
+
+        csp_solver = self._backend()
+        try:
+            is_sat = csp_solver.solve_irrefutably(self._solver.is_answer_key, assumptions)
+        except NotImplementedError:
+            is_sat = _solve_backbone(
+                csp_solver.solve_incremental,
+                self._solver.variables,
+                self._solver.is_answer_key,
+                assumptions,
+            )
+        return is_sat, self.context
@@ -30,7 +30,22 @@ For some constraints, the graph is automatically inferred from the input.
     (TODO: add formal definition)
 """
 
-from typing import Any, Iterator, List, Optional, Sequence, Tuple, Union, cast, overload
+import functools
+import itertools
+from array import array
+from typing import (
+    Any,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+    overload,
+)
 
 from .array import Array2D, BoolArray1D, BoolArray2D, IntArray1D, IntArray2D, _infer_shape
 from .constraints import IntExpr, BoolExpr, Op, count_true, then
@@ -40,30 +55,154 @@ from .configuration import config
 from .solver import Solver
 
 
+class _Adjacency(NamedTuple):
+    """Adjacency of a graph in the CSR (compressed sparse row) format.
+
+    The edges incident to vertex `v` are `edge_ids[offsets[v]:offsets[v + 1]]` (in the increasing
+    order), and `neighbors[offsets[v]:offsets[v + 1]]` are the other endpoints of them.
+    """
+
+    offsets: array
+    neighbors: array
+    edge_ids: array
+
+
+class _EdgeList(Sequence[Tuple[int, int]]):
+    """View of the edges of a `Graph` as pairs of vertex indices.
+
+    `append` and `extend` are supported for compatibility with the former `list` of edges, and
+    are equivalent to `Graph.add_edge`. Edges cannot be replaced or removed.
+    """
+
+    def __init__(self, graph: "Graph") -> None:
+        self._graph = graph
+
+    @property
+    def _endpoints(self) -> array:
+        return self._graph._endpoints
+
+    def append(self, edge: Tuple[int, int]) -> None:
+        i, j = edge
+        self._graph.add_edge(i, j)
+
+    def extend(self, edges: Iterable[Tuple[int, int]]) -> None:
+        for i, j in edges:
+            self._graph.add_edge(i, j)
+
+    def __len__(self) -> int:
+        return len(self._endpoints) // 2
+
+    @overload
+    def __getitem__(self, item: int) -> Tuple[int, int]: ...
+
+    @overload
+    def __getitem__(self, item: slice) -> List[Tuple[int, int]]: ...
+
+    def __getitem__(
+        self, item: Union[int, slice]
+    ) -> Union[Tuple[int, int], List[Tuple[int, int]]]:
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("edge index out of range")
+        return (self._endpoints[item * 2], self._endpoints[item * 2 + 1])
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        it = iter(self._endpoints)
+        return zip(it, it)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, _EdgeList):
+            return self._endpoints == other._endpoints
+        if isinstance(other, Sequence):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
 class Graph(object):
-    """Class for a undirected graph."""
+    """Class for a undirected graph.
+
+    Edges are stored in a flat `array('i')` of their endpoints, and the adjacency is derived from
+    it in the CSR format on demand. Large graphs should be built in bulk by `from_edges` rather
+    than by `add_edge`.
+    """
 
     #: The number of vertices in the graph.
     num_vertices: int
 
-    #: List of edges represented by pairs of vertex indices.
-    edges: List[Tuple[int, int]]
-
-    #: List of incident edges for each vertex.
-    #:
-    #: Each element is a list of pairs of vertex. indices and edge indices.
-    incident_edges: List[List[Tuple[int, int]]]
-
     def __init__(self, num_vertices: int) -> None:
         self.num_vertices = num_vertices
-        self.edges = []
-        self.incident_edges = [[] for i in range(self.num_vertices)]
+        # endpoints of the edges: [x0, y0, x1, y1, ...]
+        self._endpoints = array("i")
+        self._frozen = False
+        self._clear_cache()
+
+    @classmethod
+    def from_edges(
+        cls, num_vertices: int, edges: Union[Sequence[Tuple[int, int]], array, Any]
+    ) -> "Graph":
+        """Create a graph with `num_vertices` vertices and the given edges.
+
+        Args:
+            num_vertices (int): the number of vertices
+            edges: the edges, as a sequence of pairs of vertex indices, a NumPy integer array of
+                shape (number of edges, 2), or a flat `array` of endpoints `[x0, y0, x1, y1, ...]`
+
+        Raises:
+            ValueError: If the number of endpoints is odd or some of them are out of range.
+
+        Example:
+            >>> g = Graph.from_edges(3, [(0, 1), (1, 2)])
+            >>> g[1]
+            (1, 2)
+        """
+        if isinstance(edges, array):
+            endpoints = array("i", edges)
+        elif hasattr(edges, "dtype"):
+            # NumPy array; `intc` is the C int, as `array('i')` is
+            endpoints = array("i")
+            endpoints.frombytes(edges.astype("intc").tobytes())
+        else:
+            endpoints = array("i", itertools.chain.from_iterable(edges))
+
+        if len(endpoints) % 2 != 0:
+            raise ValueError("the number of endpoints of edges must be even")
+        if len(endpoints) > 0 and (min(endpoints) < 0 or max(endpoints) >= num_vertices):
+            raise ValueError("vertex index out of range")
+
+        ret = cls(num_vertices)
+        ret._endpoints = endpoints
+        return ret
+
+    @property
+    def edges(self) -> _EdgeList:
+        """List of edges represented by pairs of vertex indices."""
+        return _EdgeList(self)
+
+    @property
+    def incident_edges(self) -> List[List[Tuple[int, int]]]:
+        """List of incident edges for each vertex.
+
+        Each element is a list of pairs of vertex indices and edge indices. The returned list is
+        shared until an edge is added and must not be modified.
+        """
+        if self._incident_edges_cache is None:
+            self._incident_edges_cache = [
+                list(self._incident(v)) for v in range(self.num_vertices)
+            ]
+        return self._incident_edges_cache
 
     def __len__(self) -> int:
-        return len(self.edges)
+        return len(self._endpoints) // 2
 
     def __iter__(self) -> Iterator[Tuple[int, int]]:
-        return iter(self.edges)
+        it = iter(self._endpoints)
+        return zip(it, it)
 
     def __getitem__(self, item: int) -> Tuple[int, int]:
         return self.edges[item]
@@ -74,11 +213,18 @@ class Graph(object):
         Args:
             i (int): the index of the first vertex
             j (int): the index of the second vertex
+
+        Raises:
+            IndexError: If `i` or `j` is out of range.
+            ValueError: If the graph is frozen.
         """
-        edge_id = len(self.edges)
-        self.edges.append((i, j))
-        self.incident_edges[i].append((j, edge_id))
-        self.incident_edges[j].append((i, edge_id))
+        if self._frozen:
+            raise ValueError("edges cannot be added to a frozen graph")
+        if not (0 <= i < self.num_vertices and 0 <= j < self.num_vertices):
+            raise IndexError("vertex index out of range")
+        self._endpoints.append(i)
+        self._endpoints.append(j)
+        self._clear_cache()
 
     def line_graph(self) -> "Graph":
         """Return the "line graph" of this graph.
@@ -101,22 +247,128 @@ class Graph(object):
             >>> len(lg)
             5
         """
+        line_graph = self._line_graph()
+        return Graph.from_edges(line_graph.num_vertices, line_graph._endpoints)
+
+    def _freeze(self) -> "Graph":
+        """Make this graph immutable so that it can be shared (e.g. by caches), and return it."""
+        self._frozen = True
+        return self
+
+    def _clear_cache(self) -> None:
+        self._adjacency_cache: Optional[_Adjacency] = None
+        self._incident_edges_cache: Optional[List[List[Tuple[int, int]]]] = None
+        self._line_graph_cache: Optional[Graph] = None
+        self._incidence_graph_cache: Optional[Graph] = None
+        self._flat_edges_cache: Optional[List[int]] = None
+
+    def _adjacency(self) -> _Adjacency:
+        """Return the adjacency of this graph in the CSR format, computed once until an edge is
+        added."""
+        if self._adjacency_cache is not None:
+            return self._adjacency_cache
+
         n = self.num_vertices
-        edges = set()
+        endpoints = self._endpoints
+        offsets = array("i", bytes(4 * (n + 1)))
+        for v in endpoints:
+            offsets[v + 1] += 1
         for v in range(n):
-            for i in range(len(self.incident_edges[v])):
-                for j in range(i):
-                    x = self.incident_edges[v][i][1]
-                    y = self.incident_edges[v][j][1]
-                    if x < y:
-                        edges.add((x, y))
-                    else:
-                        edges.add((y, x))
+            offsets[v + 1] += offsets[v]
+
+        neighbors = array("i", bytes(4 * offsets[n]))
+        edge_ids = array("i", bytes(4 * offsets[n]))
+        pos = offsets[:-1]
+        for e in range(len(endpoints) // 2):
+            x = endpoints[e * 2]
+            y = endpoints[e * 2 + 1]
+            p = pos[x]
+            neighbors[p] = y
+            edge_ids[p] = e
+            pos[x] = p + 1
+            p = pos[y]
+            neighbors[p] = x
+            edge_ids[p] = e
+            pos[y] = p + 1
+
+        self._adjacency_cache = _Adjacency(offsets, neighbors, edge_ids)
+        return self._adjacency_cache
+
+    def _incident(self, v: int) -> Iterator[Tuple[int, int]]:
+        """Iterate over the pairs of the adjacent vertex and the edge index of the edges incident
+        to vertex `v`, as `incident_edges[v]` does."""
+        offsets, neighbors, edge_ids = self._adjacency()
+        start = offsets[v]
+        end = offsets[v + 1]
+        return zip(neighbors[start:end], edge_ids[start:end])
+
+    def _incident_edge_ids(self, v: int) -> array:
+        offsets, _, edge_ids = self._adjacency()
+        return edge_ids[offsets[v] : offsets[v + 1]]
+
+    def _line_graph(self) -> "Graph":
+        """Return the (frozen) line graph of this graph, computed once until an edge is added."""
+        if self._line_graph_cache is not None:
+            return self._line_graph_cache
+
+        offsets, neighbors, edge_ids = self._adjacency()
+        endpoints = array("i")
+        for v in range(self.num_vertices):
+            start = offsets[v]
+            end = offsets[v + 1]
+            for i in range(start + 1, end):
+                y = edge_ids[i]
+                for j in range(start, i):
+                    # A pair of parallel edges shares both endpoints; it is added at the smaller
+                    # one only.
+                    if neighbors[j] == neighbors[i] and neighbors[i] < v:
+                        continue
+                    endpoints.append(edge_ids[j])
+                    endpoints.append(y)
         ret = Graph(len(self))
-        for x, y in edges:
-            ret.add_edge(x, y)
+        ret._endpoints = endpoints
+        self._line_graph_cache = ret._freeze()
         return ret
 
+    def _incidence_graph(self) -> "Graph":
+        """Return the (frozen) vertex-edge incidence graph of this graph, computed once until an
+        edge is added.
+
+        Vertex `v` of this graph corresponds to vertex `v` of the returned graph and edge `e` to
+        vertex `num_vertices + e`, which is adjacent to the endpoints of `e`.
+        """
+        if self._incidence_graph_cache is not None:
+            return self._incidence_graph_cache
+
+        n = self.num_vertices
+        endpoints = array("i", bytes(8 * len(self._endpoints)))
+        for i, v in enumerate(self._endpoints):
+            endpoints[i * 2] = v
+            endpoints[i * 2 + 1] = n + i // 2
+        ret = Graph(n + len(self))
+        ret._endpoints = endpoints
+        self._incidence_graph_cache = ret._freeze()
+        return ret
+
+    def _flat_edges(self) -> List[int]:
+        """Return the endpoints of the edges flattened into a single list, as passed to the graph
+        primitives of backends. The list is built once until an edge is added, so that graphs
+        used by many constraints (e.g. the cached grid graphs) share it; it must not be
+        modified."""
+        if self._flat_edges_cache is None:
+            self._flat_edges_cache = self._endpoints.tolist()
+        return self._flat_edges_cache
+
+
+def _encoding_options() -> tuple[bool, bool, str]:
+    """Return the configurations determining how graph constraints are encoded, by which encodings
+    cached across calls (e.g. solver templates) must be keyed."""
+    return (
+        config.use_graph_primitive,
+        config.use_graph_division_primitive,
+        config.cycle_connectivity_encoding,
+    )
+
 
 def _get_array_shape_2d(array: Union[Array2D, Sequence[Sequence[Any]]]) -> tuple[int, int]:
     if isinstance(array, Array2D):
@@ -126,31 +378,46 @@ def _get_array_shape_2d(array: Union[Array2D, Sequence[Sequence[Any]]]) -> tuple
         return shape
 
 
+@functools.lru_cache(maxsize=64)
 def _grid_graph(height: int, width: int) -> Graph:
-    graph = Graph(height * width)
+    """Return the (frozen) grid graph of the shape (`height`, `width`), shared among calls."""
+    edges = []
     for y in range(height):
         for x in range(width):
             if x < width - 1:
-                graph.add_edge(y * width + x, y * width + (x + 1))
+                edges.append((y * width + x, y * width + (x + 1)))
             if y < height - 1:
-                graph.add_edge(y * width + x, (y + 1) * width + x)
-    return graph
+                edges.append((y * width + x, (y + 1) * width + x))
+    return Graph.from_edges(height * width, edges)._freeze()
+
+
+@functools.lru_cache(maxsize=64)
+def _grid_frame_graph(height: int, width: int) -> Graph:
+    """Return the (frozen) graph of the intersections of a grid frame of the shape (`height`,
+    `width`), shared among calls. Edges are in the order of `_from_grid_frame`."""
+    edges = []
+    for y in range(height + 1):
+        for x in range(width + 1):
+            if y != height:
+                edges.append((y * (width + 1) + x, (y + 1) * (width + 1) + x))
+            if x != width:
+                edges.append((y * (width + 1) + x, y * (width + 1) + (x + 1)))
+    return Graph.from_edges((height + 1) * (width + 1), edges)._freeze()
 
 
 def _from_grid_frame(grid_frame: BoolGridFrame) -> tuple[Sequence[BoolExprLike], Graph]:
     height = grid_frame.height
     width = grid_frame.width
+    horizontal = grid_frame.horizontal.data
+    vertical = grid_frame.vertical.data
     edges = []
-    graph = Graph((height + 1) * (width + 1))
     for y in range(height + 1):
         for x in range(width + 1):
             if y != height:
-                edges.append(grid_frame[y * 2 + 1, x * 2])
-                graph.add_edge(y * (width + 1) + x, (y + 1) * (width + 1) + x)
+                edges.append(vertical[y * (width + 1) + x])
             if x != width:
-                edges.append(grid_frame[y * 2, x * 2 + 1])
-                graph.add_edge(y * (width + 1) + x, y * (width + 1) + (x + 1))
-    return edges, graph
+                edges.append(horizontal[y * width + x])
+    return edges, _grid_frame_graph(height, width)
 
 
 def _active_vertices_connected(
@@ -167,14 +434,10 @@ def _active_vertices_connected(
             raise ValueError(
                 "is_active must have the same number of items as that of vertices in graph"
             )
-        solver.ensure(
-            BoolExpr(
-                Op.GRAPH_ACTIVE_VERTICES_CONNECTED,
-                [graph.num_vertices, len(graph)]
-                + [is_active[i] for i in range(len(is_active))]  # type: ignore
-                + sum([[x, y] for x, y in graph.edges], []),  # type: ignore
-            )
-        )
+        operands: List[Any] = [graph.num_vertices, len(graph)]
+        operands.extend(is_active[i] for i in range(len(is_active)))
+        operands.extend(graph._flat_edges())
+        solver.ensure(BoolExpr(Op.GRAPH_ACTIVE_VERTICES_CONNECTED, operands))
         return
 
     n = graph.num_vertices
@@ -183,9 +446,9 @@ def _active_vertices_connected(
     is_root = solver.bool_array(n)
 
     for i in range(n):
-        less_ranks = [((ranks[j] < ranks[i]) & is_active[j]) for j, _ in graph.incident_edges[i]]
+        less_ranks = [((ranks[j] < ranks[i]) & is_active[j]) for j, _ in graph._incident(i)]
         if acyclic:
-            for j, _ in graph.incident_edges[i]:
+            for j, _ in graph._incident(i):
                 if i < j:
                     solver.ensure(ranks[j] != ranks[i])
             solver.ensure(then(is_active[i], count_true(less_ranks + [is_root[i]]) == 1))
@@ -420,7 +683,7 @@ def active_edges_acyclic(
 
     for i in range(n):
         less_ranks = []
-        for j, e in graph.incident_edges[i]:
+        for j, e in graph._incident(i):
             less_ranks.append((ranks[j] < ranks[i]) & is_active_edge[e])
             if i < j:
                 solver.ensure(ranks[i] != ranks[j])
@@ -465,7 +728,7 @@ def _division_connected(
 
     for i in range(n):
         less_ranks = []
-        for j, e in graph.incident_edges[i]:
+        for j, e in graph._incident(i):
             less_ranks.append(spanning_forest[e] & (rank[i] > rank[j]))
             if i < j:
                 solver.ensure(
@@ -605,11 +868,11 @@ def _division_connected_variable_groups(
 
     for i in range(n):
         solver.ensure(is_root[i].then(group_id[i] == i))
-        for j, e in graph.incident_edges[i]:
+        for j, e in graph._incident(i):
             solver.ensure(is_active_edge[e].then(rank[j] != rank[i]))
         solver.ensure(
             count_true(
-                [is_active_edge[e] & (rank[j] < rank[i]) for j, e in graph.incident_edges[i]]
+                [is_active_edge[e] & (rank[j] < rank[i]) for j, e in graph._incident(i)]
             )
             == is_root[i].cond(0, 1)
         )
@@ -625,7 +888,7 @@ def _division_connected_variable_groups(
                 sum(
                     [
                         (is_active_edge[e] & (rank[j] > rank[i])).cond(downstream_size[j], 0)
-                        for j, e in graph.incident_edges[i]
+                        for j, e in graph._incident(i)
                     ]
                 )
                 + 1
@@ -776,15 +1039,11 @@ def _division_connected_variable_groups_with_borders(
         raise ValueError("group_size must have the same number of items as that of edges in graph")
 
     if use_graph_primitive:
-        solver.ensure(
-            BoolExpr(
-                Op.GRAPH_DIVISION,
-                [graph.num_vertices, len(graph)]
-                + [group_size[i] for i in range(len(group_size))]  # type: ignore
-                + sum([[x, y] for x, y in graph.edges], [])  # type: ignore
-                + [is_border[i] for i in range(len(is_border))],  # type: ignore
-            )
-        )
+        operands: List[Any] = [graph.num_vertices, len(graph)]
+        operands.extend(group_size[i] for i in range(len(group_size)))
+        operands.extend(graph._flat_edges())
+        operands.extend(is_border[i] for i in range(len(is_border)))
+        solver.ensure(BoolExpr(Op.GRAPH_DIVISION, operands))
     else:
         group_id = _division_connected_variable_groups(solver, graph, group_size)
         for i, (u, v) in enumerate(graph):
@@ -867,11 +1126,39 @@ def division_connected_variable_groups_with_borders(
         )
 
 
+def _active_edges_connected_primitive(
+    solver: Solver,
+    is_active_edge: Sequence[BoolExprLike],
+    is_passed: BoolArray1D,
+    graph: Graph,
+    connectivity_encoding: Optional[str],
+) -> None:
+    """Add a constraint that the active edges are connected by native graph constraints, provided
+    that `is_passed[v]` holds iff vertex `v` is incident to an active edge."""
+    if connectivity_encoding is None:
+        connectivity_encoding = config.cycle_connectivity_encoding
+    if connectivity_encoding == "line_graph":
+        _active_vertices_connected(
+            solver, is_active_edge, graph._line_graph(), acyclic=False, use_graph_primitive=True
+        )
+    elif connectivity_encoding == "incidence":
+        _active_vertices_connected(
+            solver,
+            list(is_passed) + list(is_active_edge),
+            graph._incidence_graph(),
+            acyclic=False,
+            use_graph_primitive=True,
+        )
+    else:
+        raise ValueError(f"invalid connectivity_encoding: {connectivity_encoding}")
+
+
 def _active_edges_single_cycle(
     solver: Solver,
     is_active_edge: Sequence[BoolExprLike],
     graph: Graph,
     use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> BoolArray1D:
     if use_graph_primitive is None:
         use_graph_primitive = config.use_graph_primitive
@@ -881,26 +1168,25 @@ def _active_edges_single_cycle(
 
     if use_graph_primitive:
         for i in range(n):
-            degree = count_true([is_active_edge[e] for j, e in graph.incident_edges[i]])
+            degree = count_true([is_active_edge[e] for e in graph._incident_edge_ids(i)])
             solver.ensure(degree == is_passed[i].cond(2, 0))
 
-        line_graph = graph.line_graph()
-        _active_vertices_connected(
-            solver, is_active_edge, line_graph, acyclic=False, use_graph_primitive=True
+        _active_edges_connected_primitive(
+            solver, is_active_edge, is_passed, graph, connectivity_encoding
         )
     else:
         rank = solver.int_array(n, 0, n - 1)
         is_root = solver.bool_array(n)
 
         for i in range(n):
-            degree = count_true([is_active_edge[e] for j, e in graph.incident_edges[i]])
+            degree = count_true([is_active_edge[e] for e in graph._incident_edge_ids(i)])
             solver.ensure(degree == is_passed[i].cond(2, 0))
             solver.ensure(
                 is_passed[i].then(
                     count_true(
                         [
                             is_active_edge[e] & (rank[j] >= rank[i])
-                            for j, e in graph.incident_edges[i]
+                            for j, e in graph._incident(i)
                         ]
                     )
                     <= is_root[i].cond(2, 1)
@@ -912,7 +1198,11 @@ def _active_edges_single_cycle(
 
 @overload
 def active_edges_single_cycle(
-    solver: Solver, is_active_edge: BoolGridFrame, *, use_graph_primitive: Optional[bool] = None
+    solver: Solver,
+    is_active_edge: BoolGridFrame,
+    *,
+    use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> BoolArray2D: ...
 
 
@@ -923,6 +1213,7 @@ def active_edges_single_cycle(
     graph: Graph,
     *,
     use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> BoolArray1D: ...
 
 
@@ -932,6 +1223,7 @@ def active_edges_single_cycle(
     graph: Optional[Graph] = None,
     *,
     use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> Union[BoolArray1D, BoolArray2D]:
     """Add a constraint that the active edges form a single cycle in the given `graph`, or there
     is no active edge.
@@ -960,6 +1252,11 @@ def active_edges_single_cycle(
             the default configuration is used. Such operators are available in `sugar`,
             `sugar_extended`, `csugar`, `enigma_csp` and `cspuz_core` backends, but depending on
             the configuration of the backend executable, they may not be supported.
+        connectivity_encoding (Optional[str], optional):
+            How the connectivity of the cycle is encoded when primitive graph operators are used:
+            `"line_graph"` (in the line graph of `graph`) or `"incidence"` (in the vertex-edge
+            incidence graph of `graph`, whose size is linear in the number of edges). If omitted,
+            `config.cycle_connectivity_encoding` is used.
 
     Returns:
         Union[BoolArray1D, BoolArray2D]:
@@ -973,7 +1270,11 @@ def active_edges_single_cycle(
             )
         edges, graph = _from_grid_frame(is_active_edge)
         is_passed_flat = _active_edges_single_cycle(
-            solver, edges, graph, use_graph_primitive=use_graph_primitive
+            solver,
+            edges,
+            graph,
+            use_graph_primitive=use_graph_primitive,
+            connectivity_encoding=connectivity_encoding,
         )
         return is_passed_flat.reshape((is_active_edge.height + 1, is_active_edge.width + 1))
     else:
@@ -982,7 +1283,11 @@ def active_edges_single_cycle(
         if isinstance(is_active_edge, BoolArray1D):
             is_active_edge = is_active_edge.data
         return _active_edges_single_cycle(
-            solver, is_active_edge, graph, use_graph_primitive=use_graph_primitive
+            solver,
+            is_active_edge,
+            graph,
+            use_graph_primitive=use_graph_primitive,
+            connectivity_encoding=connectivity_encoding,
         )
 
 
@@ -991,6 +1296,7 @@ def _active_edges_single_path(
     is_active_edge: Sequence[BoolExprLike],
     graph: Graph,
     use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> BoolArray1D:
     if use_graph_primitive is None:
         use_graph_primitive = config.use_graph_primitive
@@ -1001,14 +1307,13 @@ def _active_edges_single_path(
 
     if use_graph_primitive:
         for i in range(n):
-            degree = count_true([is_active_edge[e] for j, e in graph.incident_edges[i]])
+            degree = count_true([is_active_edge[e] for e in graph._incident_edge_ids(i)])
             solver.ensure(is_passed[i].then((degree == 1) | (degree == 2)))
             solver.ensure((~is_passed[i]).then(degree == 0))
             is_endpoint.append(degree == 1)
         solver.ensure(count_true(is_endpoint) == 2)
-        line_graph = graph.line_graph()
-        _active_vertices_connected(
-            solver, is_active_edge, line_graph, acyclic=False, use_graph_primitive=True
+        _active_edges_connected_primitive(
+            solver, is_active_edge, is_passed, graph, connectivity_encoding
         )
     else:
         rank = solver.int_array(n, 0, n - 1)
@@ -1016,7 +1321,7 @@ def _active_edges_single_path(
 
         for i in range(n):
             degree = count_true(
-                [is_active_edge[e] for j, e in graph.incident_edges[i]]
+                [is_active_edge[e] for e in graph._incident_edge_ids(i)]
             )
             solver.ensure(is_passed[i].then((degree == 1) | (degree == 2)))
             solver.ensure((~is_passed[i]).then(degree == 0))
@@ -1029,7 +1334,7 @@ def _active_edges_single_path(
             smaller_rank_count = count_true(
                 [
                     is_active_edge[e] & (rank[j] < rank[i])
-                    for j, e in graph.incident_edges[i]
+                    for j, e in graph._incident(i)
                 ]
             )
             solver.ensure(
@@ -1037,7 +1342,7 @@ def _active_edges_single_path(
             )
             solver.ensure(is_root[i].then(is_passed[i] & endpoint))
 
-            for j, e in graph.incident_edges[i]:
+            for j, e in graph._incident(i):
                 if i < j:
                     solver.ensure(is_active_edge[e].then(rank[i] != rank[j]))
 
@@ -1048,7 +1353,11 @@ def _active_edges_single_path(
 
 @overload
 def active_edges_single_path(
-    solver: Solver, is_active_edge: BoolGridFrame, *, use_graph_primitive: Optional[bool] = None
+    solver: Solver,
+    is_active_edge: BoolGridFrame,
+    *,
+    use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> BoolArray2D: ...
 
 
@@ -1059,6 +1368,7 @@ def active_edges_single_path(
     graph: Graph,
     *,
     use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> BoolArray1D: ...
 
 
@@ -1068,6 +1378,7 @@ def active_edges_single_path(
     graph: Optional[Graph] = None,
     *,
     use_graph_primitive: Optional[bool] = None,
+    connectivity_encoding: Optional[str] = None,
 ) -> Union[BoolArray1D, BoolArray2D]:
     """Add a constraint that the active edges form a single path in the given `graph`, or there
     is no active edge.
@@ -1098,6 +1409,9 @@ def active_edges_single_path(
             the configuration of the backend executable, they may not be supported.
 
             TODO: add implementation which does not use graph primitives
+        connectivity_encoding (Optional[str], optional):
+            How the connectivity of the path is encoded when primitive graph operators are used.
+            See :func:`active_edges_single_cycle`.
 
     Returns:
         BoolArray1D | BoolArray2D:
@@ -1112,7 +1426,11 @@ def active_edges_single_path(
             )
         edges, graph = _from_grid_frame(is_active_edge)
         is_passed_flat = _active_edges_single_path(
-            solver, edges, graph, use_graph_primitive=use_graph_primitive
+            solver,
+            edges,
+            graph,
+            use_graph_primitive=use_graph_primitive,
+            connectivity_encoding=connectivity_encoding,
         )
         return is_passed_flat.reshape((is_active_edge.height + 1, is_active_edge.width + 1))
     else:
@@ -1121,7 +1439,11 @@ def active_edges_single_path(
         if isinstance(is_active_edge, BoolArray1D):
             is_active_edge = is_active_edge.data
         return _active_edges_single_path(
-            solver, is_active_edge, graph, use_graph_primitive=use_graph_primitive
+            solver,
+            is_active_edge,
+            graph,
+            use_graph_primitive=use_graph_primitive,
+            connectivity_encoding=connectivity_encoding,
         )
 
 
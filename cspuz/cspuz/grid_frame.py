@@ -1,7 +1,7 @@
 import itertools
-from typing import Iterator, Optional, Tuple, Union
+from typing import Any, Iterator, Optional, Tuple, Union
 
-from .array import BoolArray1D, BoolArray2D
+from .array import BoolArray1D, BoolArray2D, _snapshot
 from .expr import BoolExpr
 from .solver import Solver
 
@@ -45,12 +45,28 @@ class BoolGridFrame:
         else:
             raise IndexError("index does not specify a loop edge")
 
+    def _snapshot(self) -> "BoolGridFrame":
+        """Return a grid frame of new variables holding the current solutions (see
+        `array._snapshot`)."""
+        return BoolGridFrame(
+            self.solver,
+            self.height,
+            self.width,
+            _snapshot(self.horizontal),
+            _snapshot(self.vertical),
+        )
+
     def all_edges(self) -> BoolArray1D:
         return BoolArray1D(list(itertools.chain(self.horizontal, self.vertical)))
 
     def __iter__(self) -> Iterator[BoolExpr]:
         return itertools.chain(self.horizontal, self.vertical)
 
+    def sol_arrays(self) -> Tuple[Any, Any]:
+        """Return the solutions of the horizontal and vertical edges as NumPy masked arrays (see
+        `BoolArray2D.sol_array`)."""
+        return self.horizontal.sol_array(), self.vertical.sol_array()
+
     def cell_neighbors(
         self, y: Union[int, Tuple[int, int]], x: Optional[int] = None
     ) -> BoolArray1D:
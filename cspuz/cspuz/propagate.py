@@ -0,0 +1,382 @@
+"""Tightening of the domains of integer variables before they are handed to backends.
+
+Backends based on the order encoding (e.g. Sugar and its relatives) produce encodings whose size
+is proportional to the sizes of domains, so domains declared loosely (e.g. `0..n-1` for ranks)
+are costly. `DomainTightener` propagates bounds through the top-level constraints of a problem:
+
+- Boolean literals (`b`, `~b`) fix the values of Boolean variables,
+- `p.then(q)` and `p | q | ...` contribute `q` (resp. the only disjunct which may hold) once the
+  other parts are decided by the fixed values and bounds, and
+- linear (in)equalities over variables, constants and other integer expressions (whose ranges
+  are estimated, e.g. `count_true(...)` or `b.cond(x, y)`) shrink the bounds of the variables in
+  them, and fix the conditions of `cond` terms whose branch is out of range.
+
+The result is sound: every assignment satisfying the constraints lies within the tightened
+domains, so the problem is equivalent once the variables are declared with them.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from .expr import BoolExprLike, BoolVar, Expr, IntVar, Op
+
+_COMPARISONS = (Op.EQ, Op.NE, Op.LE, Op.LT, Op.GE, Op.GT)
+
+# Propagation stops after this many steps per constraint, so that weak propagation cycles (e.g.
+# `x < y` and `y < x` over large domains, which make no progress but one value at a time) do not
+# take long. Stopping early is still sound.
+_MAX_STEPS_PER_CONSTRAINT = 20
+
+
+class _Conflict(Exception):
+    pass
+
+
+class DomainTightener:
+    """Bound propagator for the integer variables in a list of constraints.
+
+    `tighten(constraints)` propagates the constraints and `domain(v)` returns the tightened
+    domain of an integer variable `v` afterwards. Propagation stops without reporting an error
+    if the constraints turn out to be inconsistent; the domains obtained until then are sound.
+    """
+
+    #: Whether the constraints were found to be inconsistent.
+    conflict: bool
+
+    def __init__(self) -> None:
+        self._lo: Dict[int, int] = {}
+        self._hi: Dict[int, int] = {}
+        self._fixed: Dict[int, bool] = {}
+        self._changed: List[int] = []
+        self.conflict = False
+
+    def domain(self, v: IntVar) -> Tuple[int, int]:
+        return self._lo.get(v.id, v.lo), self._hi.get(v.id, v.hi)
+
+    def tighten(self, constraints: Sequence[BoolExprLike]) -> None:
+        # the constraints to propagate and, for each variable id, the constraints mentioning it
+        targets: List[Expr] = []
+        watchers: Dict[int, List[int]] = {}
+        stack = list(constraints)
+        while stack:
+            c = stack.pop()
+            if not isinstance(c, Expr):
+                continue
+            if c.op == Op.AND:
+                stack.extend(c.operands)
+                continue
+            if not _is_propagatable(c):
+                continue
+            idx = len(targets)
+            targets.append(c)
+            for var_id in _variable_ids(c):
+                watchers.setdefault(var_id, []).append(idx)
+
+        queue = list(range(len(targets)))
+        queued = [True] * len(targets)
+        budget = _MAX_STEPS_PER_CONSTRAINT * len(targets)
+        try:
+            while queue and budget > 0:
+                budget -= 1
+                idx = queue.pop()
+                queued[idx] = False
+                self._propagate(targets[idx])
+                changed = self._changed
+                self._changed = []
+                for var_id in changed:
+                    for w in watchers.get(var_id, ()):
+                        if not queued[w]:
+                            queued[w] = True
+                            queue.append(w)
+        except _Conflict:
+            self.conflict = True
+        except RecursionError:
+            pass
+
+    def tightened_variables(
+        self, variables: Sequence[Union[BoolVar, IntVar]]
+    ) -> Tuple[List[Union[BoolVar, IntVar]], int]:
+        """Return `variables` where integer variables with tightened domains are replaced with
+        variables of the same ids (sharing the solutions) declared with the tightened domains,
+        together with the total number of values removed from the domains."""
+        ret: List[Union[BoolVar, IntVar]] = []
+        reduction = 0
+        for v in variables:
+            # variables without a solution store keep their solutions by themselves
+            if isinstance(v, IntVar) and v._store is not None and v.id in self._lo:
+                lo, hi = self.domain(v)
+                if (lo, hi) != (v.lo, v.hi):
+                    reduction += (v.hi - v.lo) - (hi - lo)
+                    w = IntVar(v.id, lo, hi)
+                    w._store = v._store
+                    v = w
+            ret.append(v)
+        return ret, reduction
+
+    def _truth(self, e: Any) -> Optional[bool]:
+        """Return the value of a Boolean expression `e` if it is decided by the fixed values and
+        the bounds, and `None` otherwise."""
+        if isinstance(e, bool):
+            return e
+        op = e.op
+        if op == Op.VAR:
+            return self._fixed.get(e.id)
+        if op == Op.BOOL_CONSTANT:
+            return e.operands[0]
+        if op == Op.NOT:
+            t = self._truth(e.operands[0])
+            return None if t is None else not t
+        if op in (Op.AND, Op.OR):
+            absorbing = op == Op.OR
+            ret: Optional[bool] = not absorbing
+            for x in e.operands:
+                t = self._truth(x)
+                if t is absorbing:
+                    return absorbing
+                if t is None:
+                    ret = None
+            return ret
+        if op == Op.IMP:
+            x = self._truth(e.operands[0])
+            y = self._truth(e.operands[1])
+            if x is False or y is True:
+                return True
+            if x is True and y is False:
+                return False
+            return None
+        if op in _COMPARISONS:
+            left = self._interval(e.operands[0])
+            right = self._interval(e.operands[1])
+            if left is None or right is None:
+                return None
+            (a, b), (c, d) = left, right
+            if op in (Op.EQ, Op.NE):
+                if b < c or d < a:
+                    return op == Op.NE
+                if a == b == c == d:
+                    return op == Op.EQ
+                return None
+            if op in (Op.GE, Op.GT):
+                (a, b), (c, d) = (c, d), (a, b)
+                op = Op.LE if op == Op.GE else Op.LT
+            if op == Op.LE:
+                return True if b <= c else (False if a > d else None)
+            return True if b < c else (False if a >= d else None)
+        return None
+
+    def _interval(self, e: Any) -> Optional[Tuple[int, int]]:
+        """Return the range of an integer expression `e`, or `None` if it is not estimated."""
+        if isinstance(e, int):
+            return e, e
+        op = e.op
+        if op == Op.VAR:
+            return self.domain(e)
+        if op == Op.INT_CONSTANT:
+            return e.operands[0], e.operands[0]
+        if op == Op.NEG:
+            x = self._interval(e.operands[0])
+            return None if x is None else (-x[1], -x[0])
+        if op in (Op.ADD, Op.SUB):
+            lo = 0
+            hi = 0
+            for i, y in enumerate(e.operands):
+                x = self._interval(y)
+                if x is None:
+                    return None
+                if op == Op.SUB and i > 0:
+                    lo -= x[1]
+                    hi -= x[0]
+                else:
+                    lo += x[0]
+                    hi += x[1]
+            return lo, hi
+        if op == Op.IF:
+            cond, t, f = e.operands
+            c = self._truth(cond)
+            if c is not None:
+                return self._interval(t if c else f)
+            x = self._interval(t)
+            y = self._interval(f)
+            if x is None or y is None:
+                return None
+            return min(x[0], y[0]), max(x[1], y[1])
+        return None
+
+    def _propagate(self, c: Any) -> None:
+        if not isinstance(c, Expr):
+            if c is False:
+                raise _Conflict()
+            return
+        op = c.op
+        if op == Op.VAR:
+            self._fix(c, True)
+        elif op == Op.NOT:
+            x = c.operands[0]
+            if isinstance(x, BoolVar):
+                self._fix(x, False)
+        elif op == Op.AND:
+            for x in c.operands:
+                self._propagate(x)
+        elif op == Op.IMP:
+            x, y = c.operands
+            if self._truth(x) is True:
+                self._propagate(y)
+            elif isinstance(x, BoolVar) and self._truth(y) is False:
+                self._fix(x, False)
+        elif op == Op.OR:
+            undecided = None
+            for x in c.operands:
+                t = self._truth(x)
+                if t is True:
+                    return
+                if t is None:
+                    if undecided is not None:
+                        return
+                    undecided = x
+            if undecided is None:
+                raise _Conflict()
+            self._propagate(undecided)
+        elif op in _COMPARISONS:
+            self._propagate_comparison(op, c.operands[0], c.operands[1])
+
+    def _fix(self, v: BoolVar, value: bool) -> None:
+        current = self._fixed.get(v.id)
+        if current is None:
+            self._fixed[v.id] = value
+            self._changed.append(v.id)
+        elif current != value:
+            raise _Conflict()
+
+    def _propagate_comparison(self, op: Op, left: Any, right: Any) -> None:
+        # `left - right` as a linear combination `sum(coef * term) + const`
+        terms: Dict[int, List[Any]] = {}  # id of variable -> [coef, variable]
+        opaque: List[Tuple[int, Any]] = []
+        const = self._linearize(left, 1, terms, opaque) + self._linearize(
+            right, -1, terms, opaque
+        )
+        if op == Op.NE:
+            if len(terms) == 1 and not opaque:
+                ((coef, v),) = terms.values()
+                if coef in (1, -1):
+                    value = -const * coef
+                    lo, hi = self.domain(v)
+                    if value == lo:
+                        self._update(v, lo + 1, hi)
+                    elif value == hi:
+                        self._update(v, lo, hi - 1)
+            return
+        # normalize into `S <= 0`
+        if op in (Op.EQ, Op.LE, Op.LT):
+            self._propagate_le(terms, opaque, const + (1 if op == Op.LT else 0), 1)
+        if op in (Op.EQ, Op.GE, Op.GT):
+            self._propagate_le(terms, opaque, -const + (1 if op == Op.GT else 0), -1)
+
+    def _linearize(
+        self, e: Any, coef: int, terms: Dict[int, List[Any]], opaque: List[Tuple[int, Any]]
+    ) -> int:
+        """Add `coef * e` to `terms` and `opaque`, and return its constant part."""
+        if isinstance(e, int):
+            return coef * e
+        op = e.op
+        if op == Op.VAR:
+            t = terms.get(e.id)
+            if t is None:
+                terms[e.id] = [coef, e]
+            else:
+                t[0] += coef
+            return 0
+        if op == Op.INT_CONSTANT:
+            return coef * e.operands[0]
+        if op == Op.NEG:
+            return self._linearize(e.operands[0], -coef, terms, opaque)
+        if op in (Op.ADD, Op.SUB):
+            ret = 0
+            for i, x in enumerate(e.operands):
+                ret += self._linearize(x, -coef if op == Op.SUB and i > 0 else coef, terms, opaque)
+            return ret
+        if op == Op.IF:
+            c = self._truth(e.operands[0])
+            if c is not None:
+                return self._linearize(e.operands[1 if c else 2], coef, terms, opaque)
+        opaque.append((coef, e))
+        return 0
+
+    def _propagate_le(
+        self,
+        terms: Dict[int, List[Any]],
+        opaque: List[Tuple[int, Any]],
+        const: int,
+        sign: int,
+    ) -> None:
+        """Propagate `sum(sign * coef * term) + const <= 0`."""
+        minimum = const
+        var_terms = []
+        for coef, v in terms.values():
+            coef *= sign
+            if coef == 0:
+                continue
+            lo, hi = self.domain(v)
+            m = coef * lo if coef > 0 else coef * hi
+            minimum += m
+            var_terms.append((coef, v, m))
+        opaque_terms = []
+        for coef, e in opaque:
+            coef *= sign
+            x = self._interval(e)
+            if x is None:
+                return
+            m = min(coef * x[0], coef * x[1])
+            minimum += m
+            opaque_terms.append((coef, e, m))
+        if minimum > 0:
+            raise _Conflict()
+
+        for coef, v, m in var_terms:
+            # coef * v <= slack
+            slack = m - minimum
+            lo, hi = self.domain(v)
+            if coef > 0:
+                self._update(v, lo, min(hi, slack // coef))
+            else:
+                self._update(v, max(lo, -(slack // -coef)), hi)
+        for coef, e, m in opaque_terms:
+            if e.op != Op.IF:
+                continue
+            cond = e.operands[0]
+            if not isinstance(cond, BoolVar) and not (
+                cond.op == Op.NOT and isinstance(cond.operands[0], BoolVar)
+            ):
+                continue
+            # a branch whose value always exceeds the slack cannot be taken
+            slack = m - minimum
+            for branch, value in ((e.operands[1], False), (e.operands[2], True)):
+                x = self._interval(branch)
+                if x is not None and min(coef * x[0], coef * x[1]) > slack:
+                    if isinstance(cond, BoolVar):
+                        self._fix(cond, value)
+                    else:
+                        self._fix(cond.operands[0], not value)
+
+    def _update(self, v: IntVar, lo: int, hi: int) -> None:
+        if lo > hi:
+            raise _Conflict()
+        cur_lo, cur_hi = self.domain(v)
+        if lo > cur_lo or hi < cur_hi:
+            self._lo[v.id] = lo
+            self._hi[v.id] = hi
+            self._changed.append(v.id)
+
+
+def _is_propagatable(c: Expr) -> bool:
+    return c.op in (Op.VAR, Op.NOT, Op.IMP, Op.OR) or c.op in _COMPARISONS
+
+
+def _variable_ids(e: Expr) -> List[int]:
+    ret = []
+    stack: List[Any] = [e]
+    while stack:
+        x = stack.pop()
+        if isinstance(x, (BoolVar, IntVar)):
+            ret.append(x.id)
+        elif isinstance(x, Expr):
+            stack.extend(x.operands)
+    return ret
@@ -128,6 +128,7 @@ def generate_akari(height, width, no_easy=False, verbose=False):
         clue_penalty=lambda problem: count_non_default_values(problem, default=-2, weight=5),
         pretest=pretest,
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -50,6 +50,7 @@ def generate_aquarium(height, width, verbose=False):
         clue_penalty=lambda problem: count_non_default_values(problem[1], default=-1, weight=4)
         + count_non_default_values(problem[2], default=-1, weight=4),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -51,6 +51,7 @@ def generate_building(size, verbose=False):
         neighbor,
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=3.0),
         verbose=verbose,
+        cache_size=1024,
     )
     if generated is not None:
         return generated
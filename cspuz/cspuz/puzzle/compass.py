@@ -156,6 +156,7 @@ def generate_compass(
         clue_penalty=penalty,
         pretest=pretest,
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
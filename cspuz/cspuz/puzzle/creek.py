@@ -59,6 +59,7 @@ def generate_creek(height, width, no_easy=False, verbose=False):
         clue_penalty=lambda problem: count_non_default_values(problem, default=-1, weight=3),
         pretest=pretest,
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -41,6 +41,7 @@ def generate_doppelblock(n, verbose=False):
         builder_pattern=ArrayBuilder2D(2, n, [-1] + list(range(0, max_sum + 1)), default=-1),
         clue_penalty=lambda problem: count_non_default_values(problem, default=-1, weight=10),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
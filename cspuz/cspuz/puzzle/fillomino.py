@@ -44,6 +44,7 @@ def generate_fillomino(
         ),
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=5),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -140,6 +140,7 @@ def generate_firefly(height, width, min_clue=0, max_clue=5, verbose=False):
         builder_pattern=ArrayBuilder2D(height, width, cand, default=".."),
         clue_penalty=lambda problem: count_non_default_values(problem, default="..", weight=10),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -59,6 +59,7 @@ def generate_geradeweg(height, width, symmetry=False, verbose=False):
         builder_pattern=ArrayBuilder2D(height, width, range(0, 6), default=0, symmetry=symmetry),
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=10),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
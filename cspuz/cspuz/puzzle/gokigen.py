@@ -93,6 +93,7 @@ def generate_gokigen(height, width, no_easy=False, no_adjacent=False, verbose=Fa
         clue_penalty=lambda problem: count_non_default_values(problem, default=-1, weight=2),
         pretest=pretest,
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
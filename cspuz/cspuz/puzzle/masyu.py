@@ -1,11 +1,17 @@
+import functools
 import sys
 import subprocess
 
 import cspuz
-from cspuz import Solver, graph
+from cspuz import Solver, SolverTemplate, graph
 from cspuz.grid_frame import BoolGridFrame
 from cspuz.puzzle import util
-from cspuz.generator import generate_problem, count_non_default_values, ArrayBuilder2D
+from cspuz.generator import (
+    generate_problem,
+    count_non_default_values,
+    ArrayBuilder2D,
+    IncrementalPuzzleSolver,
+)
 from cspuz.problem_serializer import (
     Grid,
     MultiDigit,
@@ -14,12 +20,21 @@ from cspuz.problem_serializer import (
 )
 
 
-def solve_masyu(height, width, problem):
-    solver = Solver()
+def _build_masyu(solver, height, width):
     grid_frame = BoolGridFrame(solver, height - 1, width - 1)
     solver.add_answer_key(grid_frame)
     graph.active_edges_single_cycle(solver, grid_frame)
+    return grid_frame
+
+
+@functools.lru_cache(maxsize=16)
+def _masyu_template(height, width, graph_options):
+    # `graph_options` (see `graph._encoding_options`) only keys the cache, as the encoding of the
+    # graph constraints is fixed when the template is built
+    return SolverTemplate(lambda solver: _build_masyu(solver, height, width))
 
+
+def _masyu_clue(grid_frame, height, width, y, x, value):
     def get_edge(y, x, neg=False):
         if 0 <= y <= 2 * (height - 1) and 0 <= x <= 2 * (width - 1):
             if y % 2 == 0:
@@ -33,40 +48,71 @@ def solve_masyu(height, width, problem):
         else:
             return neg
 
+    if value == 1:
+        return (
+            get_edge(y * 2, x * 2 - 1)
+            & get_edge(y * 2, x * 2 + 1)
+            & (get_edge(y * 2, x * 2 - 3, True) | get_edge(y * 2, x * 2 + 3, True))
+        ) | (
+            get_edge(y * 2 - 1, x * 2)
+            & get_edge(y * 2 + 1, x * 2)
+            & (get_edge(y * 2 - 3, x * 2, True) | get_edge(y * 2 + 3, x * 2, True))
+        )
+    elif value == 2:
+        dirs = [
+            get_edge(y * 2, x * 2 - 1) & get_edge(y * 2, x * 2 - 3),
+            get_edge(y * 2 - 1, x * 2) & get_edge(y * 2 - 3, x * 2),
+            get_edge(y * 2, x * 2 + 1) & get_edge(y * 2, x * 2 + 3),
+            get_edge(y * 2 + 1, x * 2) & get_edge(y * 2 + 3, x * 2),
+        ]
+        return (dirs[0] | dirs[2]) & (dirs[1] | dirs[3])
+    return None
+
+
+def _add_masyu_clues(solver, grid_frame, height, width, problem):
     for y in range(height):
         for x in range(width):
-            if problem[y][x] == 1:
-                solver.ensure(
-                    (
-                        get_edge(y * 2, x * 2 - 1)
-                        & get_edge(y * 2, x * 2 + 1)
-                        & (get_edge(y * 2, x * 2 - 3, True) | get_edge(y * 2, x * 2 + 3, True))
-                    )
-                    | (
-                        get_edge(y * 2 - 1, x * 2)
-                        & get_edge(y * 2 + 1, x * 2)
-                        & (get_edge(y * 2 - 3, x * 2, True) | get_edge(y * 2 + 3, x * 2, True))
-                    )
-                )
-            elif problem[y][x] == 2:
-                dirs = [
-                    get_edge(y * 2, x * 2 - 1) & get_edge(y * 2, x * 2 - 3),
-                    get_edge(y * 2 - 1, x * 2) & get_edge(y * 2 - 3, x * 2),
-                    get_edge(y * 2, x * 2 + 1) & get_edge(y * 2, x * 2 + 3),
-                    get_edge(y * 2 + 1, x * 2) & get_edge(y * 2 + 3, x * 2),
-                ]
-                solver.ensure((dirs[0] | dirs[2]) & (dirs[1] | dirs[3]))
+            clue = _masyu_clue(grid_frame, height, width, y, x, problem[y][x])
+            if clue is not None:
+                solver.ensure(clue)
 
+
+def solve_masyu(height, width, problem):
+    solver = Solver()
+    grid_frame = _build_masyu(solver, height, width)
+    _add_masyu_clues(solver, grid_frame, height, width, problem)
     is_sat = solver.solve()
     return is_sat, grid_frame
 
 
-def generate_masyu(height, width, symmetry=False, verbose=False):
+def _solve_masyu_with_template(height, width, problem):
+    # The grid frame is shared among calls with the same size and its solutions are overwritten
+    # by the next call, so a snapshot of them is returned.
+    template = _masyu_template(height, width, graph._encoding_options())
+    solver = template.instantiate()
+    _add_masyu_clues(solver, template.context, height, width, problem)
+    is_sat = solver.solve()
+    return is_sat, template.context._snapshot()
+
+
+def generate_masyu(height, width, symmetry=False, verbose=False, n_workers=0, incremental=False):
+    if incremental:
+        solver = IncrementalPuzzleSolver(
+            lambda solver: _build_masyu(solver, height, width),
+            lambda grid_frame, pos, value: _masyu_clue(grid_frame, height, width, *pos, value),
+        )
+    else:
+
+        def solver(problem):
+            return _solve_masyu_with_template(height, width, problem)
+
     generated = generate_problem(
-        lambda problem: solve_masyu(height, width, problem),
+        solver,
         builder_pattern=ArrayBuilder2D(height, width, [0, 1, 2], default=0, symmetry=symmetry),
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=10),
         verbose=verbose,
+        n_workers=n_workers,
+        cache_size=1024,
     )
     return generated
 
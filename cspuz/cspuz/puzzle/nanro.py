@@ -156,6 +156,7 @@ def generate_nanro(height, width, max_block_size=8, verbose=False):
         solve_initial_problem=True,
         pretest=pretest,
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -1,9 +1,11 @@
 import argparse
+import functools
 import sys
 import subprocess
 
 import cspuz
-from cspuz import Solver, graph, count_true
+from cspuz import Solver, SolverTemplate, graph, count_true
+from cspuz.array import _snapshot
 from cspuz.puzzle import util
 from cspuz.generator import generate_problem, count_non_default_values, ArrayBuilder2D
 from cspuz.problem_serializer import (
@@ -17,17 +19,11 @@ from cspuz.problem_serializer import (
 )
 
 
-def solve_nurikabe(height, width, problem, unknown_low=None):
-    solver = Solver()
-    clues = []
-    for y in range(height):
-        for x in range(width):
-            if problem[y][x] >= 1 or problem[y][x] == -1:
-                clues.append((y, x, problem[y][x]))
-    division = solver.int_array((height, width), 0, len(clues))
+def _build_nurikabe(solver, height, width, clue_positions):
+    division = solver.int_array((height, width), 0, len(clue_positions))
 
-    roots = [None] + list(map(lambda x: (x[0], x[1]), clues))
-    graph.division_connected(solver, division, len(clues) + 1, roots=roots)
+    roots = [None] + list(clue_positions)
+    graph.division_connected(solver, division, len(clue_positions) + 1, roots=roots)
     is_white = solver.bool_array((height, width))
     solver.ensure(is_white == (division != 0))
     solver.add_answer_key(is_white)
@@ -35,17 +31,62 @@ def solve_nurikabe(height, width, problem, unknown_low=None):
     solver.ensure(is_white.conv2d(2, 1, "and").then(division[:-1, :] == division[1:, :]))
     solver.ensure(is_white.conv2d(1, 2, "and").then(division[:, :-1] == division[:, 1:]))
     solver.ensure(is_white.conv2d(2, 2, "or"))
+    return division, is_white
+
+
+@functools.lru_cache(maxsize=64)
+def _nurikabe_template(height, width, clue_positions, graph_options):
+    # `graph_options` (see `graph._encoding_options`) only keys the cache, as the encoding of the
+    # graph constraints is fixed when the template is built
+    return SolverTemplate(lambda solver: _build_nurikabe(solver, height, width, clue_positions))
+
+
+def _get_clues(height, width, problem):
+    clues = []
+    for y in range(height):
+        for x in range(width):
+            if problem[y][x] >= 1 or problem[y][x] == -1:
+                clues.append((y, x, problem[y][x]))
+    return clues
+
+
+def _add_nurikabe_clues(solver, division, clues, unknown_low):
     for i, (y, x, n) in enumerate(clues):
         if n > 0:
             solver.ensure(count_true(division == (i + 1)) == n)
         elif n == -1 and unknown_low is not None:
             solver.ensure(count_true(division == (i + 1)) >= unknown_low)
 
+
+def solve_nurikabe(height, width, problem, unknown_low=None):
+    solver = Solver()
+    clues = _get_clues(height, width, problem)
+    division, is_white = _build_nurikabe(solver, height, width, [(y, x) for y, x, _ in clues])
+    _add_nurikabe_clues(solver, division, clues, unknown_low)
+
     is_sat = solver.solve()
 
     return is_sat, is_white
 
 
+def _solve_nurikabe_with_template(height, width, problem, unknown_low=None):
+    # The structure depends on the clue positions, so templates are keyed by them as well; moves
+    # of the generator which only change clue numbers reuse the template. The array is shared
+    # among calls with the same key and its solutions are overwritten by the next call, so a
+    # snapshot of them is returned.
+    clues = _get_clues(height, width, problem)
+    template = _nurikabe_template(
+        height, width, tuple((y, x) for y, x, _ in clues), graph._encoding_options()
+    )
+    solver = template.instantiate()
+    division, is_white = template.context
+    _add_nurikabe_clues(solver, division, clues, unknown_low)
+
+    is_sat = solver.solve()
+
+    return is_sat, _snapshot(is_white)
+
+
 def resolve_unknown(height, width, problem, unknown_low=None):
     is_sat, sol = solve_nurikabe(height, width, problem, unknown_low=unknown_low)
 
@@ -77,7 +118,9 @@ def generate_nurikabe(height, width, min_clue=None, max_clue=10, verbose=False):
             if (dy, dx) != (0, 0):
                 disallow_adjacent.append((dy, dx))
     generated = generate_problem(
-        lambda problem: solve_nurikabe(height, width, problem, unknown_low=min_clue),
+        lambda problem: _solve_nurikabe_with_template(
+            height, width, problem, unknown_low=min_clue
+        ),
         builder_pattern=ArrayBuilder2D(
             height,
             width,
@@ -88,6 +131,7 @@ def generate_nurikabe(height, width, min_clue=None, max_clue=10, verbose=False):
         ),
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=5),
         verbose=verbose,
+        cache_size=1024,
     )
     if generated is None:
         return None
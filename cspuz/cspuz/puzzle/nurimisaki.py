@@ -57,12 +57,14 @@ def solve_nurimisaki(height, width, problem):
     return is_sat, is_white
 
 
-def generate_nurimisaki(height, width, verbose=False):
+def generate_nurimisaki(height, width, verbose=False, n_workers=0):
     generated = generate_problem(
         lambda problem: solve_nurimisaki(height, width, problem),
         builder_pattern=ArrayBuilder2D(height, width, [-1, 0], default=-1),
         clue_penalty=lambda problem: count_non_default_values(problem, default=-1, weight=7),
         verbose=verbose,
+        n_workers=n_workers,
+        cache_size=1024,
     )
     return generated
 
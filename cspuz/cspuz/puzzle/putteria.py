@@ -50,6 +50,7 @@ def generate_putteria(
             allow_unmet_constraints_first=True,
         ),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -96,6 +96,7 @@ def generate_shakashaka(height, width, verbose=False):
         ),
         clue_penalty=lambda problem: count_non_default_values(problem, default=None, weight=6),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -51,6 +51,7 @@ def generate_simpleloop(height, width, verbose):
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=10),
         pretest=pretest,
         verbose=verbose,
+        cache_size=1024,
     )
     if generated is None:
         return None
@@ -1,12 +1,18 @@
+import functools
 import sys
 import subprocess
 
 import cspuz
-from cspuz import Solver, graph
+from cspuz import Solver, SolverTemplate, graph
 from cspuz.grid_frame import BoolGridFrame
 from cspuz.constraints import count_true
 from cspuz.puzzle import util
-from cspuz.generator import generate_problem, count_non_default_values, ArrayBuilder2D
+from cspuz.generator import (
+    generate_problem,
+    count_non_default_values,
+    ArrayBuilder2D,
+    IncrementalPuzzleSolver,
+)
 from cspuz.problem_serializer import (
     Grid,
     OneOf,
@@ -17,20 +23,60 @@ from cspuz.problem_serializer import (
 )
 
 
-def solve_slitherlink(height, width, problem):
-    solver = Solver()
+def _build_slitherlink(solver, height, width):
     grid_frame = BoolGridFrame(solver, height, width)
     solver.add_answer_key(grid_frame)
     graph.active_edges_single_cycle(solver, grid_frame)
+    return grid_frame
+
+
+@functools.lru_cache(maxsize=16)
+def _slitherlink_template(height, width, graph_options):
+    # `graph_options` (see `graph._encoding_options`) only keys the cache, as the encoding of the
+    # graph constraints is fixed when the template is built
+    return SolverTemplate(lambda solver: _build_slitherlink(solver, height, width))
+
+
+def _slitherlink_clue(grid_frame, y, x, value):
+    if value >= 0:
+        return count_true(grid_frame.cell_neighbors(y, x)) == value
+    return None
+
+
+def _add_slitherlink_clues(solver, grid_frame, height, width, problem):
     for y in range(height):
         for x in range(width):
             if problem[y][x] >= 0:
-                solver.ensure(count_true(grid_frame.cell_neighbors(y, x)) == problem[y][x])
+                solver.ensure(_slitherlink_clue(grid_frame, y, x, problem[y][x]))
+
+
+def solve_slitherlink(height, width, problem):
+    solver = Solver()
+    grid_frame = _build_slitherlink(solver, height, width)
+    _add_slitherlink_clues(solver, grid_frame, height, width, problem)
     is_sat = solver.solve()
     return is_sat, grid_frame
 
 
-def generate_slitherlink(height, width, symmetry=False, verbose=False, disallow_adjacent=False):
+def _solve_slitherlink_with_template(height, width, problem):
+    # The grid frame is shared among calls with the same size and its solutions are overwritten
+    # by the next call, so a snapshot of them is returned.
+    template = _slitherlink_template(height, width, graph._encoding_options())
+    solver = template.instantiate()
+    _add_slitherlink_clues(solver, template.context, height, width, problem)
+    is_sat = solver.solve()
+    return is_sat, template.context._snapshot()
+
+
+def generate_slitherlink(
+    height,
+    width,
+    symmetry=False,
+    verbose=False,
+    disallow_adjacent=False,
+    n_workers=0,
+    incremental=False,
+):
     def no_neighboring_zero(problem):
         for y in range(height):
             for x in range(width):
@@ -49,8 +95,18 @@ def generate_slitherlink(height, width, symmetry=False, verbose=False, disallow_
                             return False
         return True
 
+    if incremental:
+        solver = IncrementalPuzzleSolver(
+            lambda solver: _build_slitherlink(solver, height, width),
+            lambda grid_frame, pos, value: _slitherlink_clue(grid_frame, *pos, value),
+        )
+    else:
+
+        def solver(problem):
+            return _solve_slitherlink_with_template(height, width, problem)
+
     generated = generate_problem(
-        lambda problem: solve_slitherlink(height, width, problem),
+        solver,
         builder_pattern=ArrayBuilder2D(
             height,
             width,
@@ -62,6 +118,8 @@ def generate_slitherlink(height, width, symmetry=False, verbose=False, disallow_
         clue_penalty=lambda problem: count_non_default_values(problem, default=-1, weight=5),
         pretest=no_neighboring_zero,
         verbose=verbose,
+        n_workers=n_workers,
+        cache_size=1024,
     )
     return generated
 
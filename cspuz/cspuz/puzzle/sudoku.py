@@ -35,7 +35,7 @@ def solve_sudoku(problem, n=3):
     return is_sat, answer
 
 
-def generate_sudoku(n, max_clue=None, symmetry=False, verbose=False):
+def generate_sudoku(n, max_clue=None, symmetry=False, verbose=False, n_workers=0):
     size = n * n
 
     def pretest(problem):
@@ -52,6 +52,8 @@ def generate_sudoku(n, max_clue=None, symmetry=False, verbose=False):
         pretest=pretest,
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=5),
         verbose=verbose,
+        n_workers=n_workers,
+        cache_size=1024,
     )
     return generated
 
@@ -1,4 +1,4 @@
-from ..array import Array1D, Array2D
+from ..array import Array1D, Array2D, _array_solutions
 
 
 def stringify_array(array, symbol_map=None):
@@ -26,15 +26,19 @@ _HORIZONTAL_EDGE = {None: " ", True: "-", False: "x"}
 
 
 def stringify_grid_frame(grid_frame):
+    # solutions are read in bulk rather than through each edge
+    horizontal = _array_solutions(grid_frame.horizontal)
+    vertical = _array_solutions(grid_frame.vertical)
+    width = grid_frame.width
     res = []
     for y in range(2 * grid_frame.height + 1):
-        for x in range(2 * grid_frame.width + 1):
+        for x in range(2 * width + 1):
             if y % 2 == 0 and x % 2 == 0:
                 res.append("+")
             elif y % 2 == 1 and x % 2 == 0:
-                res.append(_VERTICAL_EDGE[grid_frame[y, x].sol])
+                res.append(_VERTICAL_EDGE[vertical[(y // 2) * (width + 1) + x // 2]])
             elif y % 2 == 0 and x % 2 == 1:
-                res.append(_HORIZONTAL_EDGE[grid_frame[y, x].sol])
+                res.append(_HORIZONTAL_EDGE[horizontal[(y // 2) * width + x // 2]])
             else:
                 res.append(" ")
         res.append("\n")
@@ -74,6 +74,7 @@ def generate_yajilin(height, width, no_zero=False, no_max_clue=False, verbose=Fa
         builder_pattern=choices,
         clue_penalty=lambda problem: count_non_default_values(problem, default="..", weight=20),
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -71,6 +71,7 @@ def generate_yinyang(
         clue_penalty=lambda problem: count_non_default_values(problem, default=0, weight=5),
         pretest=pretest if no_clue_on_circumference else None,
         verbose=verbose,
+        cache_size=1024,
     )
     return generated
 
@@ -0,0 +1,217 @@
+"""Simplification of expressions before they are handed to backends.
+
+The simplifier folds constants (e.g. `x & True`, `cond(c, 0, 0)`, `1 + 2`), removes double
+negations, flattens nested `AND` / `OR` / `ADD` chains into n-ary nodes and drops constraints
+which become tautologies. Unchanged subexpressions are returned as they are.
+"""
+
+from typing import Any, List, Sequence
+
+from .expr import BoolExpr, BoolExprLike, Expr, ExprLike, ExprTransformer, IntExpr, Op
+
+_COMPARATORS = {
+    Op.EQ: lambda x, y: x == y,
+    Op.NE: lambda x, y: x != y,
+    Op.LE: lambda x, y: x <= y,
+    Op.LT: lambda x, y: x < y,
+    Op.GE: lambda x, y: x >= y,
+    Op.GT: lambda x, y: x > y,
+}
+
+
+def _count_nodes(e: Any) -> int:
+    if not isinstance(e, Expr):
+        return 0
+    ret = 0
+    stack = [e]
+    while stack:
+        x = stack.pop()
+        ret += 1
+        stack.extend(y for y in x.operands if isinstance(y, Expr))
+    return ret
+
+
+class Simplifier(ExprTransformer[ExprLike]):
+    """Simplifier of expressions.
+
+    A single `Simplifier` can be used for many expressions; subexpressions shared among them are
+    simplified only once.
+    """
+
+    #: The number of expression nodes eliminated so far.
+    removed_nodes: int
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.removed_nodes = 0
+
+    def simplify(self, e: ExprLike) -> ExprLike:
+        """Return a simplified expression equivalent to `e`."""
+        return self.transform(e)
+
+    def leaf(self, x: Any) -> ExprLike:
+        if isinstance(x, Expr):
+            return self._rewrite(x, list(x.operands))
+        return x
+
+    def node(self, e: Expr, operands: List[Any]) -> ExprLike:
+        return self._rewrite(e, operands)
+
+    def simplify_constraints(self, constraints: Sequence[BoolExprLike]) -> List[BoolExprLike]:
+        """Simplify each constraint in `constraints` and drop those which became `True`."""
+        ret = []
+        for c in constraints:
+            s = self.simplify(c)
+            if s is True:
+                continue
+            ret.append(s)  # type: ignore
+        return ret
+
+    def _removed(self, e: ExprLike) -> None:
+        self.removed_nodes += _count_nodes(e)
+
+    def _negate(self, x: BoolExprLike) -> BoolExprLike:
+        if isinstance(x, bool):
+            return not x
+        if x.op == Op.NOT:
+            self.removed_nodes += 1
+            return x.operands[0]  # type: ignore
+        return BoolExpr(Op.NOT, [x])
+
+    def _rewrite(self, node: Expr, operands: List[Any]) -> ExprLike:
+        op = node.op
+
+        if op == Op.VAR:
+            return node
+        if op in (Op.BOOL_CONSTANT, Op.INT_CONSTANT):
+            self.removed_nodes += 1
+            return operands[0]
+
+        if op == Op.NOT:
+            (x,) = operands
+            if isinstance(x, bool):
+                self.removed_nodes += 1
+                return not x
+            if x.op == Op.NOT:
+                self.removed_nodes += 2
+                return x.operands[0]
+        elif op in (Op.AND, Op.OR):
+            absorbing = op == Op.OR  # `True` for OR, `False` for AND
+            flat: List[BoolExprLike] = []
+            for x in operands:
+                if isinstance(x, bool):
+                    if x is absorbing:
+                        self.removed_nodes += 1
+                        for y in operands:
+                            self._removed(y)
+                        return absorbing
+                elif x.op == op:
+                    self.removed_nodes += 1
+                    flat.extend(x.operands)  # type: ignore
+                else:
+                    flat.append(x)
+            if len(flat) == 0:
+                self.removed_nodes += 1
+                return not absorbing
+            if len(flat) == 1:
+                self.removed_nodes += 1
+                return flat[0]
+            operands = flat
+        elif op == Op.IMP:
+            x, y = operands
+            if x is False or y is True:
+                self.removed_nodes += 1
+                self._removed(x)
+                self._removed(y)
+                return True
+            if x is True:
+                self.removed_nodes += 1
+                return y
+            if y is False:
+                self.removed_nodes += 1
+                return self._negate(x)
+        elif op in (Op.IFF, Op.XOR):
+            x, y = operands
+            if isinstance(x, bool) and isinstance(y, bool):
+                self.removed_nodes += 1
+                return (x == y) if op == Op.IFF else (x != y)
+            if isinstance(x, bool):
+                x, y = y, x
+            if isinstance(y, bool):
+                self.removed_nodes += 1
+                if y is (op == Op.IFF):
+                    return x
+                else:
+                    return self._negate(x)
+        elif op == Op.IF:
+            c, t, f = operands
+            if isinstance(c, bool):
+                self.removed_nodes += 1
+                self._removed(f if c else t)
+                return t if c else f
+            if t is f or (not isinstance(t, Expr) and not isinstance(f, Expr) and t == f):
+                self.removed_nodes += 1
+                self._removed(c)
+                self._removed(f)
+                return t
+        elif op == Op.ADD:
+            constant = 0
+            flat_int: List[ExprLike] = []
+            for x in operands:
+                if isinstance(x, int):
+                    constant += x
+                elif x.op == Op.ADD:
+                    self.removed_nodes += 1
+                    for y in x.operands:
+                        if isinstance(y, int):
+                            constant += y
+                        else:
+                            flat_int.append(y)
+                else:
+                    flat_int.append(x)
+            if constant != 0:
+                flat_int.append(constant)
+            if len(flat_int) == 0:
+                self.removed_nodes += 1
+                return 0
+            if len(flat_int) == 1:
+                self.removed_nodes += 1
+                return flat_int[0]
+            operands = flat_int
+        elif op == Op.SUB:
+            x, y = operands
+            if isinstance(x, int) and isinstance(y, int):
+                self.removed_nodes += 1
+                return x - y
+            if isinstance(y, int) and y == 0:
+                self.removed_nodes += 1
+                return x
+        elif op == Op.NEG:
+            (x,) = operands
+            if isinstance(x, int):
+                self.removed_nodes += 1
+                return -x
+            if x.op == Op.NEG:
+                self.removed_nodes += 2
+                return x.operands[0]
+        elif op in _COMPARATORS:
+            x, y = operands
+            if isinstance(x, int) and isinstance(y, int):
+                self.removed_nodes += 1
+                return _COMPARATORS[op](x, y)
+
+        if len(operands) == len(node.operands) and all(
+            x is y for x, y in zip(operands, node.operands)
+        ):
+            return node
+        if isinstance(node, IntExpr):
+            return IntExpr(op, operands)
+        elif isinstance(node, BoolExpr):
+            return BoolExpr(op, operands)
+        else:
+            return Expr(op, operands)
+
+
+def simplify(e: ExprLike) -> ExprLike:
+    """Return a simplified expression equivalent to `e`."""
+    return Simplifier().simplify(e)
@@ -1,12 +1,36 @@
 import functools
+import itertools
 import warnings
-from typing import Any, List, Optional, Tuple, Union, cast, overload
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+    overload,
+)
 
 from . import backend
-from .array import BoolArray1D, BoolArray2D, IntArray1D, IntArray2D
+from .array import BoolArray1D, BoolArray2D, IntArray1D, IntArray2D, _array_solutions
 from .configuration import config
-from .expr import BoolExpr, BoolExprLike, BoolVar, IntVar, Op
+from .expr import (
+    BoolExpr,
+    BoolExprLike,
+    BoolVar,
+    IntVar,
+    Op,
+    _get_solutions,
+    _set_solutions,
+    _SolutionStore,
+)
 from .constraints import flatten_iterator
+from .propagate import DomainTightener
+from .simplify import Simplifier
 
 
 def _get_backend_by_name(backend_name: str) -> type:
@@ -40,26 +64,101 @@ def _get_backend(backend: Union[None, str, type]) -> type:
         return backend
 
 
+# Number of backend calls of `_solve_backbone` after which all the remaining candidates are tested
+# at once.
+_BACKBONE_MAX_CHUNK_CALLS = 64
+
+
+def _solve_backbone(
+    solve: Callable[[list], bool],
+    variables: List[Union[BoolVar, IntVar]],
+    is_answer_key: List[bool],
+    assumptions: Optional[list] = None,
+) -> bool:
+    """Find the values of the answer keys common to all solutions (the backbone), as
+    `Backend.solve_irrefutably` does. `solve` checks the satisfiability of the problem under a list
+    of assumptions, storing the solution to `variables` if it is satisfiable, without leaving the
+    assumptions in the backend (e.g. `solve_incremental` of a backend in an incremental session).
+
+    The values of the answer keys in the first solution are the candidates. A chunk of them is
+    refuted by assuming that at least one of them differs (for this call only, so that no
+    constraint is left in the backend): if this is unsatisfiable, all of them are irrefutable;
+    otherwise the new solution refutes at least one candidate, and all the candidates it refutes
+    are dropped. The chunk consists of all the remaining candidates as long as solutions refute
+    several of them, so that a unique solution is confirmed with a single call; it is halved when
+    only one candidate is refuted, and doubled when a chunk is confirmed. After
+    `_BACKBONE_MAX_CHUNK_CALLS` calls, all the remaining candidates are tested at once, which
+    needs at most one more call per refuted candidate.
+    """
+    assumptions = list(assumptions or [])
+    if not solve(assumptions):
+        _set_solutions(variables, itertools.repeat(None))
+        return False
+
+    answer: List[Union[None, bool, int]] = [
+        a if is_answer_key[i] else None for i, a in enumerate(_get_solutions(variables))
+    ]
+    candidates = [i for i, a in enumerate(answer) if a is not None]
+    chunk_size = len(candidates)
+    num_calls = 0
+    while candidates:
+        if num_calls < _BACKBONE_MAX_CHUNK_CALLS:
+            chunk = candidates[:chunk_size]
+        else:
+            chunk = candidates
+        num_calls += 1
+        differ = BoolExpr(Op.OR, [variables[i] != answer[i] for i in chunk])
+        if not solve(assumptions + [differ]):
+            candidates = candidates[len(chunk) :]
+            chunk_size *= 2
+            continue
+
+        sols = _get_solutions(variables)
+        remaining = []
+        for i in candidates:
+            if sols[i] == answer[i]:
+                remaining.append(i)
+            else:
+                answer[i] = None
+        if len(candidates) - len(remaining) > 1:
+            chunk_size = len(remaining)
+        else:
+            chunk_size = max(chunk_size // 2, 1)
+        candidates = remaining
+
+    # other variables keep the values of the last solution
+    _set_solutions(
+        itertools.compress(variables, is_answer_key), itertools.compress(answer, is_answer_key)
+    )
+    return True
+
+
 class Solver(object):
     variables: List[Union[BoolVar, IntVar]]
     is_answer_key: List[bool]
     constraints: List[BoolExprLike]
     _perf_stats: Optional[dict]
+    _simplify_stats: dict
+    _template: Optional["SolverTemplate"]
+    _solution: _SolutionStore
 
     def __init__(self) -> None:
         self.variables = []
         self.is_answer_key = []
         self.constraints = []
         self._perf_stats = None
+        self._simplify_stats = {}
+        self._template = None
+        self._solution = _SolutionStore()
 
     def bool_var(self) -> BoolVar:
-        v = BoolVar(len(self.variables))
+        v = BoolVar(len(self.variables), self._solution)
         self.variables.append(v)
         self.is_answer_key.append(False)
         return v
 
     def int_var(self, lo: int, hi: int) -> IntVar:
-        v = IntVar(len(self.variables), lo, hi)
+        v = IntVar(len(self.variables), lo, hi, self._solution)
         self.variables.append(v)
         self.is_answer_key.append(False)
         return v
@@ -76,12 +175,16 @@ class Solver(object):
         if isinstance(shape, int):
             shape = (shape,)
         size = functools.reduce(lambda x, y: x * y, shape, 1)
+        start = len(self.variables)
         vars = [self.bool_var() for _ in range(size)]
 
+        ret: Union[BoolArray1D, BoolArray2D]
         if len(shape) == 1:
-            return BoolArray1D(vars)
+            ret = BoolArray1D(vars)
         else:
-            return BoolArray2D(vars, cast(Tuple[int, int], shape))
+            ret = BoolArray2D(vars, cast(Tuple[int, int], shape))
+        ret._solution_range = (self._solution, start)
+        return ret
 
     @overload
     def int_array(self, shape: Union[int, Tuple[int]], lo: int, hi: int) -> IntArray1D: ...
@@ -98,12 +201,16 @@ class Solver(object):
         if isinstance(shape, int):
             shape = (shape,)
         size = functools.reduce(lambda x, y: x * y, shape, 1)
+        start = len(self.variables)
         vars = [self.int_var(lo, hi) for _ in range(size)]
 
+        ret: Union[IntArray1D, IntArray2D]
         if len(shape) == 1:
-            return IntArray1D(vars)
+            ret = IntArray1D(vars)
         else:
-            return IntArray2D(vars, cast(Tuple[int, int], shape))
+            ret = IntArray2D(vars, cast(Tuple[int, int], shape))
+        ret._solution_range = (self._solution, start)
+        return ret
 
     def ensure(self, *constraint: Any) -> None:
         for x in flatten_iterator(*constraint):
@@ -121,35 +228,86 @@ class Solver(object):
             else:
                 raise TypeError("each element in 'variable' must be BoolVar or IntVar")
 
-    def find_answer(self, backend: Union[None, str, type] = None) -> bool:
+    def _prepare_backend(self, backend: Union[None, str, type]) -> Any:
         backend_type = _get_backend(backend)
-        csp_solver = backend_type(self.variables)  # type: ignore
-        csp_solver.add_constraint(self.constraints)
+        template = self._template
+        if template is not None and backend_type.supports_copy:
+            # only the variables and constraints added after instantiating the template are new
+            base, removed_nodes = template._base_backend(backend_type)
+            num_variables, num_constraints = template._size()
+            variables = self.variables[num_variables:]
+            constraints = self.constraints[num_constraints:]
+        else:
+            base = None
+            removed_nodes = 0
+            variables = self.variables
+            constraints = self.constraints
+        if config.simplify_constraints:
+            simplifier = Simplifier()
+            constraints = simplifier.simplify_constraints(constraints)
+            removed_nodes += simplifier.removed_nodes
+        domain_reduction = 0
+        if config.tighten_domains:
+            # the domains of variables declared by the template are not tightened
+            tightener = DomainTightener()
+            tightener.tighten(constraints)
+            variables, domain_reduction = tightener.tightened_variables(variables)
+
+        if base is not None:
+            csp_solver = base.copy()
+            if len(variables) > 0:
+                csp_solver.add_variables(variables)
+        else:
+            csp_solver = backend_type(variables)  # type: ignore
+        csp_solver.add_constraint(constraints)
+        self._simplify_stats = {
+            "simplify_removed_nodes": removed_nodes,
+            "tighten_domain_reduction": domain_reduction,
+        }
+        return csp_solver
+
+    def _update_perf_stats(self, csp_solver: Any) -> None:
+        self._perf_stats = dict(csp_solver.perf_stats() or {})
+        self._perf_stats.update(self._simplify_stats)
+
+    def find_answer(self, backend: Union[None, str, type] = None) -> bool:
+        csp_solver = self._prepare_backend(backend)
         res = csp_solver.solve()
-        self._perf_stats = csp_solver.perf_stats()
+        self._update_perf_stats(csp_solver)
         return res
 
     def solve(self, backend: Union[None, str, type] = None) -> bool:
         if not any(self.is_answer_key):
             warnings.warn("no answer key is given")
-        backend_type = _get_backend(backend)
-        csp_solver = backend_type(self.variables)  # type: ignore
-        csp_solver.add_constraint(self.constraints)
+        csp_solver = self._prepare_backend(backend)
 
         try:
-            return csp_solver.solve_irrefutably(self.is_answer_key)
+            res = csp_solver.solve_irrefutably(self.is_answer_key)
+            self._update_perf_stats(csp_solver)
+            return res
         except NotImplementedError:
             pass
 
+        # The built-in backends implement `solve_irrefutably`; the following are for the other
+        # backends.
+        if csp_solver.supports_incremental:
+            csp_solver.push()
+            res = _solve_backbone(
+                csp_solver.solve_incremental, self.variables, self.is_answer_key
+            )
+            self._update_perf_stats(csp_solver)
+            return res
+
         if not csp_solver.solve():
             # inconsistent problem
+            self._update_perf_stats(csp_solver)
             return False
 
         n_var = len(self.variables)
-        answer: List[Union[None, bool, int]] = [None] * n_var
-        for i in range(n_var):
-            if self.is_answer_key[i]:
-                answer[i] = self.variables[i].sol
+        answer: List[Union[None, bool, int]] = [
+            a if self.is_answer_key[i] else None
+            for i, a in enumerate(_get_solutions(self.variables))
+        ]
 
         while True:
             difference_cond = []
@@ -161,20 +319,106 @@ class Solver(object):
             if not csp_solver.solve():
                 break
 
+            sols = _get_solutions(self.variables)
             for i in range(n_var):
-                if (
-                    self.is_answer_key[i]
-                    and answer[i] is not None
-                    and answer[i] != self.variables[i].sol
-                ):
+                if answer[i] is not None and answer[i] != sols[i]:
                     answer[i] = None
 
-        self._perf_stats = csp_solver.perf_stats()
+        self._update_perf_stats(csp_solver)
 
-        for i in range(n_var):
-            if self.is_answer_key[i]:
-                self.variables[i].sol = answer[i]
+        _set_solutions(
+            itertools.compress(self.variables, self.is_answer_key),
+            itertools.compress(answer, self.is_answer_key),
+        )
         return True
 
+    @overload
+    def solution_array(
+        self, array: Union[BoolArray1D, IntArray1D]
+    ) -> List[Union[None, bool, int]]: ...
+
+    @overload
+    def solution_array(
+        self, array: Union[BoolArray2D, IntArray2D]
+    ) -> List[List[Union[None, bool, int]]]: ...
+
+    def solution_array(
+        self, array: Union[BoolArray1D, IntArray1D, BoolArray2D, IntArray2D]
+    ) -> Union[List[Union[None, bool, int]], List[List[Union[None, bool, int]]]]:
+        """Return the solutions of the variables in `array` at once, as a list for a 1D array or
+        a list of rows for a 2D array. Undecided values are `None`, as in `sol`."""
+        try:
+            sols = _array_solutions(array)
+        except AttributeError:
+            raise TypeError("each element in 'array' must be BoolVar or IntVar")
+        if isinstance(array, (BoolArray2D, IntArray2D)):
+            width = array.shape[1]
+            return [sols[i : i + width] for i in range(0, len(sols), width)]
+        return sols
+
     def perf_stats(self) -> Optional[dict]:
+        """Return performance statistics of the last `find_answer` or `solve` call.
+
+        Besides the statistics reported by the backend (if any), the returned dict contains
+        `simplify_removed_nodes`, the number of expression nodes eliminated by
+        :py:class:`~cspuz.simplify.Simplifier` before the constraints were passed to the backend,
+        and `tighten_domain_reduction`, the total number of values removed from the domains of
+        integer variables by :py:class:`~cspuz.propagate.DomainTightener` (if
+        `config.tighten_domains` is set).
+        """
         return self._perf_stats
+
+
+T = TypeVar("T")
+
+
+class SolverTemplate(Generic[T]):
+    """The part of a problem which is common to many instances, encoded only once.
+
+    `build` is called once with a fresh `Solver` to add the common variables and constraints, and
+    its return value (e.g. the array of variables clues refer to) is stored as `context`. Each
+    call of `instantiate` returns a new `Solver` containing them, to which instance-specific
+    constraints can be added. On solving an instance, backends supporting `copy` (all built-in
+    ones) start from a copy of the template's converted constraints, so that only the constraints
+    added to the instance are converted.
+
+    Instances share variables with the template: solving an instance overwrites the solutions
+    obtained by solving another one.
+    """
+
+    context: T
+
+    def __init__(self, build: Callable[[Solver], T]) -> None:
+        self._solver = Solver()
+        self.context = build(self._solver)
+        self._backends: Dict[type, Tuple[Any, int]] = {}
+
+    def instantiate(self) -> Solver:
+        ret = Solver()
+        ret.variables = list(self._solver.variables)
+        ret.is_answer_key = list(self._solver.is_answer_key)
+        ret.constraints = list(self._solver.constraints)
+        ret._template = self
+        ret._solution = self._solver._solution
+        return ret
+
+    def _size(self) -> Tuple[int, int]:
+        return len(self._solver.variables), len(self._solver.constraints)
+
+    def _base_backend(self, backend_type: type) -> Tuple[Any, int]:
+        """Return the backend of `backend_type` with the template's constraints, and the number of
+        expression nodes eliminated by simplifying them."""
+        ret = self._backends.get(backend_type)
+        if ret is None:
+            csp_solver = backend_type(list(self._solver.variables))
+            if config.simplify_constraints:
+                simplifier = Simplifier()
+                csp_solver.add_constraint(
+                    simplifier.simplify_constraints(self._solver.constraints)
+                )
+                ret = (csp_solver, simplifier.removed_nodes)
+            else:
+                csp_solver.add_constraint(self._solver.constraints)
+                ret = (csp_solver, 0)
+            self._backends[backend_type] = ret
+        return ret
@@ -58,13 +58,17 @@ class CspuzSugarInterface {
     String satFile, mapFile, outFile;
     String[] answerKeys;
 
-    void loadProblem() throws IOException {
+    void loadProblem(String input) throws IOException, SugarException {
         ArrayList<String> lines = new ArrayList<String>();
-        BufferedReader reader = new BufferedReader(new InputStreamReader(System.in));
+        BufferedReader reader = new BufferedReader(new StringReader(input));
         String line;
         answerKeys = null;
+        compact = false;
         while ((line = reader.readLine()) != null) {
-            if (line.startsWith("#")) {
+            if (line.startsWith("#!")) {
+                // dialect of the problem
+                compact = line.equals("#!compact");
+            } else if (line.startsWith("#")) {
                 answerKeys = line.substring(1).split(" ");
             } else {
                 lines.add(line);
@@ -72,13 +76,29 @@ class CspuzSugarInterface {
         }
 
         String cspDescription = String.join("\n", lines);
-        Parser parser = new Parser(new BufferedReader(new StringReader(cspDescription)));
-        problem = parser.parse();
+        problem = parse(cspDescription);
 
         intVars = new ArrayList<String>();
         boolVars = new ArrayList<String>();
+        registerVariables(problem);
 
-        for (Expression e : problem) {
+        if (answerKeys != null) {
+            HashSet<String> answerKeySet = new HashSet<String>();
+            for (int i = 0; i < answerKeys.length; ++i) {
+                answerKeySet.add(answerKeys[i]);
+            }
+            isAnswerKeyInt = new boolean[intVars.size()];
+            for (int i = 0; i < intVars.size(); ++i) {
+                isAnswerKeyInt[i] = answerKeySet.contains(intVars.get(i));
+            }
+            isAnswerKeyBool = new boolean[boolVars.size()];
+            for (int i = 0; i < boolVars.size(); ++i) {
+                isAnswerKeyBool[i] = answerKeySet.contains(boolVars.get(i));
+            }
+        }
+    }
+    void registerVariables(List<Expression> exprs) {
+        for (Expression e : exprs) {
             if (e instanceof Sequence) {
                 Sequence seq = (Sequence)e;
                 if (((Atom)seq.get(0)).stringValue().equals(SugarConstants.INT_DEFINITION)) {
@@ -90,32 +110,172 @@ class CspuzSugarInterface {
                 }
             }
         }
+    }
+    List<Expression> parse(String input) throws IOException, SugarException {
+        if (compact) {
+            return parseCompact(input);
+        }
+        Parser parser = new Parser(new BufferedReader(new StringReader(input)));
+        return parser.parse();
+    }
 
-        if (answerKeys != null) {
-            HashSet<String> answerKeySet = new HashSet<String>();
-            for (int i = 0; i < answerKeys.length; ++i) {
-                answerKeySet.add(answerKeys[i]);
+    // Compact dialect (see `COMPACT_OP_TO_OPNAME` in cspuz/backend/sugar_like.py): operators are
+    // abbreviated, `t` and `f` stand for `true` and `false`, and `($N e)` defines the shorthand
+    // `$N` of `e` (and stands for `e` itself). Shorthands persist across `addConstraints` calls.
+    static final HashMap<String, String> COMPACT_OPNAMES = new HashMap<String, String>();
+    static {
+        COMPACT_OPNAMES.put("I", SugarConstants.INT_DEFINITION);
+        COMPACT_OPNAMES.put("B", SugarConstants.BOOL_DEFINITION);
+        COMPACT_OPNAMES.put("&", "&&");
+        COMPACT_OPNAMES.put("|", "||");
+        COMPACT_OPNAMES.put("==", "iff");
+        COMPACT_OPNAMES.put("^", "xor");
+        COMPACT_OPNAMES.put("?", "if");
+        COMPACT_OPNAMES.put("ad", "alldifferent");
+        COMPACT_OPNAMES.put("gc", "graph-active-vertices-connected");
+        COMPACT_OPNAMES.put("gd", "graph-division");
+    }
+    boolean compact;
+    HashMap<String, Expression> shorthands = new HashMap<String, Expression>();
+
+    static boolean isDelimiter(char c) {
+        return c == '(' || c == ')' || Character.isWhitespace(c);
+    }
+
+    List<Expression> parseCompact(String input) throws SugarException {
+        List<Expression> ret = new ArrayList<Expression>();
+        // operators and operands of the sequences being parsed (an explicit stack, so that deep
+        // expressions do not overflow the call stack)
+        ArrayList<String> heads = new ArrayList<String>();
+        ArrayList<List<Expression>> operands = new ArrayList<List<Expression>>();
+        int n = input.length();
+        int i = 0;
+        while (i < n) {
+            char c = input.charAt(i);
+            if (Character.isWhitespace(c)) {
+                ++i;
+                continue;
             }
-            isAnswerKeyInt = new boolean[intVars.size()];
-            for (int i = 0; i < intVars.size(); ++i) {
-                isAnswerKeyInt[i] = answerKeySet.contains(intVars.get(i));
+            Expression e;
+            if (c == '(') {
+                int j = i + 1;
+                while (j < n && !isDelimiter(input.charAt(j))) {
+                    ++j;
+                }
+                heads.add(input.substring(i + 1, j));
+                operands.add(new ArrayList<Expression>());
+                i = j;
+                continue;
+            } else if (c == ')') {
+                if (heads.isEmpty()) {
+                    throw new SugarException("unbalanced parentheses");
+                }
+                String head = heads.remove(heads.size() - 1);
+                List<Expression> args = operands.remove(operands.size() - 1);
+                if (head.equals("Bs") || head.equals("Is")) {
+                    if (!operands.isEmpty()) {
+                        throw new SugarException("declarations must be at the top level");
+                    }
+                    expandDeclarations(head, args, ret);
+                    ++i;
+                    continue;
+                } else if (head.startsWith("$")) {
+                    if (args.size() != 1) {
+                        throw new SugarException("malformed shorthand definition " + head);
+                    }
+                    e = args.get(0);
+                    shorthands.put(head, e);
+                } else {
+                    String opname = COMPACT_OPNAMES.get(head);
+                    e = Expression.create(Expression.create(opname == null ? head : opname), args);
+                }
+                ++i;
+            } else {
+                int j = i;
+                while (j < n && !isDelimiter(input.charAt(j))) {
+                    ++j;
+                }
+                e = compactAtom(input.substring(i, j));
+                i = j;
             }
-            isAnswerKeyBool = new boolean[boolVars.size()];
-            for (int i = 0; i < boolVars.size(); ++i) {
-                isAnswerKeyBool[i] = answerKeySet.contains(boolVars.get(i));
+            if (operands.isEmpty()) {
+                ret.add(e);
+            } else {
+                operands.get(operands.size() - 1).add(e);
+            }
+        }
+        if (!heads.isEmpty()) {
+            throw new SugarException("unbalanced parentheses");
+        }
+        return ret;
+    }
+
+    // `(Bs b0 n)` and `(Is i0 n lo hi)`: declarations of `n` variables of consecutive (base-36) ids
+    // starting from `b0` and `i0`
+    static void expandDeclarations(String head, List<Expression> args, List<Expression> out) {
+        boolean isInt = head.equals("Is");
+        String first = ((Atom)args.get(0)).stringValue();
+        String prefix = first.substring(0, 1);
+        int id = Integer.parseInt(first.substring(1), 36);
+        int n = ((Atom)args.get(1)).integerValue();
+        Expression opname = Expression.create(
+            isInt ? SugarConstants.INT_DEFINITION : SugarConstants.BOOL_DEFINITION);
+        for (int k = 0; k < n; ++k) {
+            List<Expression> decl = new ArrayList<Expression>();
+            decl.add(Expression.create(prefix + Integer.toString(id + k, 36)));
+            if (isInt) {
+                decl.add(args.get(2));
+                decl.add(args.get(3));
             }
+            out.add(Expression.create(opname, decl));
         }
     }
+
+    Expression compactAtom(String token) throws SugarException {
+        char c = token.charAt(0);
+        if (c == '$') {
+            Expression e = shorthands.get(token);
+            if (e == null) {
+                throw new SugarException("undefined shorthand " + token);
+            }
+            return e;
+        }
+        if (token.equals("t")) {
+            return Expression.create("true");
+        }
+        if (token.equals("f")) {
+            return Expression.create("false");
+        }
+        if (c == '-' || Character.isDigit(c)) {
+            return Expression.create(Integer.parseInt(token));
+        }
+        return Expression.create(token);
+    }
+
+    void addConstraints(String input) throws IOException, SugarException {
+        List<Expression> exprs = parse(input);
+        registerVariables(exprs);
+        problem.addAll(exprs);
+    }
     private File tempFile(String name, String ext) throws IOException {
-        File file = File.createTempFile(name, ext);
-        file.deleteOnExit();
-        return file;
+        // not `deleteOnExit`, whose list of paths would grow for the whole life of a server
+        return File.createTempFile(name, ext);
     }
     private void setupTempFiles() throws IOException {
         satFile = tempFile("temp", ".cnf").getAbsolutePath();
         mapFile = tempFile("temp", ".map").getAbsolutePath();
         outFile = tempFile("temp", ".out").getAbsolutePath();
     }
+    // The server outlives many requests, so the temporary files are removed as soon as a request
+    // is answered rather than on exit.
+    void deleteTempFiles() {
+        for (String path : new String[] { satFile, mapFile, outFile }) {
+            if (path != null) {
+                new File(path).delete();
+            }
+        }
+        satFile = mapFile = outFile = null;
+    }
     boolean solveCSP() throws IOException, SugarException {
         // CSP -> SAT
         csp = new CSP();
@@ -146,87 +306,234 @@ class CspuzSugarInterface {
         
         return encoder.decode(outFile);
     }
-    void run() throws IOException, SugarException {
-        loadProblem();
+    String findAnswer() throws IOException, SugarException {
+        StringBuilder out = new StringBuilder();
+        if (solveCSP()) {
+            // compact output: the values of integer variables on the line "vi", and a character
+            // 0/1 for each Boolean variable on the line "vb", in the order of declarations
+            out.append("s SATISFIABLE\nvi");
+            for (String name : intVars) {
+                out.append(' ').append(csp.getIntegerVariable(name).getValue());
+            }
+            out.append("\nvb ");
+            for (String name : boolVars) {
+                out.append(csp.getBooleanVariable(name).getValue() ? '1' : '0');
+            }
+            out.append('\n');
+        } else {
+            out.append("s UNSATISFIABLE\n");
+        }
+        return out.toString();
+    }
+    String run(String input) throws IOException, SugarException {
+        loadProblem(input);
         setupTempFiles();
-        boolean isSat = solveCSP();
-
+        try {
+            return runLoaded();
+        } finally {
+            deleteTempFiles();
+        }
+    }
+    String findAnswerWithTempFiles() throws IOException, SugarException {
+        setupTempFiles();
+        try {
+            return findAnswer();
+        } finally {
+            deleteTempFiles();
+        }
+    }
+    private String runLoaded() throws IOException, SugarException {
         if (answerKeys == null) {
             // answer finder mode
-            if (isSat) {
-                System.out.println("s SATISFIABLE");
-                for (String name : intVars) {
-                    System.out.println("a " + name + "\t" + csp.getIntegerVariable(name).getValue());
+            return findAnswer();
+        }
+
+        // deduction mode
+        StringBuilder out = new StringBuilder();
+        boolean isSat = solveCSP();
+        if (!isSat) {
+            out.append("unsat\n");
+            return out.toString();
+        }
+        boolean[] notRefutedInt = new boolean[isAnswerKeyInt.length];
+        boolean[] notRefutedBool = new boolean[isAnswerKeyBool.length];
+        int[] answerInt = new int[isAnswerKeyInt.length];
+        boolean[] answerBool = new boolean[isAnswerKeyBool.length];
+        for (int i = 0; i < isAnswerKeyInt.length; ++i) {
+            notRefutedInt[i] = isAnswerKeyInt[i];
+            answerInt[i] = csp.getIntegerVariable(intVars.get(i)).getValue();
+        }
+        for (int i = 0; i < isAnswerKeyBool.length; ++i) {
+            notRefutedBool[i] = isAnswerKeyBool[i];
+            answerBool[i] = csp.getBooleanVariable(boolVars.get(i)).getValue();
+        }
+        while (true) {
+            List<Expression> refutingExpr = new ArrayList<Expression>();
+            for (int i = 0; i < isAnswerKeyInt.length; ++i) {
+                if (notRefutedInt[i]) {
+                    refutingExpr.add(Expression.create(intVars.get(i)).ne(answerInt[i]));
                 }
-                for (String name : boolVars) {
-                    System.out.println("a " + name + "\t" + csp.getBooleanVariable(name).getValue());
+            }
+            for (int i = 0; i < isAnswerKeyBool.length; ++i) {
+                if (notRefutedBool[i]) {
+                    refutingExpr.add(Expression.create(boolVars.get(i)).xor(Expression.create(String.valueOf(answerBool[i]))));
                 }
-                System.out.println("a");
-            } else {
-                System.out.println("s UNSATISFIABLE");
             }
-        } else {
-            // deduction mode
+            problem.add(Expression.create(Expression.OR, refutingExpr));
+
+            isSat = solveCSP();
             if (!isSat) {
-                System.out.println("unsat");
-                return;
+                break;
             }
-            boolean[] notRefutedInt = new boolean[isAnswerKeyInt.length];
-            boolean[] notRefutedBool = new boolean[isAnswerKeyBool.length];
-            int[] answerInt = new int[isAnswerKeyInt.length];
-            boolean[] answerBool = new boolean[isAnswerKeyBool.length];
             for (int i = 0; i < isAnswerKeyInt.length; ++i) {
-                notRefutedInt[i] = isAnswerKeyInt[i];
-                answerInt[i] = csp.getIntegerVariable(intVars.get(i)).getValue();
+                if (answerInt[i] != csp.getIntegerVariable(intVars.get(i)).getValue()) {
+                    notRefutedInt[i] = false;
+                }
             }
             for (int i = 0; i < isAnswerKeyBool.length; ++i) {
-                notRefutedBool[i] = isAnswerKeyBool[i];
-                answerBool[i] = csp.getBooleanVariable(boolVars.get(i)).getValue();
-            }
-            while (true) {
-                List<Expression> refutingExpr = new ArrayList<Expression>();
-                for (int i = 0; i < isAnswerKeyInt.length; ++i) {
-                    if (notRefutedInt[i]) {
-                        refutingExpr.add(Expression.create(intVars.get(i)).ne(answerInt[i]));
-                    }
+                if (answerBool[i] != csp.getBooleanVariable(boolVars.get(i)).getValue()) {
+                    notRefutedBool[i] = false;
                 }
-                for (int i = 0; i < isAnswerKeyBool.length; ++i) {
-                    if (notRefutedBool[i]) {
-                        refutingExpr.add(Expression.create(boolVars.get(i)).xor(Expression.create(String.valueOf(answerBool[i]))));
-                    }
+            }
+        }
+        // compact output as in the answer finder mode, only for answer keys, where "*" stands for
+        // a refuted value
+        out.append("sat\nvi");
+        for (int i = 0; i < isAnswerKeyInt.length; ++i) {
+            if (isAnswerKeyInt[i]) {
+                out.append(' ');
+                if (notRefutedInt[i]) {
+                    out.append(answerInt[i]);
+                } else {
+                    out.append('*');
                 }
-                problem.add(Expression.create(Expression.OR, refutingExpr));
+            }
+        }
+        out.append("\nvb ");
+        for (int i = 0; i < isAnswerKeyBool.length; ++i) {
+            if (isAnswerKeyBool[i]) {
+                out.append(notRefutedBool[i] ? (answerBool[i] ? '1' : '0') : '*');
+            }
+        }
+        out.append('\n');
+        return out.toString();
+    }
 
-                isSat = solveCSP();
-                if (!isSat) {
-                    break;
-                }
-                for (int i = 0; i < isAnswerKeyInt.length; ++i) {
-                    if (answerInt[i] != csp.getIntegerVariable(intVars.get(i)).getValue()) {
-                        notRefutedInt[i] = false;
-                    }
-                }
-                for (int i = 0; i < isAnswerKeyBool.length; ++i) {
-                    if (answerBool[i] != csp.getBooleanVariable(boolVars.get(i)).getValue()) {
-                        notRefutedBool[i] = false;
-                    }
-                }
+    // Server mode: a long-lived worker serving framed requests on stdin/stdout.
+    //
+    // Request:  "<command> <session> <length>\n" followed by <length> bytes of payload.
+    // Response: "<length>\n" followed by <length> bytes of payload.
+    //
+    // Commands:
+    //   ping  -> "pong"
+    //   features -> space-separated list of optional features ("compact": the compact dialect)
+    //   solve -> output of the one-shot mode for the payload
+    //   load  -> stores the payload as the problem of <session> and returns "ok"
+    //   add   -> appends the payload to the problem of <session> and returns the output of
+    //            the answer finder mode ("nosession" if <session> is unknown)
+    //   drop  -> forgets <session> and returns "ok"
+    static final int MAX_SESSIONS = 8;
+
+    static String readHeader(InputStream in) throws IOException {
+        ByteArrayOutputStream buf = new ByteArrayOutputStream();
+        int c;
+        while ((c = in.read()) != '\n') {
+            if (c < 0) {
+                return null;
             }
-            System.out.println("sat");
-            for (int i = 0; i < isAnswerKeyInt.length; ++i) {
-                if (isAnswerKeyInt[i] && notRefutedInt[i]) {
-                    System.out.println(intVars.get(i) + " " + answerInt[i]);
+            buf.write(c);
+        }
+        return buf.toString("US-ASCII");
+    }
+
+    static void writeResponse(OutputStream out, String payload) throws IOException {
+        byte[] data = payload.getBytes("UTF-8");
+        out.write((data.length + "\n").getBytes("US-ASCII"));
+        out.write(data);
+        out.flush();
+    }
+
+    static void dropSession(Map<String, CspuzSugarInterface> sessions, String session) {
+        CspuzSugarInterface inf = sessions.remove(session);
+        if (inf != null) {
+            inf.deleteTempFiles();
+        }
+    }
+
+    static void serve() throws IOException {
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        OutputStream out = new BufferedOutputStream(System.out);
+        LinkedHashMap<String, CspuzSugarInterface> sessions =
+            new LinkedHashMap<String, CspuzSugarInterface>(16, 0.75f, true) {
+                protected boolean removeEldestEntry(Map.Entry<String, CspuzSugarInterface> eldest) {
+                    if (size() > MAX_SESSIONS) {
+                        eldest.getValue().deleteTempFiles();
+                        return true;
+                    }
+                    return false;
                 }
+            };
+
+        while (true) {
+            String header = readHeader(in);
+            if (header == null) {
+                return;
             }
-            for (int i = 0; i < isAnswerKeyBool.length; ++i) {
-                if (isAnswerKeyBool[i] && notRefutedBool[i]) {
-                    System.out.println(boolVars.get(i) + " " + answerBool[i]);
+            String[] tokens = header.split(" ");
+            String command = tokens[0];
+            String session = tokens[1];
+            byte[] data = new byte[Integer.parseInt(tokens[2])];
+            in.readFully(data);
+            String payload = new String(data, "US-ASCII");
+
+            String response;
+            try {
+                if (command.equals("ping")) {
+                    response = "pong";
+                } else if (command.equals("features")) {
+                    response = "compact";
+                } else if (command.equals("solve")) {
+                    response = new CspuzSugarInterface().run(payload);
+                } else if (command.equals("load")) {
+                    CspuzSugarInterface inf = new CspuzSugarInterface();
+                    inf.loadProblem(payload);
+                    dropSession(sessions, session);
+                    sessions.put(session, inf);
+                    response = "ok";
+                } else if (command.equals("add")) {
+                    CspuzSugarInterface inf = sessions.get(session);
+                    if (inf == null) {
+                        response = "nosession";
+                    } else {
+                        inf.addConstraints(payload);
+                        response = inf.findAnswerWithTempFiles();
+                    }
+                } else if (command.equals("drop")) {
+                    dropSession(sessions, session);
+                    response = "ok";
+                } else {
+                    response = "error unknown command: " + command;
                 }
+            } catch (Exception e) {
+                dropSession(sessions, session);
+                response = "error " + e;
             }
+            writeResponse(out, response);
         }
     }
+
     public static void main(String[] args) throws IOException, SugarException {
+        if (args.length >= 1 && args[0].equals("--server")) {
+            serve();
+            return;
+        }
+        ByteArrayOutputStream buf = new ByteArrayOutputStream();
+        byte[] chunk = new byte[65536];
+        int n;
+        while ((n = System.in.read(chunk)) > 0) {
+            buf.write(chunk, 0, n);
+        }
         CspuzSugarInterface inf = new CspuzSugarInterface();
-        inf.run();
+        System.out.print(inf.run(buf.toString("US-ASCII")));
     }
 }
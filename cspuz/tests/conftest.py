@@ -0,0 +1,4 @@
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "all_backends: tests for backends which may not be available everywhere"
+    )
@@ -0,0 +1,39 @@
+import sys
+
+import pytest
+
+from cspuz import config, graph
+from cspuz.puzzle import slitherlink
+
+
+def _edges(grid_frame):  # type: ignore
+    return [v.sol for v in grid_frame.horizontal], [v.sol for v in grid_frame.vertical]
+
+
+def test_solve_with_template(monkeypatch: pytest.MonkeyPatch) -> None:
+    # NumPy is not required
+    monkeypatch.setitem(sys.modules, "numpy", None)
+
+    is_sat, grid_frame = slitherlink._solve_slitherlink_with_template(2, 2, [[3, 3], [-1, -1]])
+    assert is_sat
+    expected = _edges(grid_frame)
+    assert expected == (
+        [True, True, True, True, False, False],
+        [True, False, True, False, False, False],
+    )
+
+    # the template is reused, but the solutions returned earlier are not overwritten
+    is_sat, grid_frame2 = slitherlink._solve_slitherlink_with_template(2, 2, [[-1, -1], [3, 3]])
+    assert is_sat
+    assert _edges(grid_frame2)[0] == [False, False, True, True, True, True]
+    assert _edges(grid_frame) == expected
+
+
+def test_template_config(monkeypatch: pytest.MonkeyPatch) -> None:
+    template = slitherlink._slitherlink_template(2, 2, graph._encoding_options())
+    monkeypatch.setattr(config, "use_graph_primitive", not config.use_graph_primitive)
+    # the graph constraints are encoded again for the new configuration
+    assert slitherlink._slitherlink_template(2, 2, graph._encoding_options()) is not template
+    is_sat, grid_frame = slitherlink._solve_slitherlink_with_template(2, 2, [[3, 3], [-1, -1]])
+    assert is_sat
+    assert _edges(grid_frame)[0] == [True, True, True, True, False, False]
@@ -0,0 +1,61 @@
+from typing import Any, List
+
+import pytest
+
+from cspuz.analyzer import Analyzer, _FactChecker
+
+
+def _build() -> Analyzer:
+    analyzer = Analyzer()
+    a = analyzer.bool_array(3)
+    analyzer.add_answer_key(a, name="a")
+    analyzer.ensure(a[0], name="first")
+    analyzer.ensure(a[0].then(a[1]), name="chain1")
+    analyzer.ensure(a[1].then(~a[2]), name="chain2")
+    analyzer.ensure(a[0] | a[2], name="unused")
+    return analyzer
+
+
+@pytest.mark.parametrize("n_workers", [-1, 2])
+def test_analyze(n_workers: int) -> None:
+    analyzer = _build()
+    steps: List[Any] = []
+    res = analyzer.analyze(n_workers=n_workers, backend="cspuz_core", progress=steps.append)
+
+    assert res == [
+        ([("a.0", True)], ["first"], []),
+        ([("a.1", True)], ["chain1"], ["a.0"]),
+        ([("a.2", False)], ["chain2"], ["a.1"]),
+    ]
+    assert steps == res
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_fact_checker(monkeypatch: pytest.MonkeyPatch, incremental: bool) -> None:
+    from cspuz.backend.z3 import Z3Backend
+
+    monkeypatch.setattr(Z3Backend, "supports_incremental", incremental)
+    analyzer = _build()
+    facts = [(0, True), (1, True), (2, False)]
+    checker = _FactChecker(analyzer, facts, "z3")
+    assert (checker.csp_solver is not None) == incremental
+
+    assert checker.test_unlearnt_fact(0, []) == (1, [0], [])
+    assert checker.test_unlearnt_fact(1, [0]) == (2, [1], [0])
+    # a.2 does not follow from a.0 without chain2
+    assert checker.test_unlearnt_fact(2, [0]) == (3, [1, 2], [0])
+    assert checker.test_unlearnt_fact(2, [0, 1]) == (2, [2], [1])
+
+
+def test_analyze_large_int() -> None:
+    # solutions of integers outside the small int cache are not identical objects
+    analyzer = Analyzer()
+    x = analyzer.int_var(0, 2000)
+    y = analyzer.int_var(0, 2000)
+    analyzer.add_answer_key(x, name="x")
+    analyzer.add_answer_key(y, name="y")
+    analyzer.ensure(x == 1000, name="x")
+    analyzer.ensure(y == x + 1, name="y")
+
+    res = analyzer.analyze(n_workers=-1, backend="z3")
+    assert res == [([("x", 1000)], ["x"], []), ([("y", 1001)], ["y"], ["x"])]
@@ -1,3 +1,5 @@
+import gc
+
 import pytest
 from typing import Any, List, Tuple, Union
 
@@ -421,6 +423,30 @@ class TestArray:
             assert check_equality_expr(array[indices[i]], actual[i])
 
 
+    def test_sol_array(self, solver: Solver) -> None:
+        np = pytest.importorskip("numpy")
+        a = solver.bool_array((2, 3))
+        x = solver.int_array(3, -2, 2)
+        a[0, 1].sol = True
+        a[1, 2].sol = False
+        x[0].sol = -2
+
+        res = a.sol_array()
+        assert res.shape == (2, 3)
+        assert res.mask.tolist() == [[True, False, True], [True, True, False]]
+        assert res[0, 1] and not res[1, 2]
+        assert x.sol_array().tolist() == [-2, None, None]
+        # arrays not created by a solver
+        assert a[:, 1:].sol_array().tolist() == [[True, None], [None, False]]
+        assert IntArray1D([x[0]]).sol_array().dtype == np.int64
+
+        frame = cspuz.BoolGridFrame(solver, 1, 1)
+        frame.horizontal[1, 0].sol = True
+        horizontal, vertical = frame.sol_arrays()
+        assert horizontal.tolist() == [[None], [True]]
+        assert vertical.count() == 0
+
+
 class TestArrayOperators:
     @pytest.fixture
     def solver(self) -> Solver:
@@ -547,6 +573,18 @@ class TestArrayOperators:
         for i in range(7):
             assert check_equality_expr(res[i], ~(x[i]))
 
+    def test_elementwise_gc_state(self, solver: Solver) -> None:
+        x = solver.bool_array((5, 4))
+        assert gc.isenabled()
+        ~x
+        assert gc.isenabled()
+        gc.disable()
+        try:
+            ~x
+            assert not gc.isenabled()
+        finally:
+            gc.enable()
+
     def test_invert_bvar2d(self, solver: Solver) -> None:
         x = solver.bool_array((5, 4))
         res = ~x
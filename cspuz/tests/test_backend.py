@@ -1,6 +1,8 @@
 import pytest
 
 import cspuz
+from cspuz.array import BoolArray1D
+from cspuz.solver import _get_backend
 
 
 # TODO: test sugar, sugar_extended, csugar and enigma_csp
@@ -42,3 +44,191 @@ def test_solve(solver: cspuz.Solver) -> None:
     assert solver.solve()
     assert x.sol is None
     assert y.sol is True
+
+
+def test_solve_int(solver: cspuz.Solver) -> None:
+    x = solver.int_var(0, 3)
+    y = solver.int_var(0, 3)
+
+    solver.ensure(x + y == 4)
+    solver.ensure(x != 2)
+    solver.ensure(y >= 1)
+    solver.add_answer_key(x, y)
+
+    assert solver.solve()
+    assert x.sol is None
+    assert y.sol is None
+
+    solver.ensure(x >= 2)
+    assert solver.solve()
+    assert x.sol == 3
+    assert y.sol == 1
+
+
+def test_solution_array(solver: cspuz.Solver) -> None:
+    a = solver.bool_array((2, 3))
+    x = solver.int_array(2, 0, 3)
+
+    solver.ensure(a[0, :], ~a[1, 0], a[1, 1] != a[1, 2], x[0] == 2, x[1] >= 1)
+    solver.add_answer_key(a, x)
+
+    assert solver.solve()
+    assert solver.solution_array(a) == [[True, True, True], [False, None, None]]
+    assert solver.solution_array(a[:, 1:]) == [[True, True], [None, None]]
+    assert solver.solution_array(x) == [2, None]
+    with pytest.raises(TypeError):
+        solver.solution_array(~a)
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_solve_without_native_backbone(
+    solver: cspuz.Solver, monkeypatch: pytest.MonkeyPatch, incremental: bool
+) -> None:
+    def solve_irrefutably(self, is_answer_key, assumptions=None):  # type: ignore
+        raise NotImplementedError
+
+    backend_type = _get_backend(None)
+    monkeypatch.setattr(backend_type, "solve_irrefutably", solve_irrefutably)
+    monkeypatch.setattr(backend_type, "supports_incremental", incremental)
+
+    x = solver.bool_var()
+    y = solver.bool_var()
+    aux = solver.int_var(0, 2)
+    solver.ensure(x, aux == y.cond(2, 1))
+    solver.add_answer_key(x, y)
+    assert solver.solve()
+    assert (x.sol, y.sol) == (True, None)
+    # variables other than the answer keys keep the values of a solution
+    assert aux.sol in (1, 2)
+
+
+def test_incremental_session(solver: cspuz.Solver) -> None:
+    x = solver.bool_var()
+    y = solver.bool_var()
+
+    csp_solver = _get_backend(None)(solver.variables)
+    if not csp_solver.supports_incremental:
+        pytest.skip("backend does not support incremental sessions")
+    csp_solver.add_constraint(x | y)
+    csp_solver.push()
+    assert csp_solver.solve_incremental()
+
+    csp_solver.add(~x)
+    assert csp_solver.solve_incremental()
+    assert x.sol is False
+    assert y.sol is True
+
+    csp_solver.add([~y])
+    assert not csp_solver.solve_incremental()
+
+
+def test_template() -> None:
+    def build(solver: cspuz.Solver) -> BoolArray1D:
+        grid = solver.bool_array(3)
+        solver.ensure(cspuz.count_true(grid) == 1)
+        solver.add_answer_key(grid)
+        return grid
+
+    template = cspuz.SolverTemplate(build)
+    grid = template.context
+
+    solver = template.instantiate()
+    solver.ensure(~grid[0], ~grid[1])
+    assert solver.solve()
+    assert [v.sol for v in grid] == [False, False, True]
+
+    solver = template.instantiate()
+    z = solver.int_var(0, 2)
+    solver.ensure(z == 1, grid[1] == (z == 1))
+    assert solver.solve()
+    assert [v.sol for v in grid] == [False, True, False]
+
+    # constraints of previous instances do not leak
+    solver = template.instantiate()
+    solver.ensure(~grid[2])
+    assert solver.solve()
+    assert [v.sol for v in grid] == [None, None, False]
+
+
+def test_solve_irrefutably_assumptions(solver: cspuz.Solver) -> None:
+    x = solver.bool_var()
+    y = solver.int_var(0, 2)
+    s = solver.bool_var()
+
+    csp_solver = _get_backend(None)(solver.variables)
+    if not csp_solver.supports_incremental:
+        pytest.skip("backend does not support incremental sessions")
+    csp_solver.add_constraint(x == (y >= 1))
+    csp_solver.push()
+    csp_solver.add(s.then(y != 2))
+    is_answer_key = [True, True, False]
+
+    assert csp_solver.solve_irrefutably(is_answer_key, [~x])
+    assert (x.sol, y.sol) == (False, 0)
+    assert csp_solver.solve_irrefutably(is_answer_key, [x, s])
+    assert (x.sol, y.sol) == (True, 1)
+    # neither assumptions nor blocking clauses of previous calls remain
+    assert csp_solver.solve_irrefutably(is_answer_key)
+    assert (x.sol, y.sol) == (None, None)
+    assert not csp_solver.solve_irrefutably(is_answer_key, [~x, x])
+
+
+def test_z3_solve_irrefutably_calls(
+    solver: cspuz.Solver, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    if cspuz.config.default_backend != "z3":
+        pytest.skip("z3 specific")
+    import z3
+
+    num_calls = 0
+    check = z3.Solver.check
+
+    def counted_check(self, *assumptions):  # type: ignore
+        nonlocal num_calls
+        num_calls += 1
+        return check(self, *assumptions)
+
+    monkeypatch.setattr(z3.Solver, "check", counted_check)
+
+    a = solver.bool_array(20)
+    solver.ensure(a)
+    solver.add_answer_key(a)
+    # a unique solution is confirmed by refuting all the candidates at once
+    assert solver.solve()
+    assert [v.sol for v in a] == [True] * 20
+    assert num_calls == 2
+
+    x = solver.bool_var()
+    solver.add_answer_key(x)
+    # the first solution, the refutation of `x`, and two chunks of the other candidates
+    num_calls = 0
+    assert solver.solve()
+    assert [v.sol for v in a] == [True] * 20
+    assert x.sol is None
+    assert num_calls == 4
+
+
+def test_solve_backbone(solver: cspuz.Solver) -> None:
+    from cspuz.solver import _solve_backbone
+
+    a = solver.bool_array(40)
+    x = solver.int_var(0, 3)
+    solver.ensure(a[:20])
+    solver.ensure(a[20] != a[21], (x >= 2) == a[22])
+    solver.add_answer_key(a, x)
+
+    csp_solver = _get_backend(None)(solver.variables)
+    if not csp_solver.supports_incremental:
+        pytest.skip("backend does not support incremental sessions")
+    csp_solver.add_constraint(solver.constraints)
+    csp_solver.push()
+    solve = csp_solver.solve_incremental
+    assert _solve_backbone(solve, solver.variables, solver.is_answer_key)
+    assert [v.sol for v in a[:20]] == [True] * 20
+    assert all(v.sol is None for v in a[20:])
+    assert x.sol is None
+
+    assert _solve_backbone(solve, solver.variables, solver.is_answer_key, [~a[20], ~a[22]])
+    assert (a[20].sol, a[21].sol, a[22].sol) == (False, True, False)
+    assert x.sol is None
+    assert not _solve_backbone(solve, solver.variables, solver.is_answer_key, [a[20], a[21]])
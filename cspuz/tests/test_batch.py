@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from cspuz import batch
+
+
+def _sleep(url: str) -> bool:
+    time.sleep(10)
+    return True
+
+
+def _fail(url: str) -> bool:
+    raise ValueError("broken problem")
+
+
+@pytest.fixture
+def fake_solvers(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(batch.SOLVERS, "sleep", _sleep)
+    monkeypatch.setitem(batch.SOLVERS, "fail", _fail)
+
+
+def test_unsupported() -> None:
+    urls = ["https://puzz.link/p?unknown/3/3/0", "not a url", "https://puzz.link/p?lits/3/3/0"]
+    results = sorted(
+        batch.solve_many(urls, n_workers=2, height_lim=2), key=lambda res: res.index
+    )
+    assert [res.index for res in results] == [0, 1, 2]
+    assert [res.url for res in results] == urls
+    assert all(res.result is None and res.error is None for res in results)
+
+
+@pytest.mark.usefixtures("fake_solvers")
+def test_error() -> None:
+    (res,) = batch.solve_many(["https://puzz.link/p?fail/3/3/0"], n_workers=1)
+    assert res.result is None
+    assert res.error == "ValueError: broken problem"
+
+
+@pytest.mark.usefixtures("fake_solvers")
+def test_timeout() -> None:
+    start = time.perf_counter()
+    (res,) = batch.solve_many(["https://puzz.link/p?sleep/3/3/0"], n_workers=1, timeout=0.2)
+    assert time.perf_counter() - start < 5
+    assert res.error == "timeout"
+
+
+def test_cancel() -> None:
+    consumed = []
+
+    def urls():
+        for i in range(100):
+            consumed.append(i)
+            yield "https://puzz.link/p?unknown/3/3/0"
+
+    results = batch.solve_many(urls(), n_workers=2)
+    next(results)
+    results.close()
+    # only a bounded number of jobs are submitted ahead
+    assert len(consumed) <= 5
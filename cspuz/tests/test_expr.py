@@ -3,7 +3,18 @@ from typing import Any
 
 import cspuz
 from cspuz import Solver
-from cspuz.expr import BoolVar, Expr, IntVar, Op
+from cspuz.expr import (
+    BoolVar,
+    Expr,
+    ExprTransformer,
+    ExprVisitor,
+    IntVar,
+    Op,
+    _get_solutions,
+    _set_solutions,
+    hash_consing,
+    walk,
+)
 
 from tests.util import check_equality_expr
 
@@ -507,3 +518,120 @@ class TestExprValue:
         solver.ensure(y == y_val)
         solver.ensure(x < y)
         assert solver.find_answer() == is_sat
+
+
+class TestExprRepresentation:
+    def test_no_instance_dict(self) -> None:
+        solver = Solver()
+        bx = solver.bool_var()
+        ix = solver.int_var(0, 5)
+        for e in [bx, ix, ~bx, ix + 1, bx.cond(ix, 0)]:
+            assert not hasattr(e, "__dict__")
+
+    def test_operands_tuple(self) -> None:
+        solver = Solver()
+        bx = solver.bool_var()
+        by = solver.bool_var()
+        assert (bx & by).operands == (bx, by)
+
+    def test_hash_consing(self) -> None:
+        solver = Solver()
+        bx = solver.bool_var()
+        by = solver.bool_var()
+        ix = solver.int_var(0, 5)
+
+        assert bx.cond(1, 0) is not bx.cond(1, 0)
+        with hash_consing():
+            assert bx.cond(1, 0) is bx.cond(1, 0)
+            assert bx.cond(1, 0) is not by.cond(1, 0)
+            assert (ix == 1) is not (ix == True)  # noqa: E712
+            assert cspuz.count_true([bx, by]).operands[0] is bx.cond(1, 0)
+
+            a = solver.bool_array(3)
+            assert (~a)[1] is ~a[1]
+        assert bx.cond(1, 0) is not bx.cond(1, 0)
+
+    def test_solution_store(self) -> None:
+        solver = Solver()
+        bx = solver.bool_var()
+        ix = solver.int_var(-5, 5)
+        assert bx.sol is None and ix.sol is None
+
+        bx.sol = False
+        ix.sol = -3
+        assert bx.sol is False and ix.sol == -3
+        assert list(solver._solution.state) == [0, 1]
+
+        _set_solutions([bx, ix], [True, None])
+        assert bx.sol is True and ix.sol is None
+        assert _get_solutions([ix, bx]) == [None, True]
+
+        # variables not created by a solver keep their own solutions
+        standalone = BoolVar(0)
+        _set_solutions([standalone], [True])
+        assert standalone.sol is True and bx.sol is True
+
+
+class TestExprTraversal:
+    def test_walk(self) -> None:
+        solver = Solver()
+        bx = solver.bool_var()
+        ix = solver.int_var(0, 5)
+
+        class Tokenizer(ExprVisitor):
+            def __init__(self) -> None:
+                self.tokens: list = []
+
+            def enter(self, e: Expr) -> bool:
+                self.tokens.append(e.op)
+                return e.op != Op.NOT
+
+            def leave(self, e: Expr) -> None:
+                self.tokens.append(")")
+
+            def leaf(self, x: Any) -> None:
+                self.tokens.append(x)
+
+        tokenizer = Tokenizer()
+        walk(bx.cond(ix + 1, 0) == 2, tokenizer)
+        assert tokenizer.tokens == [Op.EQ, Op.IF, bx, Op.ADD, ix, 1, ")", 0, ")", 2, ")"]
+
+        tokenizer = Tokenizer()
+        walk(~bx | bx, tokenizer)
+        assert tokenizer.tokens == [Op.OR, Op.NOT, bx, ")"]
+
+    def test_transform_deep(self) -> None:
+        solver = Solver()
+        ix = solver.int_var(0, 5)
+
+        class Evaluator(ExprTransformer[int]):
+            def leaf(self, x: Any) -> int:
+                return 3 if x is ix else x
+
+            def node(self, e: Expr, operands: list) -> int:
+                assert e.op == Op.ADD
+                return sum(operands)
+
+        e = ix
+        for _ in range(10000):
+            e = e + 1
+        assert Evaluator().transform(e) == 10003
+
+    def test_transform_memo(self) -> None:
+        solver = Solver()
+        ix = solver.int_var(0, 5)
+        shared = ix + 1
+        visited = []
+
+        class Counter(ExprTransformer[int]):
+            def leaf(self, x: Any) -> int:
+                return 0
+
+            def node(self, e: Expr, operands: list) -> int:
+                visited.append(e)
+                return 0
+
+        transformer = Counter()
+        transformer.transform((shared + shared) == 0)
+        transformer.transform(shared >= 1)
+        assert sum(1 for e in visited if e is shared) == 1
@@ -0,0 +1,186 @@
+import itertools
+from typing import Any, Iterator, List, Tuple
+
+import pytest
+
+from cspuz import Solver
+from cspuz.array import BoolArray1D
+from cspuz.constraints import count_true
+from cspuz.generator import (
+    ArrayBuilder2D,
+    IncrementalPuzzleSolver,
+    default_score_calculator,
+    default_uniqueness_checker,
+    generate_problem,
+)
+import cspuz.generator.srandom as srandom
+from cspuz.generator.srandom import use_deterministic_prng
+
+
+def _solver(problem: List[List[int]]) -> Tuple[Any, ...]:
+    return (sum(map(sum, problem)) <= 20, problem)
+
+
+def _score(problem: List[List[int]]) -> float:
+    return float(sum(map(sum, problem)))
+
+
+def _uniqueness(problem: List[List[int]]) -> bool:
+    return sum(map(sum, problem)) == 20 and problem[0][0] == 0
+
+
+@pytest.mark.parametrize("n_workers", [0, 3])
+def test_generate_problem_deterministic(n_workers: int) -> None:
+    use_deterministic_prng(True, seed=0)
+    try:
+        expected = generate_problem(
+            _solver,
+            builder_pattern=ArrayBuilder2D(3, 3, [0, 1, 2, 3], default=0),
+            score=_score,
+            uniqueness=_uniqueness,
+        )
+        use_deterministic_prng(True, seed=0)
+        generated = generate_problem(
+            _solver,
+            builder_pattern=ArrayBuilder2D(3, 3, [0, 1, 2, 3], default=0),
+            score=_score,
+            uniqueness=_uniqueness,
+            n_workers=n_workers,
+        )
+    finally:
+        use_deterministic_prng(False)
+    assert expected is not None
+    assert generated == expected
+
+
+def _eager_neighbors(problem: List[List[int]]) -> Iterator[List[List[int]]]:
+    moves = [(y, x, v) for y in range(3) for x in range(3) for v in range(4)]
+    srandom.shuffle(moves)
+    for y, x, v in moves:
+        if problem[y][x] != v:
+            yield [[v if (i, j) == (y, x) else problem[i][j] for j in range(3)] for i in range(3)]
+
+
+def _lazy_neighbors(problem: List[List[int]]) -> Iterator[List[List[int]]]:
+    for _ in range(36):
+        y, x, v = srandom.randint(0, 2), srandom.randint(0, 2), srandom.randint(0, 3)
+        yield [[v if (i, j) == (y, x) else problem[i][j] for j in range(3)] for i in range(3)]
+
+
+@pytest.mark.parametrize("neighbor_generator", [_eager_neighbors, _lazy_neighbors])
+def test_generate_problem_workers_prng(neighbor_generator: Any) -> None:
+    def run(n_workers: int) -> Any:
+        use_deterministic_prng(True, seed=0)
+        try:
+            return generate_problem(
+                _solver,
+                initial_problem=[[0] * 3 for _ in range(3)],
+                neighbor_generator=neighbor_generator,
+                score=_score,
+                uniqueness=lambda problem: _score(problem) == 15,
+                n_workers=n_workers,
+            )
+        finally:
+            use_deterministic_prng(False)
+
+    sequential = run(0)
+    windowed = run(3)
+    assert sequential is not None and _score(sequential) == 15
+    assert windowed is not None and _score(windowed) == 15
+    # reproducible even if the window changes the order of random draws
+    assert run(3) == windowed
+    if neighbor_generator is _eager_neighbors:
+        assert windowed == sequential
+
+
+def test_default_checkers_masked_array() -> None:
+    np = pytest.importorskip("numpy")
+    decided = np.ma.MaskedArray([[True, False], [False, True]], mask=False)
+    undecided = np.ma.MaskedArray([[True, False], [False, True]], mask=[[0, 1], [0, 0]])
+    assert default_score_calculator(decided, undecided) == 7.0
+    assert default_uniqueness_checker(decided)
+    assert not default_uniqueness_checker(decided, undecided)
+
+
+def test_generate_problem_cache() -> None:
+    def run(cache_size: int) -> Tuple[Any, int]:
+        num_calls = 0
+
+        def solver(problem: List[List[int]]) -> Tuple[Any, ...]:
+            nonlocal num_calls
+            num_calls += 1
+            return _solver(problem)
+
+        use_deterministic_prng(True, seed=0)
+        try:
+            generated = generate_problem(
+                solver,
+                builder_pattern=ArrayBuilder2D(2, 2, [0, 1, 2, 3], default=0),
+                score=_score,
+                uniqueness=lambda problem: False,
+                max_steps=50,
+                cache_size=cache_size,
+            )
+        finally:
+            use_deterministic_prng(False)
+        return generated, num_calls
+
+    generated, num_calls = run(1024)
+    generated_nocache, num_calls_nocache = run(0)
+    assert generated is None and generated_nocache is None
+    # there are only 4^4 distinct problems
+    assert num_calls <= 256
+    assert num_calls < num_calls_nocache
+
+
+def _build_minesweeper(solver: Solver) -> BoolArray1D:
+    is_mine = solver.bool_array(5)
+    solver.add_answer_key(is_mine)
+    return is_mine
+
+
+def _minesweeper_clue(is_mine: BoolArray1D, pos: Tuple[int, ...], value: int) -> Any:
+    if value < 0:
+        return None
+    i = pos[-1]
+    return [~is_mine[i], count_true(is_mine[max(i - 1, 0) : i + 2]) == value]
+
+
+def test_incremental_puzzle_solver() -> None:
+    incremental = IncrementalPuzzleSolver(_build_minesweeper, _minesweeper_clue, backend="z3")
+    for problem in itertools.product([-1, 0, 1, 2], repeat=5):
+        solver = Solver()
+        is_mine = _build_minesweeper(solver)
+        for i in range(5):
+            clue = _minesweeper_clue(is_mine, (i,), problem[i])
+            if clue is not None:
+                solver.ensure(clue)
+        expected = solver.solve(backend="z3")
+        expected_sol = [v.sol for v in is_mine]
+
+        is_sat, answer = incremental.solve(list(problem))
+        assert is_sat == expected
+        assert answer is incremental.context
+        if is_sat:
+            assert [v.sol for v in answer] == expected_sol
+
+
+def test_generate_problem_incremental() -> None:
+    incremental = IncrementalPuzzleSolver(_build_minesweeper, _minesweeper_clue, backend="z3")
+    use_deterministic_prng(True, seed=0)
+    try:
+        generated = generate_problem(
+            incremental, builder_pattern=ArrayBuilder2D(1, 5, [-1, 0, 1, 2], default=-1)
+        )
+    finally:
+        use_deterministic_prng(False)
+    assert generated is not None
+    is_sat, is_mine = incremental.solve(generated)
+    assert is_sat and all(v.sol is not None for v in is_mine)
+
+    with pytest.raises(ValueError):
+        generate_problem(
+            incremental,
+            builder_pattern=ArrayBuilder2D(1, 5, [-1, 0, 1, 2], default=-1),
+            n_workers=2,
+        )
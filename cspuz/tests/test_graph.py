@@ -1,7 +1,10 @@
+from array import array
+
 import pytest
 
 import cspuz
 from cspuz import graph, BoolGridFrame, Solver
+from cspuz.expr import Op
 from cspuz.graph import Graph
 
 
@@ -9,6 +12,7 @@ from cspuz.graph import Graph
     autouse=True,
     params=[
         ("z3", False, False),
+        ("z3", True, True),
         ("cspuz_core", True, True),
     ],
 )
@@ -53,6 +57,66 @@ def test_graph_getitem(default_graph: Graph) -> None:
     assert default_graph[4] == (2, 5)
 
 
+def test_graph_from_edges(default_graph: Graph) -> None:
+    edges = list(default_graph)
+    g = Graph.from_edges(8, edges)
+    assert g.edges == edges
+    assert g.incident_edges == default_graph.incident_edges
+
+    flat = array("i", [v for e in edges for v in e])
+    assert list(Graph.from_edges(8, flat)) == edges
+
+    np = pytest.importorskip("numpy")
+    assert list(Graph.from_edges(8, np.array(edges))) == edges
+
+    with pytest.raises(ValueError):
+        Graph.from_edges(8, [(0, 8)])
+    with pytest.raises(ValueError):
+        Graph.from_edges(8, array("i", [0, 1, 2]))
+
+
+def test_graph_edges_append() -> None:
+    g = Graph(4)
+    g.edges.append((0, 1))
+    g.edges.extend([(1, 2), (2, 3)])
+    assert g.edges == [(0, 1), (1, 2), (2, 3)]
+    assert g.incident_edges[1] == [(0, 0), (2, 1)]
+
+    with pytest.raises(IndexError):
+        g.edges.append((0, 4))
+    with pytest.raises(IndexError):
+        g.add_edge(-1, 0)
+
+
+def test_graph_adjacency(default_graph: Graph) -> None:
+    for v in range(default_graph.num_vertices):
+        assert list(default_graph._incident(v)) == default_graph.incident_edges[v]
+    default_graph.add_edge(5, 7)
+    assert list(default_graph._incident(7)) == [(4, 8), (6, 9), (5, 10)]
+
+
+def test_graph_line_graph(default_graph: Graph) -> None:
+    default_graph.add_edge(7, 6)  # parallel edge
+    line_graph = default_graph.line_graph()
+    assert line_graph.num_vertices == 11
+    assert sorted(tuple(sorted(e)) for e in line_graph) == sorted(
+        (x, y)
+        for x in range(11)
+        for y in range(x + 1, 11)
+        if set(default_graph[x]) & set(default_graph[y])
+    )
+    line_graph.add_edge(0, 1)
+
+
+def test_grid_graph_cache() -> None:
+    g = graph._grid_graph(3, 4)
+    assert g is graph._grid_graph(3, 4)
+    assert g.num_vertices == 12 and len(g) == 17
+    with pytest.raises(ValueError):
+        g.add_edge(0, 5)
+    assert g._line_graph() is g._line_graph()
+
+
 def test_active_vertices_connected_grid(solver: Solver) -> None:
     is_active = solver.bool_array((3, 4))
     graph.active_vertices_connected(solver, is_active)
@@ -221,6 +285,24 @@ def test_active_edges_single_cycle_grid_frame(solver: Solver) -> None:
     assert grid_frame.horizontal[2, 3].sol is None
 
 
+@pytest.mark.parametrize("encoding", ["line_graph", "incidence"])
+def test_active_edges_single_cycle_encoding(solver: Solver, encoding: str) -> None:
+    is_line = BoolGridFrame(solver, 2, 3)
+    graph.active_edges_single_cycle(
+        solver, is_line, use_graph_primitive=True, connectivity_encoding=encoding
+    )
+    (connectivity,) = [
+        c for c in solver.constraints if c.op == Op.GRAPH_ACTIVE_VERTICES_CONNECTED
+    ]
+    num_vertices, num_edges = connectivity.operands[:2]
+    if encoding == "line_graph":
+        assert (num_vertices, num_edges) == (17, 34)
+    else:
+        # 12 vertices and 17 edges of the grid, each edge being connected to its endpoints
+        assert (num_vertices, num_edges) == (29, 34)
+    assert len(connectivity.operands) == 2 + num_vertices + num_edges * 2
+
+
 def test_active_edges_single_cycle_graph(solver: Solver, default_graph: Graph) -> None:
     is_active_edge = solver.bool_array(10)
     solver.add_answer_key(is_active_edge)
@@ -285,3 +367,20 @@ def test_active_edges_connected_crossable(solver: Solver) -> None:
     assert grid_frame.vertical[0, 0].sol is True
     assert grid_frame.vertical[0, 3].sol is True
     assert grid_frame.vertical[2, 0].sol is None
+
+
+def test_z3_graph_primitive_not_top_level(solver: Solver, default_graph: Graph) -> None:
+    pytest.importorskip("z3")
+    from cspuz.backend.z3 import Z3Backend
+
+    cspuz.config.use_graph_primitive = True
+    is_active = solver.bool_array(8)
+    graph.active_vertices_connected(solver, is_active, graph=default_graph)
+    (primitive,) = [c for c in solver.constraints if c.op == Op.GRAPH_ACTIVE_VERTICES_CONNECTED]
+
+    backend = Z3Backend(solver.variables)
+    backend.add_constraint(primitive)
+    # the primitive converted as a top-level constraint above is not reused below
+    for c in [~primitive, is_active[0].then(primitive), is_active[0] | primitive]:
+        with pytest.raises(ValueError):
+            backend.add_constraint(c)
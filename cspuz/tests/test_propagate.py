@@ -0,0 +1,145 @@
+import itertools
+import random
+
+import pytest
+
+from cspuz import Solver, config
+from cspuz.constraints import count_true
+from cspuz.propagate import DomainTightener
+
+from tests.test_simplify import _evaluate
+
+
+@pytest.fixture
+def solver() -> Solver:
+    return Solver()
+
+
+def _tighten(solver: Solver) -> DomainTightener:
+    tightener = DomainTightener()
+    tightener.tighten(solver.constraints)
+    return tightener
+
+
+def test_unary(solver: Solver) -> None:
+    x = solver.int_var(0, 10)
+    y = solver.int_var(0, 10)
+    z = solver.int_var(0, 10)
+    w = solver.int_var(0, 10)
+    solver.ensure(x == 3, y < 7, 2 <= y, z != 0, z != 10, w != 5)
+
+    tightener = _tighten(solver)
+    assert tightener.domain(x) == (3, 3)
+    assert tightener.domain(y) == (2, 6)
+    assert tightener.domain(z) == (1, 9)
+    assert tightener.domain(w) == (0, 10)
+    assert not tightener.conflict
+
+
+def test_linear_chain(solver: Solver) -> None:
+    xs = solver.int_array(10, 0, 9)
+    bs = solver.bool_array(10)
+    solver.ensure(xs[0] == 0)
+    # propagated backwards, as `to_down` in view
+    solver.ensure(xs[:-1] == bs[1:].cond(0, xs[1:] + 1))
+    solver.ensure(xs[9] == 0)
+
+    tightener = _tighten(solver)
+    assert [tightener.domain(x) for x in xs] == [(0, 0)] + [(0, 9 - i) for i in range(1, 10)]
+
+
+def test_fixed_conditions(solver: Solver) -> None:
+    a = solver.int_var(0, 10)
+    b = solver.int_var(0, 10)
+    c = solver.int_var(0, 10)
+    p = solver.bool_var()
+    q = solver.bool_var()
+    solver.ensure(p, ~q, b == 4)
+    solver.ensure(p.then(a - b == 1))
+    solver.ensure(q | (c >= 8))
+
+    tightener = _tighten(solver)
+    assert tightener.domain(a) == (5, 5)
+    assert tightener.domain(c) == (8, 10)
+
+
+def test_count_true(solver: Solver) -> None:
+    bs = solver.bool_array(4)
+    n = solver.int_var(0, 10)
+    m = solver.int_var(-5, 5)
+    solver.ensure(n == count_true(bs))
+    solver.ensure(count_true(bs[:2]) <= 0)
+    solver.ensure(count_true(bs[2:]) + m <= 2)
+
+    tightener = _tighten(solver)
+    assert tightener.domain(m) == (-5, 2)
+    # `bs[0]` and `bs[1]` are fixed to false
+    assert tightener.domain(n) == (0, 2)
+
+
+def test_conflict(solver: Solver) -> None:
+    x = solver.int_var(0, 10)
+    solver.ensure(x >= 5, x <= 3)
+
+    tightener = _tighten(solver)
+    assert tightener.conflict
+    lo, hi = tightener.domain(x)
+    assert lo <= hi
+
+
+def test_random_soundness() -> None:
+    rng = random.Random(42)
+    for _ in range(200):
+        solver = Solver()
+        xs = solver.int_array(2, -2, 2)
+        bs = solver.bool_array(2)
+
+        def gen_int():
+            k = rng.randrange(4)
+            if k == 0:
+                return rng.choice(list(xs))
+            elif k == 1:
+                return rng.choice(list(xs)) + rng.choice(list(xs))
+            elif k == 2:
+                return rng.choice(list(xs)) - rng.randint(-2, 2)
+            else:
+                return rng.choice(list(bs)).cond(rng.choice(list(xs)), rng.randint(-2, 2))
+
+        def gen_bool():
+            k = rng.randrange(6)
+            left, right = gen_int(), gen_int()
+            if k == 0:
+                return left == right
+            elif k == 1:
+                return left <= right
+            elif k == 2:
+                return left > right
+            elif k == 3:
+                return left != rng.randint(-2, 2)
+            elif k == 4:
+                return rng.choice(list(bs)).then(left < right)
+            else:
+                return rng.choice(list(bs)) | (left >= right)
+
+        constraints = [gen_bool() for _ in range(3)]
+        tightener = DomainTightener()
+        tightener.tighten(constraints)
+        domains = [tightener.domain(x) for x in xs]
+
+        for ints in itertools.product(range(-2, 3), repeat=2):
+            for bools in itertools.product([False, True], repeat=2):
+                assignment = dict(zip([x.id for x in xs] + [b.id for b in bs], ints + bools))
+                if all(_evaluate(c, assignment) for c in constraints):
+                    assert all(lo <= v <= hi for v, (lo, hi) in zip(ints, domains))
+
+
+def test_perf_stats(solver: Solver, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "tighten_domains", True)
+    x = solver.int_var(0, 10)
+    y = solver.int_var(0, 10)
+    solver.ensure(x == 3, y == x + 1)
+    solver.add_answer_key(x, y)
+    assert solver.solve(backend="z3")
+    assert (x.sol, y.sol) == (3, 4)
+    assert solver.perf_stats()["tighten_domain_reduction"] == 20  # type: ignore
+    assert (x.lo, x.hi) == (0, 10)
@@ -0,0 +1,154 @@
+import itertools
+import random
+from typing import Any, Dict
+
+import pytest
+
+import cspuz
+from cspuz import Solver
+from cspuz.expr import BoolExpr, BoolVar, Expr, IntExpr, IntVar, Op
+from cspuz.simplify import Simplifier, simplify
+
+from tests.util import check_equality_expr
+
+
+@pytest.fixture
+def solver() -> Solver:
+    return Solver()
+
+
+def test_fold_bool_constants(solver: Solver) -> None:
+    x = solver.bool_var()
+    assert simplify(x & True) is x
+    assert simplify(False | x) is x
+    assert simplify(x & False) is False
+    assert simplify(x | True) is True
+    assert simplify(BoolExpr(Op.BOOL_CONSTANT, [True])) is True
+    assert simplify(x.then(True)) is True
+    assert check_equality_expr(simplify(x.then(False)), ~x)
+
+
+def test_double_negation(solver: Solver) -> None:
+    x = solver.bool_var()
+    assert simplify(~~x) is x
+    assert simplify(x == False) is not x  # noqa: E712
+    assert simplify(~(x == False)) is x  # noqa: E712
+
+
+def test_cond_same_branches(solver: Solver) -> None:
+    x = solver.bool_var()
+    y = solver.int_var(0, 3)
+    assert simplify(x.cond(0, 0)) == 0
+    assert simplify(x.cond(y, y)) is y
+    assert simplify(cspuz.cond(True, y, 2)) is y
+
+
+def test_flatten(solver: Solver) -> None:
+    a, b, c = solver.int_var(0, 3), solver.int_var(0, 3), solver.int_var(0, 3)
+    assert check_equality_expr(simplify(a + 1 + b + 2 + c), Expr(Op.ADD, [a, b, c, 3]))
+    assert check_equality_expr(simplify(a + 1 - 1), Expr(Op.SUB, [Expr(Op.ADD, [a, 1]), 1]))
+
+    x, y, z = solver.bool_var(), solver.bool_var(), solver.bool_var()
+    assert check_equality_expr(simplify((x & y) & (True & z)), Expr(Op.AND, [x, y, z]))
+    assert check_equality_expr(simplify((x | y) | (z | False)), Expr(Op.OR, [x, y, z]))
+
+
+def test_unchanged_expression_is_shared(solver: Solver) -> None:
+    x, y = solver.bool_var(), solver.bool_var()
+    e = (x & y) | ~x
+    assert simplify(e) is e
+
+
+def test_removed_nodes(solver: Solver) -> None:
+    x = solver.bool_var()
+    simplifier = Simplifier()
+    assert simplifier.simplify_constraints([x | True, x & True, ~~x]) == [x, x]
+    # `x | True` (2, including the occurrence of `x`), `x & True` (1), `~~x` (2)
+    assert simplifier.removed_nodes == 5
+
+
+def _evaluate(e: Any, assignment: Dict[int, Any]) -> Any:
+    if not isinstance(e, Expr):
+        return e
+    if isinstance(e, (BoolVar, IntVar)):
+        return assignment[e.id]
+    v = [_evaluate(x, assignment) for x in e.operands]
+    if e.op in (Op.BOOL_CONSTANT, Op.INT_CONSTANT):
+        return v[0]
+    return {
+        Op.NOT: lambda: not v[0],
+        Op.AND: lambda: all(v),
+        Op.OR: lambda: any(v),
+        Op.IMP: lambda: (not v[0]) or v[1],
+        Op.IFF: lambda: v[0] == v[1],
+        Op.XOR: lambda: v[0] != v[1],
+        Op.IF: lambda: v[1] if v[0] else v[2],
+        Op.ADD: lambda: sum(v),
+        Op.SUB: lambda: v[0] - v[1],
+        Op.NEG: lambda: -v[0],
+        Op.EQ: lambda: v[0] == v[1],
+        Op.NE: lambda: v[0] != v[1],
+        Op.LE: lambda: v[0] <= v[1],
+        Op.LT: lambda: v[0] < v[1],
+        Op.GE: lambda: v[0] >= v[1],
+        Op.GT: lambda: v[0] > v[1],
+    }[e.op]()
+
+
+def test_random_expressions_equivalent(solver: Solver) -> None:
+    bools = [solver.bool_var() for _ in range(2)]
+    ints = [solver.int_var(0, 1) for _ in range(2)]
+    rng = random.Random(42)
+
+    def gen_bool(depth: int) -> Any:
+        if depth == 0 or rng.random() < 0.2:
+            return rng.choice(bools + [True, False, BoolExpr(Op.BOOL_CONSTANT, [True])])
+        k = rng.randrange(8)
+        if k == 0:
+            return BoolExpr(Op.NOT, [gen_bool(depth - 1)])
+        elif k <= 4:
+            op = [Op.AND, Op.OR, Op.IFF, Op.XOR, Op.IMP][k - 1 + rng.randrange(2)]
+            n = rng.randrange(1, 4) if op in (Op.AND, Op.OR) else 2
+            return BoolExpr(op, [gen_bool(depth - 1) for _ in range(n)])
+        else:
+            op = rng.choice([Op.EQ, Op.NE, Op.LE, Op.LT, Op.GE, Op.GT])
+            return BoolExpr(op, [gen_int(depth - 1), gen_int(depth - 1)])
+
+    def gen_int(depth: int) -> Any:
+        if depth == 0 or rng.random() < 0.2:
+            return rng.choice(ints + [0, 1, 2, IntExpr(Op.INT_CONSTANT, [1])])
+        k = rng.randrange(4)
+        if k == 0:
+            return IntExpr(Op.IF, [gen_bool(depth - 1), gen_int(depth - 1), gen_int(depth - 1)])
+        elif k == 1:
+            return IntExpr(Op.ADD, [gen_int(depth - 1) for _ in range(rng.randrange(1, 4))])
+        elif k == 2:
+            return IntExpr(Op.SUB, [gen_int(depth - 1), gen_int(depth - 1)])
+        else:
+            return IntExpr(Op.NEG, [gen_int(depth - 1)])
+
+    for _ in range(300):
+        e = gen_bool(4)
+        s = simplify(e)
+        for values in itertools.product([False, True], [False, True], [0, 1], [0, 1]):
+            assignment = {v.id: val for v, val in zip(bools + ints, values)}
+            assert _evaluate(e, assignment) == _evaluate(s, assignment)
+
+
+def test_perf_stats(solver: Solver) -> None:
+    x = solver.bool_var()
+    solver.ensure(x & True)
+    solver.add_answer_key(x)
+    assert solver.solve(backend="z3")
+    assert x.sol is True
+    assert solver.perf_stats()["simplify_removed_nodes"] == 1  # type: ignore
+
+
+def test_perf_stats_disabled(solver: Solver, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cspuz.config, "simplify_constraints", False)
+    x = solver.bool_var()
+    solver.ensure(x & True)
+    solver.add_answer_key(x)
+    assert solver.solve(backend="z3")
+    assert x.sol is True
+    assert solver.perf_stats()["simplify_removed_nodes"] == 0  # type: ignore
@@ -0,0 +1,215 @@
+import io
+from typing import List
+
+import pytest
+
+import cspuz
+from cspuz.backend.sugar_like import (
+    SugarBackend,
+    SugarLikeBackend,
+    _CspWriter,
+    _convert_variables_compact,
+)
+
+
+def test_writer_shared_subexpression() -> None:
+    solver = cspuz.Solver()
+    x = solver.int_var(0, 3)
+    b = solver.bool_var()
+    s = x + 1
+
+    writer = _CspWriter(io.StringIO())
+    assert writer.render((s == 2) | (b.cond(s, 0) == 1)) == (
+        "(|| (= (+ i0 1) 2) (= (if b1 (+ i0 1) 0) 1))"
+    )
+    assert writer.render(s + s) == "(+ (+ i0 1) (+ i0 1))"
+
+
+def test_writer_deep_expression() -> None:
+    solver = cspuz.Solver()
+    x = solver.int_var(0, 3)
+    e = x
+    for _ in range(10000):
+        e = e + 1
+
+    text = _CspWriter(io.StringIO()).render(e == 3)
+    assert text.startswith("(= " + "(+ " * 10000 + "i0 1) 1)")
+    assert text.endswith(" 1) 3)")
+
+
+def test_problem_text() -> None:
+    solver = cspuz.Solver()
+    x = solver.int_var(0, 3)
+    b = solver.bool_var()
+
+    backend = SugarLikeBackend(solver.variables)
+    backend.add_constraint([b | (x == 1), x != 2])
+    expected = "(int i0 0 3)\n(bool b1)\n(|| b1 (= i0 1))\n(!= i0 2)\n"
+    assert backend._buffer.getvalue() == expected
+
+    backend.push()
+    backend.add(x >= 1)
+    assert backend._session_description() == expected
+    assert backend._session_constraints == ["(>= i0 1)"]
+    assert backend._buffer.getvalue() == expected + "(>= i0 1)\n"
+
+
+def test_assumptions() -> None:
+    solver = cspuz.Solver()
+    b = solver.bool_var()
+    c = solver.bool_var()
+
+    class RecordingBackend(SugarLikeBackend):
+        def _call_solver(self, csp_description: str) -> str:
+            self.description = csp_description
+            return "s UNSATISFIABLE"
+
+    backend = RecordingBackend(solver.variables)
+    backend.add_constraint(b | c)
+    backend.push()
+    assert not backend.solve_incremental([~b, c])
+    base = "(bool b0)\n(bool b1)\n(|| b0 b1)\n"
+    assert backend.description == base + "(! b0)\nb1\n"
+
+    assert not backend.solve_incremental()
+    assert backend.description == base
+
+
+def test_copy() -> None:
+    solver = cspuz.Solver()
+    b = solver.bool_var()
+
+    backend = SugarLikeBackend(solver.variables)
+    backend.add_constraint(b)
+    copied = backend.copy()
+    c = solver.bool_var()
+    copied.add_variables([c])
+    copied.add_constraint(b | c)
+    backend.add_constraint(~b)
+
+    assert backend._buffer.getvalue() == "(bool b0)\nb0\n(! b0)\n"
+    assert copied._buffer.getvalue() == "(bool b0)\nb0\n(bool b1)\n(|| b0 b1)\n"
+    assert copied.variables == [b, c]
+
+
+def test_irrefutable_assumptions() -> None:
+    solver = cspuz.Solver()
+    b = solver.bool_var()
+
+    class RecordingBackend(SugarLikeBackend):
+        def _call_solver(self, csp_description: str) -> str:
+            self.description = csp_description
+            return "unsat"
+
+    backend = RecordingBackend(solver.variables)
+    backend.push()
+    c = solver.bool_var()
+    backend.add_variables([c])
+    backend.add(c.then(b))
+    assert backend._session_constraints == ["(bool b1)", "(=> b1 b0)"]
+
+    assert not backend.solve_irrefutably([True, False], [c])
+    assert backend.description == "(bool b0)\n(bool b1)\n(=> b1 b0)\nb1\n#b0"
+    assert backend._buffer.getvalue() == "(bool b0)\n(bool b1)\n(=> b1 b0)\n"
+
+
+def test_sugar_backbone() -> None:
+    solver = cspuz.Solver()
+    b = solver.bool_var()
+    c = solver.bool_var()
+    d = solver.bool_var()
+    solver.ensure(b)
+    solver.add_answer_key(b, c)
+
+    class ScriptedBackend(SugarBackend):
+        descriptions: List[str] = []
+        outputs = [
+            "s SATISFIABLE\na b0\ttrue\na b1\ttrue\na b2\ttrue\na\n",
+            "s SATISFIABLE\na b0\ttrue\na b1\tfalse\na b2\ttrue\na\n",
+            "s UNSATISFIABLE",
+        ]
+
+        def _call_solver(self, csp_description: str) -> str:
+            self.descriptions.append(csp_description)
+            return self.outputs.pop(0)
+
+    # the first solution, the refutation of `c`, and the confirmation of `b`
+    assert solver.solve(ScriptedBackend)
+    assert [b.sol, c.sol, d.sol] == [True, None, None]
+    assert ScriptedBackend.outputs == []
+    base = "(bool b0)\n(bool b1)\n(bool b2)\nb0\n"
+    assert ScriptedBackend.descriptions[0] == base
+    assert all(desc.startswith(base) for desc in ScriptedBackend.descriptions)
+
+
+def test_parse_answer() -> None:
+    solver = cspuz.Solver()
+    x = solver.int_var(-3, 3)
+    b = solver.bool_var()
+    y = solver.int_var(0, 3)
+    c = solver.bool_var()
+
+    class RecordingBackend(SugarLikeBackend):
+        def _call_solver(self, csp_description: str) -> str:
+            return self.output
+
+    backend = RecordingBackend(solver.variables)
+    backend.output = "s SATISFIABLE\na i0\t-2\na b1\ttrue\na i2\t3\na b3\tfalse\na\n"
+    assert backend.solve()
+    assert [x.sol, b.sol, y.sol, c.sol] == [-2, True, 3, False]
+
+    backend.output = "s SATISFIABLE\nvi 1 0\nvb 01\n"
+    assert backend.solve()
+    assert [x.sol, b.sol, y.sol, c.sol] == [1, False, 0, True]
+
+    backend.output = "sat\ni0 -1\nb3 true\n"
+    assert backend.solve_irrefutably([True, True, True, True])
+    assert [x.sol, b.sol, y.sol, c.sol] == [-1, None, None, True]
+
+    backend.output = "sat\nvi 2\nvb *\n"
+    assert backend.solve_irrefutably([True, False, False, True])
+    assert [x.sol, b.sol, y.sol, c.sol] == [2, None, None, None]
+
+    backend.output = "s SATISFIABLE\nvi 1\nvb 01\n"
+    with pytest.raises(ValueError):
+        backend.solve()
+
+
+def test_compact_dialect() -> None:
+    solver = cspuz.Solver()
+    b = solver.bool_var()
+    xs = solver.int_array(40, 0, 3)
+    s = xs[39] + 1
+
+    writer = _CspWriter(io.StringIO(), compact=True)
+    e = (s == 2) | ((b & True).cond(s, 0) == 1)
+    assert writer.render(e) == "(| (= (+ i14 1) 2) (= (? (& b0 t) ($0 (+ i14 1)) 0) 1))"
+    assert writer.render(s + s) == "(+ $0 $0)"
+
+    ys = solver.bool_array(3)
+    assert _convert_variables_compact([b, *xs[:3], xs[4], *ys]) == [
+        "(B b0)",
+        "(Is i1 3 0 3)",
+        "(I i5 0 3)",
+        "(Bs b15 3)",
+    ]
+
+    class RecordingBackend(SugarLikeBackend):
+        _compact_dialect = True
+
+        def _call_solver(self, csp_description: str) -> str:
+            self.description = csp_description
+            return "unsat"
+
+    backend = RecordingBackend([b, xs[39]])
+    constraints = [b.then(s == 1), ~b | (s > 0), s >= 1]
+    backend.add_constraint(constraints[0])
+    backend.push()
+    assert not backend.solve_irrefutably([True, True], [constraints[1], constraints[1]])
+    assert backend.description == (
+        "#!compact\n(B b0)\n(I i14 0 3)\n(=> b0 (= (+ i14 1) 1))\n"
+        "(| (! b0) (> (+ i14 1) 0))\n(| (! b0) (> (+ i14 1) 0))\n#b0 i14"
+    )
+    # shorthands are not defined in temporary constraints
+    backend.add(constraints[2])
+    assert backend._session_constraints == ["(>= ($0 (+ i14 1)) 1)"]
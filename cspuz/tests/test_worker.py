@@ -0,0 +1,132 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from cspuz.backend import _worker
+from cspuz.backend.sugar_like import SugarExtendedBackend
+
+# A stand-in for `sugar_ext.sh --server` speaking the same framed protocol. `solve` echoes the
+# payload, a payload of "crash" terminates the process and "sleep" blocks forever. Like old
+# versions of `CspuzSugarInterface`, it does not support the `features` command.
+_FAKE_SERVER = textwrap.dedent(
+    """
+    import sys, time
+
+    sessions = {}
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        header = stdin.readline()
+        if not header:
+            break
+        command, session, length = header.decode().split()
+        payload = stdin.read(int(length)).decode()
+        if payload == "crash":
+            sys.exit(1)
+        if payload == "sleep":
+            time.sleep(1000)
+        if command == "ping":
+            res = "pong"
+        elif command == "solve":
+            res = "solved:" + payload
+        elif command == "load":
+            sessions[session] = [payload]
+            res = "ok"
+        elif command == "add":
+            if session in sessions:
+                sessions[session].append(payload)
+                res = "|".join(sessions[session])
+            else:
+                res = "nosession"
+        elif command == "drop":
+            sessions.pop(session, None)
+            res = "ok"
+        else:
+            res = "error unknown command: " + command
+        data = res.encode()
+        stdout.write(str(len(data)).encode() + b"\\n" + data)
+        stdout.flush()
+    """
+)
+
+
+@pytest.fixture
+def pool(tmp_path: Path):
+    script = tmp_path / "fake_server.py"
+    script.write_text(_FAKE_SERVER)
+    pool = _worker.SugarWorkerPool([sys.executable, str(script)], 2)
+    yield pool
+    pool.shutdown()
+
+
+def test_solve(pool: _worker.SugarWorkerPool) -> None:
+    assert pool.solve("(bool b0)") == "solved:(bool b0)"
+    assert pool.solve("(bool b1)") == "solved:(bool b1)"
+    assert pool._num_workers == 1
+
+
+def test_respawn_on_crash(pool: _worker.SugarWorkerPool) -> None:
+    with pytest.raises(_worker.WorkerCrashed):
+        pool.solve("crash")
+    assert pool.solve("(bool b0)") == "solved:(bool b0)"
+
+
+def test_timeout(pool: _worker.SugarWorkerPool) -> None:
+    with pytest.raises(subprocess.TimeoutExpired):
+        pool.solve("sleep", timeout=0.5)
+    assert pool._num_workers == 0
+    assert pool.solve("(bool b0)") == "solved:(bool b0)"
+
+
+def test_session(pool: _worker.SugarWorkerPool) -> None:
+    out, shipped = pool.solve_session("s", lambda: "base", ["c0"], 0)
+    assert out == "base|c0"
+    assert shipped == 1
+
+    out, shipped = pool.solve_session("s", lambda: "base", ["c0", "c1"], shipped)
+    assert out == "base|c0|c1"
+    assert shipped == 2
+
+    # the session is loaded again (with the shipped constraints) once the worker forgets it
+    pool.drop_session("s")
+    out, shipped = pool.solve_session("s", lambda: "base", ["c0", "c1", "c2"], shipped)
+    assert out == "base\nc0\nc1|c2"
+    assert shipped == 3
+
+
+def test_features(pool: _worker.SugarWorkerPool) -> None:
+    assert pool.features() == set()
+    assert pool.solve("(bool b0)") == "solved:(bool b0)"
+    assert pool._num_workers == 1
+
+
+def test_drop_busy_session(pool: _worker.SugarWorkerPool) -> None:
+    pool.solve_session("s", lambda: "base", ["c0"], 0)
+    worker = pool._acquire()
+    pool.drop_session("s")
+    assert worker.request("add", "s", "c1") == "base|c0|c1"
+    # the drop is sent once the worker is released
+    pool._release(worker)
+    worker = pool._acquire()
+    assert worker.request("add", "s", "c1") == "nosession"
+    pool._release(worker)
+
+
+def test_push_drops_previous_session(
+    pool: _worker.SugarWorkerPool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(SugarExtendedBackend, "_worker_pool", lambda self: pool)
+    backend = SugarExtendedBackend([])
+    backend.push()
+    session = backend._session_id
+    assert session is not None
+    pool.solve_session(session, lambda: "base", ["c0"], 0)
+
+    backend.push()
+    assert backend._session_id != session
+    worker = pool._acquire()
+    assert worker.request("add", session, "c1") == "nosession"
+    pool._release(worker)
@@ -433,7 +433,7 @@ class DiceGrid:
             self.offsets.append(self.offsets[-1] + s[0] * s[1])
         
         num_vertices = self.offsets[-1]
-        self.graph = graph.Graph(num_vertices)
+        edges = []
         
         def get_v(s_idx, y, x):
             return self.offsets[s_idx] + y * self.dims[s_idx][1] + x
@@ -450,46 +450,52 @@ class DiceGrid:
 
         self.from_v = from_v
 
+        def add_edge(u, v):
+            edges.append((u, v))
+
         # Internal connectivity
         for s_idx in range(6):
             h, w = self.dims[s_idx]
             for y in range(h):
                 for x in range(w - 1):
-                    self.graph.add_edge(get_v(s_idx, y, x), get_v(s_idx, y, x + 1))
+                    add_edge(get_v(s_idx, y, x), get_v(s_idx, y, x + 1))
             for y in range(h - 1):
                 for x in range(w):
-                    self.graph.add_edge(get_v(s_idx, y, x), get_v(s_idx, y + 1, x))
+                    add_edge(get_v(s_idx, y, x), get_v(s_idx, y + 1, x))
 
         # Cross-surface connectivity
         # Surface 0
         for i in range(height):
-            self.graph.add_edge(get_v(0, i, 0), get_v(4, 0, i))
-            self.graph.add_edge(get_v(0, i, width - 1), get_v(1, i, 0))
+            add_edge(get_v(0, i, 0), get_v(4, 0, i))
+            add_edge(get_v(0, i, width - 1), get_v(1, i, 0))
         for i in range(width):
-            self.graph.add_edge(get_v(0, 0, i), get_v(3, 0, width - 1 - i))
-            self.graph.add_edge(get_v(0, height - 1, i), get_v(5, 0, i))
+            add_edge(get_v(0, 0, i), get_v(3, 0, width - 1 - i))
+            add_edge(get_v(0, height - 1, i), get_v(5, 0, i))
 
         # Surface 1
         for i in range(height):
-            self.graph.add_edge(get_v(1, i, depth - 1), get_v(2, i, 0))
+            add_edge(get_v(1, i, depth - 1), get_v(2, i, 0))
         for i in range(depth):
-            self.graph.add_edge(get_v(1, 0, i), get_v(3, i, 0))
-            self.graph.add_edge(get_v(1, height - 1, i), get_v(5, i, width - 1))
+            add_edge(get_v(1, 0, i), get_v(3, i, 0))
+            add_edge(get_v(1, height - 1, i), get_v(5, i, width - 1))
 
         # Surface 2
         for i in range(height):
-            self.graph.add_edge(get_v(2, i, width - 1), get_v(4, depth - 1, i))
+            add_edge(get_v(2, i, width - 1), get_v(4, depth - 1, i))
         for i in range(width):
-            self.graph.add_edge(get_v(2, 0, i), get_v(3, depth - 1, i))
-            self.graph.add_edge(get_v(2, height - 1, i), get_v(5, depth - 1, width - 1 - i))
+            add_edge(get_v(2, 0, i), get_v(3, depth - 1, i))
+            add_edge(get_v(2, height - 1, i), get_v(5, depth - 1, width - 1 - i))
 
         # Surface 3
         for i in range(depth):
-            self.graph.add_edge(get_v(3, i, width - 1), get_v(4, i, 0))
+            add_edge(get_v(3, i, width - 1), get_v(4, i, 0))
 
         # Surface 4
         for i in range(depth):
-            self.graph.add_edge(get_v(4, i, height - 1), get_v(5, i, 0))
+            add_edge(get_v(4, i, height - 1), get_v(5, i, 0))
+
+        self.graph = graph.Graph.from_edges(num_vertices, edges)
+
 
 def get_adjacent_dice(depth, height, width, s, y, x):
     # Returns (s, y, x) for left, right, up, down
@@ -38,9 +38,9 @@ class BoolKnightFrame:
                         if (y, x) < (ny, nx):
                             self.edges.append(((y, x), (ny, nx)))
         
-        self.graph = Graph(len(self.vertices))
-        for u, v in self.edges:
-            self.graph.add_edge(self.v_map[u], self.v_map[v])
+        self.graph = Graph.from_edges(
+            len(self.vertices), [(self.v_map[u], self.v_map[v]) for u, v in self.edges]
+        )
             
         # Create boolean variables for each edge
         self.edge_vars = solver.bool_array(len(self.edges))